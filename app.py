@@ -1,15 +1,49 @@
 from app import create_app, db
-from app.models import User, InventoryCategory, InventoryItem
+from app.models import User, InventoryCategory, InventoryItem, Competition, BeginnersStudent
 from flask.cli import with_appcontext
+from sqlalchemy.schema import CreateIndex
 import click
 
 app = create_app()
 
+def _add_missing_columns(table, column_names):
+    """Add columns a table created by an earlier version doesn't have yet.
+
+    NOT NULL columns are added with their scalar default, which also fills
+    the existing rows; foreign keys keep their ON DELETE action.
+    """
+    existing = {column['name'] for column in db.inspect(db.engine).get_columns(table.name)}
+    dialect = db.engine.dialect
+    quote = dialect.identifier_preparer
+    for name in column_names:
+        if name in existing:
+            continue
+        column = table.columns[name]
+        ddl = f'{quote.quote(name)} {column.type.compile(dialect=dialect)}'
+        if not column.nullable:
+            default = db.literal(column.default.arg, column.type).compile(
+                dialect=dialect, compile_kwargs={'literal_binds': True})
+            ddl += f' NOT NULL DEFAULT {default}'
+        for foreign_key in column.foreign_keys:
+            target = foreign_key.column
+            ddl += f' REFERENCES {quote.format_table(target.table)} ({quote.quote(target.name)})'
+            if foreign_key.ondelete:
+                ddl += f' ON DELETE {foreign_key.ondelete}'
+        db.session.execute(db.text(f'ALTER TABLE {quote.format_table(table)} ADD COLUMN {ddl}'))
+
 @app.cli.command("init-db")
 @with_appcontext
 def init_db_command():
     """Create database tables."""
     db.create_all()
+    # create_all skips tables that already exist, so add columns and indexes introduced since
+    _add_missing_columns(User.__table__, ['token_version'])
+    _add_missing_columns(InventoryItem.__table__, InventoryItem.SPEC_ATTRIBUTES)
+    _add_missing_columns(Competition.__table__, ['score_storage', 'results_version'])
+    _add_missing_columns(BeginnersStudent.__table__, ['bow_id', 'arrows_id'])
+    for model in (User, InventoryItem, BeginnersStudent):
+        for index in model.__table__.indexes:
+            db.session.execute(CreateIndex(index, if_not_exists=True))
     
     # Create default categories
     default_categories = [
@@ -40,6 +74,10 @@ def init_db_command():
         db.session.add(admin)
     
     db.session.commit()
+    
+    # Index items added before the full-text search index existed
+    from app.inventory.search import reindex
+    reindex()
     click.echo('Database initialized with default data.')
 
 @app.cli.command("create-admin")
@@ -65,5 +103,110 @@ def create_admin_command(username, email, password):
     db.session.commit()
     click.echo(f'Admin user {username} created.')
 
+@app.cli.command("compact-scores")
+@click.option("--competition-id", type=int, help="Only convert this competition.")
+@with_appcontext
+def compact_scores_command(competition_id):
+    """Convert per-arrow scores into compact one-row-per-end storage."""
+    query = Competition.query.filter_by(score_storage='arrow')
+    if competition_id:
+        query = query.filter_by(id=competition_id)
+    
+    # Commit per competition so large histories are converted in bounded memory
+    competition_ids = [c.id for c in query.with_entities(Competition.id).all()]
+    total_removed = 0
+    for cid in competition_ids:
+        competition = Competition.query.get(cid)
+        removed = competition.compact_scores()
+        db.session.commit()
+        db.session.expunge_all()
+        total_removed += removed
+        click.echo(f'Competition {cid}: packed {removed} arrow rows.')
+    
+    click.echo(f'Converted {len(competition_ids)} competitions, removed {total_removed} arrow rows.')
+
+@app.cli.command("rebuild-league")
+@click.option("--batch-size", default=20, show_default=True, help="Competitions per transaction.")
+@with_appcontext
+def rebuild_league_command(batch_size):
+    """Recompute all season league rollups from completed competitions."""
+    from app.league.rollups import rebuild_all
+    count = rebuild_all(batch_size=batch_size, echo=click.echo)
+    click.echo(f'League rebuilt from {count} completed competitions.')
+
+@app.cli.command("backfill-records")
+@click.option("--batch-size", default=20, show_default=True, help="Competitions per transaction.")
+@with_appcontext
+def backfill_records_command(batch_size):
+    """Rebuild club records from all completed competitions."""
+    from app.league.club_records import backfill_all
+    count = backfill_all(batch_size=batch_size, echo=click.echo)
+    click.echo(f'Club records rebuilt from {count} completed competitions.')
+
+@app.cli.command("backfill-snapshots")
+@click.option("--batch-size", default=20, show_default=True, help="Competitions per transaction.")
+@with_appcontext
+def backfill_snapshots_command(batch_size):
+    """Freeze the results of completed competitions that have no snapshot yet."""
+    from app.competitions.results import backfill_snapshots
+    count = backfill_snapshots(batch_size=batch_size, echo=click.echo)
+    click.echo(f'Captured {count} results snapshots.')
+
+@app.cli.command("reindex-inventory")
+@click.option("--batch-size", default=500, show_default=True, help="Items read per query.")
+@with_appcontext
+def reindex_inventory_command(batch_size):
+    """Rebuild the inventory full-text search index and equipment spec columns."""
+    from app.inventory.search import reindex
+    count = reindex(batch_size=batch_size)
+    click.echo(f'Indexed {count} inventory items.')
+
+@app.cli.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress static files into static/dist."""
+    from app.assets import build_assets
+    manifest = build_assets(app.static_folder, echo=click.echo)
+    click.echo(f'Built {len(manifest)} static assets.')
+
+@app.cli.command("delete-events")
+@click.option("--before", required=True, type=click.DateTime(formats=["%Y-%m-%d"]),
+              help="Delete events dated before this day (YYYY-MM-DD).")
+@click.option("--yes", is_flag=True, help="Don't ask for confirmation.")
+@with_appcontext
+def delete_events_command(before, yes):
+    """Delete old events with their competitions, scores, attendances and charges."""
+    from app.deletion import delete_events
+    from app.models import ShootingEvent
+    events = db.select(ShootingEvent.id).where(ShootingEvent.date < before.date())
+    count = db.session.scalar(db.select(db.func.count()).select_from(events.subquery()))
+    if not count:
+        click.echo('No events to delete.')
+        return
+    if not yes:
+        click.confirm(f'Delete {count} events dated before {before.date()} and everything recorded for them?',
+                      abort=True)
+    
+    # One transaction, so a failure leaves everything in place
+    deleted = delete_events(events)
+    db.session.commit()
+    click.echo(f'Deleted {deleted} events.')
+
+@app.cli.command("run-jobs")
+@click.option("--threads", default=2, show_default=True, help="Worker threads in this process.")
+@click.option("--poll-interval", type=float, help="Seconds between queue checks when idle.")
+@click.option("--burst", is_flag=True, help="Exit once the queue is empty.")
+def run_jobs_command(threads, poll_interval, burst):
+    """Run queued background jobs until stopped."""
+    import signal
+    import threading
+    from app.jobs.runner import run_workers
+    stop = threading.Event()
+    # Finish the running jobs on SIGTERM (e.g. docker stop) rather than abandoning them
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    click.echo(f'Running jobs with {threads} worker threads. Press Ctrl+C to stop.')
+    count = run_workers(app, threads=threads, poll_interval=poll_interval, burst=burst, stop=stop)
+    click.echo(f'Ran {count} jobs.')
+
 if __name__ == '__main__':
     app.run(debug=True)
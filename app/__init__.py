@@ -5,16 +5,50 @@ from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 import os
 from dotenv import load_dotenv
+from app.db_routing import RoutingSession, replica_binds
 
 # Load environment variables
 load_dotenv()
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 csrf = CSRFProtect()
 
+def _env_int(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def engine_options(database_url):
+    """SQLAlchemy engine options from DB_* environment variables.
+    
+    Pool sizing only applies to server databases; SQLite keeps the pool
+    Flask-SQLAlchemy picks for it. Size the pool for the worker mode: each
+    process needs up to ``DB_POOL_SIZE + DB_MAX_OVERFLOW`` connections.
+    """
+    options = {'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'}
+    if database_url.startswith('sqlite'):
+        return options
+    
+    options.update({
+        'pool_size': _env_int('DB_POOL_SIZE', 10),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 10),
+        # Recycle before server-side idle timeouts (and load balancers) drop connections
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+    })
+    
+    statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS')
+    if statement_timeout:
+        if database_url.startswith('postgresql'):
+            options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+        elif database_url.startswith('mysql'):
+            options['connect_args'] = {'init_command': f'SET SESSION max_execution_time={statement_timeout}'}
+    return options
+
+
 def create_app(config=None):
     app = Flask(__name__)
     
@@ -22,12 +56,64 @@ def create_app(config=None):
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///nockpoint.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Score storage for new competitions: 'arrow' (one row per arrow) or 'end' (one packed row per round)
+    app.config['SCORE_STORAGE'] = os.getenv('SCORE_STORAGE', 'arrow')
+    # Month (1-12) in which a league season starts
+    app.config['LEAGUE_SEASON_START_MONTH'] = int(os.getenv('LEAGUE_SEASON_START_MONTH', 1))
+    # Cached user lookups for authentication: max entries and lifetime in seconds
+    app.config['PRINCIPAL_CACHE_SIZE'] = int(os.getenv('PRINCIPAL_CACHE_SIZE', 1024))
+    app.config['PRINCIPAL_CACHE_TTL'] = int(os.getenv('PRINCIPAL_CACHE_TTL', 60))
+    # JSON encoder for API responses: 'auto' (orjson if installed), 'orjson' or 'json'
+    app.config['API_JSON_BACKEND'] = os.getenv('API_JSON_BACKEND', 'auto')
+    # Response compression: text responses of at least COMPRESS_MIN_SIZE bytes with an allowed mimetype
+    from app.compression import COMPRESS_MIMETYPES
+    app.config['COMPRESS_ENABLED'] = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', 500))
+    app.config['COMPRESS_LEVEL'] = int(os.getenv('COMPRESS_LEVEL', 6))
+    app.config['COMPRESS_MIMETYPES'] = set(COMPRESS_MIMETYPES)
+    # Cached template fragments: in-process entries and lifetime, plus an optional shared Redis store
+    app.config['FRAGMENT_CACHE_ENABLED'] = os.getenv('FRAGMENT_CACHE_ENABLED', 'true').lower() == 'true'
+    app.config['FRAGMENT_CACHE_SIZE'] = int(os.getenv('FRAGMENT_CACHE_SIZE', 512))
+    app.config['FRAGMENT_CACHE_TTL'] = int(os.getenv('FRAGMENT_CACHE_TTL', 300))
+    app.config['FRAGMENT_CACHE_URL'] = os.getenv('FRAGMENT_CACHE_URL')
+    # Read replicas for read_replica views, and how long a client reads from the primary after writing
+    app.config['DATABASE_REPLICA_URLS'] = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',')
+                                           if url.strip()]
+    app.config['REPLICA_STICKY_SECONDS'] = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+    # SQLite profile applied on connect (see app/sqlite_profile.py)
+    app.config['SQLITE_TUNING'] = os.getenv('SQLITE_TUNING', 'true').lower() == 'true'
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    app.config['SQLITE_SYNCHRONOUS'] = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    app.config['SQLITE_CACHE_SIZE_KB'] = int(os.getenv('SQLITE_CACHE_SIZE_KB', 20000))
+    app.config['SQLITE_MMAP_SIZE'] = int(os.getenv('SQLITE_MMAP_SIZE', 128 * 1024 * 1024))
+    app.config['SQLITE_FOREIGN_KEYS'] = os.getenv('SQLITE_FOREIGN_KEYS', 'true').lower() == 'true'
+    # Seconds the dashboard/member counters are cached per process
+    app.config['STATS_CACHE_TTL'] = int(os.getenv('STATS_CACHE_TTL', 30))
+    # Seconds a cached form choice list is served before its table versions are checked again
+    app.config['CHOICES_RECHECK_SECONDS'] = int(os.getenv('CHOICES_RECHECK_SECONDS', 30))
+    # Background jobs (see app/jobs/runner.py): run in the request instead of a worker,
+    # attempts, first retry delay, worker poll interval and seconds without a heartbeat before requeueing
+    app.config['JOBS_RUN_INLINE'] = os.getenv('JOBS_RUN_INLINE', 'false').lower() == 'true'
+    app.config['JOB_MAX_ATTEMPTS'] = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    app.config['JOB_RETRY_DELAY'] = int(os.getenv('JOB_RETRY_DELAY', 30))
+    app.config['JOB_POLL_INTERVAL'] = float(os.getenv('JOB_POLL_INTERVAL', 2))
+    app.config['JOB_STALE_SECONDS'] = int(os.getenv('JOB_STALE_SECONDS', 600))
     
     if config:
         app.config.update(config)
     
+    # Connection pool and timeouts, unless set explicitly in the config
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    # Read replicas become replica_<n> binds (see app/db_routing.py)
+    app.config.setdefault('SQLALCHEMY_BINDS', {}).update(
+        replica_binds(app.config['DATABASE_REPLICA_URLS'], engine_options)
+    )
+    
     # Initialize extensions with app
     db.init_app(app)
+    from app import sqlite_profile, db_routing
+    sqlite_profile.init_app(app)
+    db_routing.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
     
@@ -38,6 +124,8 @@ def create_app(config=None):
     from app.members import members_bp
     from app.events import events_bp
     from app.competitions import competitions_bp
+    from app.league import league_bp
+    from app.jobs import jobs_bp
     from app.api import api_bp
     
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -46,12 +134,22 @@ def create_app(config=None):
     app.register_blueprint(members_bp, url_prefix='/members')
     app.register_blueprint(events_bp, url_prefix='/events')
     app.register_blueprint(competitions_bp, url_prefix='/competitions')
+    app.register_blueprint(league_bp, url_prefix='/league')
+    app.register_blueprint(jobs_bp, url_prefix='/jobs')
     app.register_blueprint(api_bp, url_prefix='/api')
     
     # Initialize CSRF and exempt API blueprint
     csrf.init_app(app)
     csrf.exempt(api_bp)
     
+    from app import principal, compression, assets, fragments, club_stats, choices
+    principal.init_app(app)
+    club_stats.init_app(app)
+    choices.init_app(app)
+    compression.init_app(app)
+    assets.init_app(app)
+    fragments.init_app(app)
+    
     # Login manager configuration
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -3,4 +3,4 @@ from flask import Blueprint
 api_bp = Blueprint('api', __name__)
 
 # Import routes after blueprint creation
-from app.api import auth, events, competitions
\ No newline at end of file
+from app.api import auth, events, competitions, league, me, stats, inventory
\ No newline at end of file
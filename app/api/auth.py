@@ -2,8 +2,12 @@ from flask import request, jsonify
 from werkzeug.security import check_password_hash
 from app.api import api_bp
 from app.api.utils import generate_token
+from app.api.serializers import UserSchema, json_response
 from app.models import User
 
+# User fields returned alongside a token
+TOKEN_USER_FIELDS = {'id', 'username', 'email', 'is_admin'}
+
 
 @api_bp.route('/auth/login', methods=['POST'])
 def api_login():
@@ -27,20 +31,18 @@ def api_login():
         
         if not user or not check_password_hash(user.password_hash, password):
             return jsonify({'error': 'Invalid credentials'}), 401
+        
+        if not user.is_active:
+            return jsonify({'error': 'User account is disabled'}), 401
             
         # Generate JWT token
         token = generate_token(user)
         
-        return jsonify({
+        return json_response({
             'token': token,
-            'user': {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'is_admin': user.is_admin()
-            },
+            'user': UserSchema.row(user, only=TOKEN_USER_FIELDS),
             'expires_in': 30 * 24 * 60 * 60  # 30 days in seconds
-        }), 200
+        })
         
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
@@ -54,14 +56,26 @@ def api_verify_token():
     @token_required
     def verify():
         user = get_current_api_user()
-        return jsonify({
+        return json_response({
             'valid': True,
-            'user': {
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'is_admin': user.is_admin()
-            }
-        }), 200
+            'user': UserSchema.row(user, only=TOKEN_USER_FIELDS)
+        })
+    
+    return verify()
+
+
+@api_bp.route('/auth/logout', methods=['POST'])
+def api_logout():
+    """API endpoint to revoke the token used for this request."""
+    from app.api.utils import token_required
+    from app.principal import revoke_token
     
-    return verify()
\ No newline at end of file
+    @token_required
+    def logout():
+        revoke_token(request.token_payload)
+        return jsonify({'message': 'Token revoked'}), 200
+    
+    try:
+        return logout()
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
@@ -1,69 +1,101 @@
-from flask import request, jsonify
+from flask import request, jsonify, make_response
 from datetime import datetime
+from sqlalchemy.orm import contains_eager
 from app.api import api_bp
-from app.api.utils import token_required, get_current_api_user
-from app.models import Competition, CompetitionRegistration, ArrowScore, ShootingEvent, db
+from app.api.utils import token_required, get_current_api_user, versioned
+from app.db_routing import read_replica
+from app.api.pagination import keyset_page, parse_fields, upcoming_first, ListParamError
+from app.api.serializers import CompetitionSchema, ArrowScoreSchema, json_response
+from app.models import (Competition, CompetitionRegistration, ShootingEvent,
+                        CompetitionResultSnapshot, db)
+from app.competitions.results import build_results
+from app.competitions.statistics import competition_statistics
+from app.sqlite_profile import write_with_retry
+
+
+def _today(**kwargs):
+    """Score submission opens on the event date, so the date is part of the version"""
+    return datetime.now().date().isoformat()
+
+
+def _competition_version(competition_id):
+    """Per-competition part of the detail ETag; results_version covers the user's scores"""
+    results_version = db.session.execute(
+        db.select(Competition.results_version).where(Competition.id == competition_id)
+    ).scalar()
+    return _today(), results_version
+
+
+# Fields of the competition list; registration fields are only computed when requested
+COMPETITION_LIST_FIELDS = ('id', 'name', 'description', 'start_date', 'end_date', 'location',
+                           'competition_type', 'status', 'max_participants', 'registration_deadline',
+                           'user_registered', 'user_can_submit_scores')
+
+COMPETITION_ORDERINGS = {
+    'upcoming': lambda: upcoming_first(ShootingEvent.date, ShootingEvent.start_time, Competition.id),
+    'date': (ShootingEvent.date, ShootingEvent.start_time, Competition.id),
+    'status': (Competition.status, Competition.id),
+}
 
 
 @api_bp.route('/competitions', methods=['GET'])
 @token_required
+@read_replica
+@versioned('shooting_event', 'competition', 'competition_registration', extra=_today)
 def api_list_competitions():
-    """API endpoint to list all competitions."""
+    """API endpoint to list competitions, a page at a time.
+    
+    Supports ``order`` (upcoming, date, status; prefix - to reverse), ``limit``,
+    ``cursor`` (the ``next_cursor`` of the previous page) and ``fields`` (comma
+    separated). The default, upcoming, lists the next competitions first and
+    past ones after them. ``total`` counts the matches on all pages.
+    """
     try:
         user = get_current_api_user()
+        fields = parse_fields(COMPETITION_LIST_FIELDS)
         
         # Get query parameters for filtering
         upcoming_only = request.args.get('upcoming_only', 'false').lower() == 'true'
+        status = request.args.get('status')
         
         # Start with base query joining with ShootingEvent
-        query = Competition.query.join(ShootingEvent)
+        query = Competition.query.join(ShootingEvent).options(contains_eager(Competition.event))
         
         if upcoming_only:
             query = query.filter(ShootingEvent.date >= datetime.now().date())
+        
+        if status:
+            query = query.filter(Competition.status == status)
             
-        # Order by start date
-        competitions = query.order_by(ShootingEvent.date).all()
-        
-        # Format competitions for API response
-        competitions_data = []
-        for comp in competitions:
-            # Check if user is registered
-            registration = CompetitionRegistration.query.filter_by(
-                competition_id=comp.id,
-                member_id=user.id
-            ).first()
-            
-            comp_data = {
-                'id': comp.id,
-                'name': comp.event.name,  # Get name from linked event
-                'description': comp.event.description,  # Get description from linked event
-                'start_date': comp.event.date.isoformat(),
-                'end_date': comp.event.date.isoformat(),  # Single day event
-                'location': comp.event.location,
-                'competition_type': 'archery',  # Fixed type for now
-                'status': comp.status,
-                'max_participants': comp.event.max_participants,
-                'registration_deadline': None,  # Not implemented in model
-                'user_registered': registration is not None,
-                'user_can_submit_scores': (
-                    registration is not None and 
-                    comp.status in ['registration_open', 'in_progress'] and
-                    comp.event.date <= datetime.now().date()
-                )
+        total = query.count()
+        competitions, next_cursor = keyset_page(query, COMPETITION_ORDERINGS, 'upcoming')
+        
+        # One query for the user's registrations on this page, only when needed
+        registered_ids = set()
+        if fields & {'user_registered', 'user_can_submit_scores'} and competitions:
+            registered_ids = {
+                row.competition_id for row in db.session.query(CompetitionRegistration.competition_id).filter(
+                    CompetitionRegistration.competition_id.in_([comp.id for comp in competitions]),
+                    CompetitionRegistration.member_id == user.id
+                ).all()
             }
-            competitions_data.append(comp_data)
         
-        return jsonify({
-            'competitions': competitions_data,
-            'total': len(competitions_data)
-        }), 200
+        context = {'registered_ids': registered_ids, 'today': datetime.now().date()}
+        competitions_data = CompetitionSchema.many(competitions, context, only=fields)
+        
+        return json_response({'competitions': competitions_data, 'total': total, 'next_cursor': next_cursor})
         
+    except ListParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
 
 @api_bp.route('/competitions/<int:competition_id>', methods=['GET'])
 @token_required
+@read_replica
+@versioned('shooting_event', 'competition', 'competition_group', 'competition_registration',
+           extra=_competition_version)
 def api_get_competition(competition_id):
     """API endpoint to get details of a specific competition."""
     try:
@@ -80,18 +112,9 @@ def api_get_competition(competition_id):
         # Get user's scores if registered
         user_scores = []
         if registration:
-            scores = ArrowScore.query.filter_by(
-                competition_registration_id=registration.id
-            ).order_by(ArrowScore.round_number, ArrowScore.arrow_number).all()
-            
-            for score in scores:
-                user_scores.append({
-                    'id': score.id,
-                    'round_number': score.round_number,
-                    'arrow_number': score.arrow_number,
-                    'score': score.score,
-                    'is_x': score.is_x
-                })
+            user_scores = ArrowScoreSchema.many(
+                registration.arrow_values, {'arrows_per_round': competition.arrows_per_round}
+            )
         
         # Get groups if any
         groups = []
@@ -102,31 +125,74 @@ def api_get_competition(competition_id):
                 'description': group.description
             })
         
-        comp_data = {
-            'id': competition.id,
-            'name': competition.event.name,
-            'description': competition.event.description,
-            'start_date': competition.event.date.isoformat(),
-            'end_date': competition.event.date.isoformat(),  # Single day event
-            'location': competition.event.location,
-            'competition_type': 'archery',  # Fixed type
-            'status': competition.status,
-            'max_participants': competition.event.max_participants,
-            'rounds': competition.number_of_rounds,
-            'arrows_per_round': competition.arrows_per_round,
-            'scoring_type': 'points',  # Assuming points scoring
-            'registration_deadline': None,  # Not implemented
-            'user_registered': registration is not None,
-            'user_can_submit_scores': (
-                registration is not None and 
-                competition.status in ['registration_open', 'in_progress'] and
-                competition.event.date <= datetime.now().date()
-            ),
-            'user_scores': user_scores,
-            'groups': groups
+        context = {
+            'registered_ids': {competition.id} if registration else set(),
+            'today': datetime.now().date()
         }
+        comp_data = CompetitionSchema.row(competition, context).to_dict()
+        comp_data['user_scores'] = user_scores
+        comp_data['groups'] = groups
+        
+        return json_response(comp_data)
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@api_bp.route('/competitions/<int:competition_id>/results', methods=['GET'])
+@token_required
+@read_replica
+def api_get_competition_results(competition_id):
+    """API endpoint to get rankings, round breakdowns and team standings.
+    
+    Completed competitions are served straight from their frozen snapshot with an
+    ETag, so unchanged results cost one indexed read and a 304.
+    """
+    try:
+        snapshot = CompetitionResultSnapshot.query.filter_by(competition_id=competition_id).first()
+        if snapshot:
+            # Weak comparison, as compression turns the ETag of the compressed response weak
+            if request.if_none_match.contains_weak(snapshot.etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(snapshot.json_bytes)
+                response.mimetype = 'application/json'
+            response.set_etag(snapshot.etag)
+            return response
         
-        return jsonify(comp_data), 200
+        # Served from a replica, so this only reads: competitions completed before
+        # snapshots existed are frozen by `flask backfill-snapshots`
+        competition = Competition.query.get_or_404(competition_id)
+        return jsonify(build_results(competition)), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@api_bp.route('/competitions/<int:competition_id>/statistics', methods=['GET'])
+@token_required
+@read_replica
+def api_get_competition_statistics(competition_id):
+    """API endpoint to get per-archer, group, team and overall score statistics.
+    
+    Statistics are cached per results version, which also serves as the ETag.
+    """
+    try:
+        snapshot = CompetitionResultSnapshot.query.filter_by(competition_id=competition_id).first()
+        if snapshot:
+            version = snapshot.etag
+        else:
+            competition = Competition.query.get_or_404(competition_id)
+            version = competition.results_version
+        
+        etag = f'stats-{competition_id}-{version}'
+        # Weak comparison, as compression turns the ETag of the compressed response weak
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = jsonify(competition_statistics(competition_id, version))
+        response.set_etag(etag)
+        return response
         
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
@@ -183,34 +249,11 @@ def api_submit_score(competition_id):
         if score < 0 or score > 10:
             return jsonify({'error': 'Score must be between 0 and 10'}), 400
         
-        # Check if score already exists for this arrow
-        existing_score = ArrowScore.query.filter_by(
-            competition_registration_id=registration.id,
-            round_number=round_number,
-            arrow_number=arrow_number
-        ).first()
-        
-        if existing_score:
-            # Update existing score
-            existing_score.score = score
-            existing_score.is_x = is_x
-        else:
-            # Create new score
-            arrow_score = ArrowScore(
-                competition_registration_id=registration.id,
-                round_number=round_number,
-                arrow_number=arrow_number,
-                score=score,
-                is_x=is_x
-            )
-            db.session.add(arrow_score)
-        
-        db.session.commit()
+        # Create or update the score in the competition's storage format
+        write_with_retry(lambda: registration.record_arrow(round_number, arrow_number, score, is_x, user.id))
         
         # Calculate total score for response
-        total_score = db.session.query(db.func.sum(ArrowScore.score)).filter_by(
-            competition_registration_id=registration.id
-        ).scalar() or 0
+        total_score = registration.total_score
         
         return jsonify({
             'message': 'Score submitted successfully',
@@ -261,7 +304,7 @@ def api_submit_scores_batch(competition_id):
         
         submitted_scores = []
         
-        # Process each score
+        # Validate every score before writing any, so the write transaction stays short
         for score_data in scores_data:
             # Validate required fields
             required_fields = ['round_number', 'arrow_number', 'score']
@@ -285,28 +328,6 @@ def api_submit_scores_batch(competition_id):
             if score < 0 or score > 10:
                 return jsonify({'error': 'Score must be between 0 and 10'}), 400
             
-            # Check if score already exists for this arrow
-            existing_score = ArrowScore.query.filter_by(
-                competition_registration_id=registration.id,
-                round_number=round_number,
-                arrow_number=arrow_number
-            ).first()
-            
-            if existing_score:
-                # Update existing score
-                existing_score.score = score
-                existing_score.is_x = is_x
-            else:
-                # Create new score
-                arrow_score = ArrowScore(
-                    competition_registration_id=registration.id,
-                    round_number=round_number,
-                    arrow_number=arrow_number,
-                    score=score,
-                    is_x=is_x
-                )
-                db.session.add(arrow_score)
-            
             submitted_scores.append({
                 'round_number': round_number,
                 'arrow_number': arrow_number,
@@ -314,12 +335,17 @@ def api_submit_scores_batch(competition_id):
                 'is_x': is_x
             })
         
-        db.session.commit()
+        def record_scores():
+            # Create or update the scores in the competition's storage format
+            for entry in submitted_scores:
+                registration.record_arrow(entry['round_number'], entry['arrow_number'],
+                                          entry['score'], entry['is_x'], user.id)
+                db.session.flush()
+        
+        write_with_retry(record_scores)
         
         # Calculate total score for response
-        total_score = db.session.query(db.func.sum(ArrowScore.score)).filter_by(
-            competition_registration_id=registration.id
-        ).scalar() or 0
+        total_score = registration.total_score
         
         return jsonify({
             'message': f'Successfully submitted {len(submitted_scores)} scores',
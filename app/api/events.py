@@ -1,16 +1,89 @@
 from flask import request, jsonify
 from datetime import datetime
 from app.api import api_bp
-from app.api.utils import token_required, get_current_api_user
+from app.api.utils import token_required, get_current_api_user, versioned
+from app.db_routing import read_replica
+from app.api.pagination import keyset_page, parse_fields, upcoming_first, ListParamError
+from app.api.serializers import EventSchema, json_response
 from app.models import ShootingEvent, EventAttendance, BeginnersStudent, db
 
 
+def _event_clock(**kwargs):
+    """Time-dependent part of the event ETags.
+    
+    Registration flags flip when an event starts and date filters move at
+    midnight, so both are part of the version.
+    """
+    now = datetime.now()
+    started = db.session.query(db.func.count(ShootingEvent.id)).filter(
+        (ShootingEvent.date < now.date()) |
+        ((ShootingEvent.date == now.date()) & (ShootingEvent.start_time <= now.time()))
+    ).scalar()
+    return now.date().isoformat(), started
+
+
+# Fields of the event list; capacity and registration fields are only computed when requested
+EVENT_LIST_FIELDS = ('id', 'title', 'description', 'event_date', 'event_type', 'location',
+                     'max_participants', 'available_spots', 'is_free', 'charge_amount',
+                     'user_registered', 'user_attended', 'registration_open', 'can_register')
+
+EVENT_ORDERINGS = {
+    'upcoming': lambda: upcoming_first(ShootingEvent.date, ShootingEvent.start_time, ShootingEvent.id),
+    'date': (ShootingEvent.date, ShootingEvent.start_time, ShootingEvent.id),
+    'title': (ShootingEvent.name, ShootingEvent.id),
+}
+
+
+def _count_by_event(column, event_ids):
+    return dict(db.session.query(column, db.func.count()).filter(
+        column.in_(event_ids)
+    ).group_by(column).all())
+
+
+def event_rows(events, user, fields=None):
+    """Serialize a page of events for a user, batching the per-event lookups.
+    
+    Capacity counts and the user's attendances are fetched with one query each,
+    and only when a requested field needs them.
+    """
+    fields = set(fields or EVENT_LIST_FIELDS)
+    event_ids = [event.id for event in events]
+    
+    needs_capacity = bool(fields & {'available_spots', 'can_register'})
+    needs_attendance = bool(fields & {'user_registered', 'user_attended', 'can_register'})
+    context = {
+        'now': datetime.now(),
+        'registered_counts': _count_by_event(EventAttendance.event_id, event_ids) if needs_capacity else {},
+        'beginners_counts': _count_by_event(BeginnersStudent.event_id, event_ids) if needs_capacity else {},
+        'attendances': {}
+    }
+    if needs_attendance and event_ids:
+        context['attendances'] = {
+            attendance.event_id: attendance
+            for attendance in EventAttendance.query.filter(
+                EventAttendance.event_id.in_(event_ids),
+                EventAttendance.member_id == user.id
+            ).all()
+        }
+    
+    return EventSchema.many(events, context, only=fields)
+
+
 @api_bp.route('/events', methods=['GET'])
 @token_required
+@read_replica
+@versioned('shooting_event', 'event_attendance', 'beginners_student', extra=_event_clock)
 def api_list_events():
-    """API endpoint to list all events."""
+    """API endpoint to list events, a page at a time.
+    
+    Supports ``order`` (upcoming, date, title; prefix - to reverse), ``limit``,
+    ``cursor`` (the ``next_cursor`` of the previous page) and ``fields`` (comma
+    separated). The default, upcoming, lists the next events first and past
+    events after them. ``total`` counts the matching events on all pages.
+    """
     try:
         user = get_current_api_user()
+        fields = parse_fields(EVENT_LIST_FIELDS)
         
         # Get query parameters for filtering
         event_type = request.args.get('type')  # regular, competition, beginners_course
@@ -42,58 +115,22 @@ def api_list_events():
         if upcoming_only:
             query = query.filter(ShootingEvent.date >= datetime.now().date())
             
-        # Order by event date
-        events = query.order_by(ShootingEvent.date).all()
-        
-        # Format events for API response
-        events_data = []
-        for event in events:
-            # Check if user is already registered
-            attendance = EventAttendance.query.filter_by(
-                event_id=event.id,
-                member_id=user.id
-            ).first()
-            
-            # Calculate available spots
-            total_registered = event.attendance_count
-            beginners_count = BeginnersStudent.query.filter_by(event_id=event.id).count()
-            available_spots = None
-            if event.max_participants:
-                available_spots = event.max_participants - total_registered - beginners_count
-            
-            event_data = {
-                'id': event.id,
-                'title': event.name,  # API uses 'title' for consistency
-                'description': event.description,
-                'event_date': datetime.combine(event.date, event.start_time).isoformat(),
-                'event_type': event.event_type,
-                'location': event.location,
-                'max_participants': event.max_participants,
-                'available_spots': available_spots,
-                'is_free': event.is_free_event,
-                'charge_amount': None,  # ShootingEvent doesn't have charge_amount in this model
-                'user_registered': attendance is not None,
-                'user_attended': attendance.attended if attendance else False,
-                'registration_open': datetime.combine(event.date, event.start_time) > datetime.now(),
-                'can_register': (
-                    datetime.combine(event.date, event.start_time) > datetime.now() and 
-                    (available_spots is None or available_spots > 0) and
-                    attendance is None
-                )
-            }
-            events_data.append(event_data)
+        total = query.count()
+        events, next_cursor = keyset_page(query, EVENT_ORDERINGS, 'upcoming')
+        events_data = event_rows(events, user, fields)
         
-        return jsonify({
-            'events': events_data,
-            'total': len(events_data)
-        }), 200
+        return json_response({'events': events_data, 'total': total, 'next_cursor': next_cursor})
         
+    except ListParamError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
 
 @api_bp.route('/events/<int:event_id>', methods=['GET'])
 @token_required
+@read_replica
+@versioned('shooting_event', 'event_attendance', 'beginners_student', 'user', extra=_event_clock)
 def api_get_event(event_id):
     """API endpoint to get details of a specific event."""
     try:
@@ -101,22 +138,9 @@ def api_get_event(event_id):
         
         event = ShootingEvent.query.get_or_404(event_id)
         
-        # Check if user is already registered
-        attendance = EventAttendance.query.filter_by(
-            event_id=event.id,
-            member_id=user.id
-        ).first()
-        
-        # Calculate available spots
-        total_registered = event.attendance_count
-        beginners_count = BeginnersStudent.query.filter_by(event_id=event.id).count()
-        available_spots = None
-        if event.max_participants:
-            available_spots = event.max_participants - total_registered - beginners_count
-        
         # Get participants list
         participants = []
-        for participant in event.attendees:
+        for participant in event.attendances:
             participants.append({
                 'id': participant.member.id,
                 'name': f"{participant.member.first_name} {participant.member.last_name}",
@@ -135,30 +159,11 @@ def api_get_event(event_id):
                     'phone': student.phone
                 })
         
-        event_data = {
-            'id': event.id,
-            'title': event.name,  # API uses 'title' for consistency
-            'description': event.description,
-            'event_date': datetime.combine(event.date, event.start_time).isoformat(),
-            'event_type': event.event_type,
-            'location': event.location,
-            'max_participants': event.max_participants,
-            'available_spots': available_spots,
-            'is_free': event.is_free_event,
-            'charge_amount': None,  # ShootingEvent doesn't have charge_amount in this model
-            'user_registered': attendance is not None,
-            'user_attended': attendance.attended if attendance else False,
-            'registration_open': datetime.combine(event.date, event.start_time) > datetime.now(),
-            'can_register': (
-                datetime.combine(event.date, event.start_time) > datetime.now() and 
-                (available_spots is None or available_spots > 0) and
-                attendance is None
-            ),
-            'participants': participants,
-            'students': students
-        }
+        event_data = event_rows([event], user)[0].to_dict()
+        event_data['participants'] = participants
+        event_data['students'] = students
         
-        return jsonify(event_data), 200
+        return json_response(event_data)
         
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
@@ -0,0 +1,49 @@
+from flask import request, jsonify
+from app.api import api_bp
+from app.api.utils import token_required, versioned
+from app.db_routing import read_replica
+from app.api.pagination import keyset_page, parse_fields, ListParamError
+from app.api.serializers import InventoryItemSchema, json_response
+from app.inventory.filters import parse_filters, apply_filters, FilterError
+from app.models import InventoryItem, InventoryCategory, db
+
+INVENTORY_LIST_FIELDS = tuple(InventoryItemSchema.fields)
+
+INVENTORY_ORDERINGS = {
+    'name': (InventoryItem.name, InventoryItem.id),
+    'id': (InventoryItem.id,),
+}
+
+
+@api_bp.route('/inventory', methods=['GET'])
+@token_required
+@read_replica
+@versioned('inventory_item', 'inventory_category')
+def api_list_inventory():
+    """API endpoint to list inventory items, a page at a time.
+    
+    Supports ``category`` (id), the equipment spec filters of
+    app/inventory/filters.py (``draw_weight_min=20&handedness=right``),
+    ``order`` (name, id), ``limit``, ``cursor`` and ``fields``. ``total``
+    counts the matching items on all pages.
+    """
+    try:
+        fields = parse_fields(INVENTORY_LIST_FIELDS)
+        
+        query = InventoryItem.query
+        category_id = request.args.get('category', type=int)
+        if category_id:
+            query = query.filter(InventoryItem.category_id == category_id)
+        query = apply_filters(query, parse_filters(request.args))
+        
+        total = query.count()
+        items, next_cursor = keyset_page(query, INVENTORY_ORDERINGS, 'name')
+        context = {'categories': dict(db.session.query(InventoryCategory.id, InventoryCategory.name).all())}
+        items_data = InventoryItemSchema.many(items, context, only=fields)
+        
+        return json_response({'items': items_data, 'total': total, 'next_cursor': next_cursor})
+        
+    except (ListParamError, FilterError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
@@ -0,0 +1,94 @@
+from flask import request, jsonify
+from app.api import api_bp
+from app.api.utils import token_required
+from app.db_routing import read_replica
+from app.league import league_table_query, available_seasons, LEAGUE_SORTS
+from app.league.rollups import season_label
+from app.models import ClubRecord
+
+
+@api_bp.route('/league/<int:season>', methods=['GET'])
+@token_required
+@read_replica
+def api_league_table(season):
+    """API endpoint for a paginated season league table."""
+    try:
+        sort = request.args.get('sort', 'best')
+        if sort not in LEAGUE_SORTS:
+            return jsonify({'error': f'sort must be one of: {", ".join(LEAGUE_SORTS)}'}), 400
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 25, type=int), 100)
+        
+        rollups = league_table_query(season, sort).paginate(page=page, per_page=per_page, error_out=False)
+        
+        standings = []
+        for rank, rollup in enumerate(rollups.items, start=(rollups.page - 1) * rollups.per_page + 1):
+            standings.append({
+                'rank': rank,
+                'member_id': rollup.member_id,
+                'name': f"{rollup.member.first_name} {rollup.member.last_name}",
+                'competitions_shot': rollup.competitions_shot,
+                'best_score': rollup.best_score,
+                'average_score': round(rollup.average_score, 2),
+                'average_per_arrow': round(rollup.average_per_arrow, 3),
+                'x_count': rollup.x_count
+            })
+        
+        return jsonify({
+            'season': season,
+            'season_label': season_label(season),
+            'seasons': available_seasons(),
+            'sort': sort,
+            'standings': standings,
+            'page': rollups.page,
+            'pages': rollups.pages,
+            'total': rollups.total
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+def _record_dict(record):
+    return {
+        'number_of_rounds': record.number_of_rounds,
+        'arrows_per_round': record.arrows_per_round,
+        'target_size_cm': record.target_size_cm,
+        'group_name': record.group_name,
+        'member_id': record.member_id,
+        'name': f"{record.member.first_name} {record.member.last_name}",
+        'competition_id': record.competition_id,
+        'score': record.score,
+        'x_count': record.x_count,
+        'set_on': record.set_on.isoformat()
+    }
+
+
+@api_bp.route('/league/records', methods=['GET'])
+@token_required
+@read_replica
+def api_club_records():
+    """API endpoint for club records.
+    
+    With rounds, arrows, target_size_cm and group all given, returns the single
+    record for that format and group (or null); otherwise lists all records.
+    """
+    try:
+        key = (
+            request.args.get('rounds', type=int),
+            request.args.get('arrows', type=int),
+            request.args.get('target_size_cm', type=int),
+            request.args.get('group')
+        )
+        if all(value is not None for value in key):
+            record = ClubRecord.lookup(*key)
+            return jsonify({'record': _record_dict(record) if record else None}), 200
+        
+        records = ClubRecord.query.order_by(
+            ClubRecord.target_size_cm, ClubRecord.number_of_rounds,
+            ClubRecord.arrows_per_round, ClubRecord.group_name
+        ).all()
+        return jsonify({'records': [_record_dict(record) for record in records]}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
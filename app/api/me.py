@@ -0,0 +1,98 @@
+from flask import jsonify
+from datetime import datetime
+from sqlalchemy.orm import contains_eager, selectinload
+from app.api import api_bp
+from app.api.utils import token_required, get_current_api_user, versioned
+from app.db_routing import read_replica
+from app.api.events import event_rows
+from app.api.serializers import CompetitionSchema, ArrowScoreSchema, UserSchema, json_response
+from app.models import ShootingEvent, Competition, CompetitionRegistration, MemberCharge, db
+
+BOOTSTRAP_EVENT_LIMIT = 20
+ACTIVE_COMPETITION_STATUSES = ('registration_open', 'in_progress')
+BOOTSTRAP_COMPETITION_FIELDS = {'id', 'name', 'start_date', 'location', 'status', 'rounds',
+                                'arrows_per_round', 'user_registered', 'user_can_submit_scores'}
+
+
+def _bootstrap_version(**kwargs):
+    """Scores only bump their competition's results_version, so include those of active competitions"""
+    rows = db.session.execute(
+        db.select(Competition.id, Competition.results_version).where(
+            Competition.status.in_(ACTIVE_COMPETITION_STATUSES)
+        ).order_by(Competition.id)
+    ).all()
+    return datetime.now().date().isoformat(), tuple(tuple(row) for row in rows)
+
+
+def _competition_rows(user, today):
+    """Active competitions with the user's registration and scores, in three queries"""
+    competitions = Competition.query.join(ShootingEvent).options(
+        contains_eager(Competition.event)
+    ).filter(
+        Competition.status.in_(ACTIVE_COMPETITION_STATUSES)
+    ).order_by(ShootingEvent.date, Competition.id).all()
+    
+    registrations = {}
+    if competitions:
+        registrations = {
+            registration.competition_id: registration
+            for registration in CompetitionRegistration.query.filter(
+                CompetitionRegistration.competition_id.in_([comp.id for comp in competitions]),
+                CompetitionRegistration.member_id == user.id
+            ).options(
+                selectinload(CompetitionRegistration.arrow_scores),
+                selectinload(CompetitionRegistration.end_scores)
+            ).all()
+        }
+    
+    context = {'registered_ids': set(registrations), 'today': today}
+    competitions_data = []
+    for comp in competitions:
+        data = CompetitionSchema.row(comp, context, only=BOOTSTRAP_COMPETITION_FIELDS).to_dict()
+        registration = registrations.get(comp.id)
+        arrows = registration.arrow_values if registration else []
+        data['user_total_score'] = sum(arrow.points for arrow in arrows)
+        data['user_scores'] = ArrowScoreSchema.many(arrows, {'arrows_per_round': comp.arrows_per_round})
+        competitions_data.append(data)
+    return competitions_data
+
+
+@api_bp.route('/me/bootstrap', methods=['GET'])
+@token_required
+@read_replica
+@versioned('user', 'shooting_event', 'event_attendance', 'beginners_student', 'competition',
+           'competition_registration', 'member_charge', extra=_bootstrap_version)
+def api_bootstrap():
+    """API endpoint returning everything the mobile app needs on launch.
+    
+    Profile, upcoming events with registration state, active competitions with
+    the caller's scores and the outstanding charge total, from a fixed number
+    of batched queries.
+    """
+    try:
+        user = get_current_api_user()
+        today = datetime.now().date()
+        
+        events = ShootingEvent.query.filter(ShootingEvent.date >= today).order_by(
+            ShootingEvent.date, ShootingEvent.start_time, ShootingEvent.id
+        ).limit(BOOTSTRAP_EVENT_LIMIT).all()
+        
+        outstanding_total, outstanding_count = db.session.query(
+            db.func.coalesce(db.func.sum(MemberCharge.amount), 0), db.func.count(MemberCharge.id)
+        ).filter(
+            MemberCharge.member_id == user.id,
+            db.or_(MemberCharge.is_paid.is_(False), MemberCharge.is_paid.is_(None))
+        ).one()
+        
+        return json_response({
+            'user': UserSchema.row(user),
+            'upcoming_events': event_rows(events, user),
+            'active_competitions': _competition_rows(user, today),
+            'charges': {
+                'outstanding_total': float(outstanding_total),
+                'outstanding_count': outstanding_count
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
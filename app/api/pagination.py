@@ -0,0 +1,109 @@
+"""Cursor pagination, ordering and sparse fieldsets for API list endpoints."""
+import base64
+import json
+from datetime import date, time, datetime
+from flask import request
+from sqlalchemy import case, tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class ListParamError(ValueError):
+    """Invalid list parameter; the message is safe to return to the client"""
+
+
+def parse_fields(allowed):
+    """Get the set of requested fields from ``fields=a,b,c`` (all fields if omitted)"""
+    raw = request.args.get('fields')
+    if not raw:
+        return set(allowed)
+    fields = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = fields - set(allowed)
+    if unknown:
+        raise ListParamError(f'Unknown fields: {", ".join(sorted(unknown))}. '
+                             f'Allowed: {", ".join(allowed)}')
+    return fields
+
+
+def parse_limit():
+    limit = request.args.get('limit', DEFAULT_LIMIT, type=int)
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def upcoming_first(date_column, *columns):
+    """Key columns putting rows dated today or later first, soonest first, then past rows"""
+    past = case((date_column < datetime.now().date(), 1), else_=0)
+    return (past, date_column, *columns)
+
+
+def parse_order(orderings, default):
+    """Get (name, columns, descending) for ``order=`` from a dict of name -> key columns.
+
+    A leading ``-`` reverses the order. The key columns must end with a unique
+    column (the primary key) so the cursor is unambiguous. Key columns that
+    depend on the request (e.g. today's date) can be given as a callable.
+    """
+    raw = request.args.get('order', default)
+    name = raw.lstrip('-')
+    if name not in orderings:
+        raise ListParamError(f'order must be one of: {", ".join(orderings)} (prefix with - to reverse)')
+    columns = orderings[name]
+    if callable(columns):
+        columns = columns()
+    return raw, columns, raw.startswith('-')
+
+
+def _encode_value(value):
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(column, value):
+    python_type = column.type.python_type
+    if value is not None and python_type in (date, time, datetime):
+        return python_type.fromisoformat(value)
+    return value
+
+
+def encode_cursor(order, values):
+    payload = json.dumps({'o': order, 'k': [_encode_value(v) for v in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, order, columns):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload['o'] != order or len(payload['k']) != len(columns):
+            raise ValueError
+        return [_decode_value(column, value) for column, value in zip(columns, payload['k'])]
+    except (ValueError, KeyError, TypeError):
+        raise ListParamError('Invalid cursor for this ordering')
+
+
+def keyset_page(query, orderings, default_order):
+    """Apply ``order=``, ``cursor=`` and ``limit=`` to a query using keyset pagination.
+
+    Returns (items, next_cursor); ``next_cursor`` is None on the last page.
+    Raises ListParamError for invalid parameters.
+    """
+    order, columns, descending = parse_order(orderings, default_order)
+    limit = parse_limit()
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        key = tuple_(*columns)
+        values = tuple_(*decode_cursor(cursor, order, columns))
+        query = query.filter(key < values if descending else key > values)
+
+    query = query.order_by(*[column.desc() if descending else column for column in columns])
+    # Select the key columns alongside each item so the cursor works for joined orderings too
+    rows = query.add_columns(*columns).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(order, list(rows[-1][1:]))
+    return [row[0] for row in rows], next_cursor
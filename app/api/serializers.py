@@ -0,0 +1,234 @@
+"""Declarative JSON shapes for API responses.
+
+Each schema declares its output keys once, mapping them to an attribute path
+(``'event.name'``) or to a callable taking ``(obj, context)``. Rows are slotted
+dataclasses, which orjson encodes natively. Dates and decimals are converted
+by the encoder in one place instead of per field.
+
+The encoder uses orjson when it is installed (``API_JSON_BACKEND=auto``, the
+default), or the standard library ``json`` module otherwise.
+"""
+import json
+from dataclasses import make_dataclass
+from datetime import date, datetime, time
+from decimal import Decimal
+from operator import attrgetter
+from flask import Response, current_app
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up
+    orjson = None
+
+
+class Row:
+    """Base class for schema rows"""
+    __slots__ = ()
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def value_of(obj, name):
+    """Read an attribute, taking loaded column values straight from the instance dict.
+
+    Going through the ORM attribute machinery dominates serialization time;
+    unloaded attributes and plain objects fall back to getattr.
+    """
+    try:
+        return obj.__dict__[name]
+    except (KeyError, AttributeError):
+        return getattr(obj, name)
+
+
+def _getter(source):
+    if callable(source):
+        return source
+    if '.' in source:
+        get = attrgetter(source)
+        return lambda obj, context: get(obj)
+    return lambda obj, context: value_of(obj, source)
+
+
+class Schema:
+    """Output shape of one kind of object.
+
+    Subclasses set ``fields``, a dict of output key to source, and may override
+    ``prepare`` to compute values shared by several fields once per object.
+    ``only`` limits a dump to some keys; the other sources are never evaluated.
+    """
+    fields = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.getters = {name: _getter(source) for name, source in cls.fields.items()}
+        cls._plans = {}
+
+    @classmethod
+    def prepare(cls, obj, context):
+        """Get the context passed to this object's field callables"""
+        return context
+
+    @classmethod
+    def _plan(cls, only):
+        key = None if only is None else frozenset(only)
+        plan = cls._plans.get(key)
+        if plan is None:
+            names = [name for name in cls.fields if key is None or name in key]
+            row_class = make_dataclass(f'{cls.__name__}Row', names, bases=(Row,), slots=True)
+            plan = cls._plans[key] = (row_class, [cls.getters[name] for name in names])
+        return plan
+
+    @classmethod
+    def row(cls, obj, context=None, only=None):
+        return cls.many([obj], context, only)[0]
+
+    @classmethod
+    def many(cls, objects, context=None, only=None):
+        row_class, getters = cls._plan(only)
+        prepare = cls.prepare
+        rows = []
+        for obj in objects:
+            obj_context = prepare(obj, context)
+            rows.append(row_class(*[get(obj, obj_context) for get in getters]))
+        return rows
+
+
+class UserSchema(Schema):
+    fields = {
+        'id': 'id',
+        'username': 'username',
+        'email': 'email',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'membership_type': 'membership_type',
+        'is_admin': lambda user, context: user.is_admin(),
+    }
+
+
+class EventSchema(Schema):
+    """Events; per-user and capacity fields read batched lookups from the context"""
+    fields = {
+        'id': 'id',
+        'title': 'name',  # API uses 'title' for consistency
+        'description': 'description',
+        'event_date': lambda event, context: context['starts_at'],
+        'event_type': 'event_type',
+        'location': 'location',
+        'max_participants': 'max_participants',
+        'available_spots': lambda event, context: context['available_spots'],
+        'is_free': 'is_free_event',
+        'charge_amount': lambda event, context: None,  # ShootingEvent doesn't have charge_amount
+        'user_registered': lambda event, context: context['attendance'] is not None,
+        'user_attended': lambda event, context: (
+            context['attendance'].attended if context['attendance'] else False
+        ),
+        'registration_open': lambda event, context: context['starts_at'] > context['now'],
+        'can_register': lambda event, context: (
+            context['starts_at'] > context['now'] and
+            (context['available_spots'] is None or context['available_spots'] > 0) and
+            context['attendance'] is None
+        ),
+    }
+
+    @classmethod
+    def prepare(cls, event, context):
+        event_id = value_of(event, 'id')
+        max_participants = value_of(event, 'max_participants')
+        available_spots = None
+        if max_participants:
+            available_spots = (max_participants - context['registered_counts'].get(event_id, 0)
+                               - context['beginners_counts'].get(event_id, 0))
+        return {
+            'now': context['now'],
+            'starts_at': datetime.combine(value_of(event, 'date'), value_of(event, 'start_time')),
+            'available_spots': available_spots,
+            'attendance': context['attendances'].get(event_id)
+        }
+
+
+def _registered(competition, context):
+    return competition.id in context['registered_ids']
+
+
+class CompetitionSchema(Schema):
+    """Competitions; the ids the caller is registered for are read from the context"""
+    fields = {
+        'id': 'id',
+        'name': 'event.name',
+        'description': 'event.description',
+        'start_date': 'event.date',
+        'end_date': 'event.date',  # Single day event
+        'location': 'event.location',
+        'competition_type': lambda competition, context: 'archery',  # Fixed type for now
+        'status': 'status',
+        'max_participants': 'event.max_participants',
+        'rounds': 'number_of_rounds',
+        'arrows_per_round': 'arrows_per_round',
+        'scoring_type': lambda competition, context: 'points',
+        'registration_deadline': lambda competition, context: None,  # Not implemented in model
+        'user_registered': _registered,
+        'user_can_submit_scores': lambda competition, context: (
+            _registered(competition, context) and
+            competition.status in ['registration_open', 'in_progress'] and
+            competition.event.date <= context['today']
+        ),
+    }
+
+
+class InventoryItemSchema(Schema):
+    """Inventory items with their spec columns; category names come from the context"""
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'category_id': 'category_id',
+        'category': lambda item, context: context['categories'].get(value_of(item, 'category_id')),
+        'quantity': 'quantity',
+        'unit': 'unit',
+        'location': 'location',
+        'condition': 'condition',
+        'draw_weight': 'draw_weight',
+        'bow_type': 'bow_type',
+        'handedness': 'handedness',
+        'spine': 'spine',
+        'length': 'length',
+        'face_size': 'face_size',
+        'attributes': lambda item, context: value_of(item, 'attributes') or {},
+    }
+
+
+class ArrowScoreSchema(Schema):
+    """A single arrow, from an ArrowScore or ArrowValue; arrow numbers are within the round"""
+    fields = {
+        'id': 'id',
+        'round_number': 'round_number',
+        'arrow_number': lambda arrow, context: (
+            arrow.arrow_number - (arrow.round_number - 1) * context['arrows_per_round']
+        ),
+        'score': 'points',
+        'is_x': lambda arrow, context: bool(arrow.is_x),
+    }
+
+
+def _default(obj):
+    if isinstance(obj, Row):
+        return obj.to_dict()
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def dumps(data):
+    """Encode data (including schema rows) as JSON bytes"""
+    backend = current_app.config.get('API_JSON_BACKEND', 'auto')
+    if orjson is not None and backend in ('auto', 'orjson'):
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(',', ':')).encode()
+
+
+def json_response(data, status=200):
+    """Build a JSON response with the configured encoder"""
+    return Response(dumps(data), status=status, mimetype='application/json')
+
@@ -0,0 +1,24 @@
+from flask import jsonify
+from datetime import datetime
+from app.api import api_bp
+from app.api.utils import token_required, versioned
+from app.db_routing import read_replica
+from app.api.serializers import json_response
+from app.club_stats import club_stats, UPCOMING_DAYS
+
+
+def _today(**kwargs):
+    """The upcoming events window moves at midnight"""
+    return datetime.now().date().isoformat()
+
+
+@api_bp.route('/stats', methods=['GET'])
+@token_required
+@read_replica
+@versioned('inventory_item', 'inventory_category', 'user', 'shooting_event', extra=_today)
+def api_club_stats():
+    """API endpoint for the club counters shown on the dashboard."""
+    try:
+        return json_response({**club_stats(), 'upcoming_days': UPCOMING_DAYS})
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
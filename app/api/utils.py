@@ -1,9 +1,12 @@
 import jwt
+import uuid
+import hashlib
 from datetime import datetime, timedelta, timezone
 from functools import wraps
-from flask import jsonify, request, current_app
+from flask import jsonify, request, current_app, make_response
 from flask_login import current_user
-from app.models import User
+from app.models import ChangeCounter
+from app.principal import get_principal, is_token_revoked
 
 
 def generate_token(user):
@@ -11,6 +14,8 @@ def generate_token(user):
     payload = {
         'user_id': user.id,
         'username': user.username,
+        'ver': user.token_version or 0,
+        'jti': uuid.uuid4().hex,
         'exp': datetime.now(timezone.utc) + timedelta(days=30),
         'iat': datetime.now(timezone.utc)
     }
@@ -45,13 +50,25 @@ def token_required(f):
         if not payload:
             return jsonify({'error': 'Token is invalid or expired'}), 401
             
-        # Get the user from the database
-        user = User.query.get(payload['user_id'])
+        if is_token_revoked(payload.get('jti')):
+            return jsonify({'error': 'Token has been revoked'}), 401
+            
+        # Resolve the user from the principal cache
+        token_version = payload.get('ver', 0)
+        user = get_principal(payload['user_id'])
         if not user:
             return jsonify({'error': 'User not found'}), 401
+        
+        if not user.is_active:
+            return jsonify({'error': 'User account is disabled'}), 401
+        
+        # Tokens issued before a password change (or other bulk revocation) are void
+        if token_version != user.token_version:
+            return jsonify({'error': 'Token has been revoked'}), 401
             
         # Make user available in the request context
         request.current_user = user
+        request.token_payload = payload
         
         return f(*args, **kwargs)
     return decorated
@@ -59,4 +76,39 @@ def token_required(f):
 
 def get_current_api_user():
     """Get the current user from the API request context."""
-    return getattr(request, 'current_user', None)
\ No newline at end of file
+    return getattr(request, 'current_user', None)
+
+
+def versioned(*table_names, extra=None):
+    """Decorator adding a version-based ETag and conditional GET to an API endpoint.
+    
+    The ETag is derived from the ChangeCounter of each table the response reads,
+    the current user and the query string, plus whatever ``extra(**view_args)``
+    returns for per-entity versions or time-dependent fields. A matching
+    If-None-Match returns 304 before the endpoint runs. Must be applied
+    inside ``token_required``.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            parts = (
+                f.__name__,
+                get_current_api_user().id,
+                request.query_string,
+                ChangeCounter.versions(*table_names),
+                extra(**kwargs) if extra else None
+            )
+            etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+            
+            # Weak comparison, as compression turns the ETag of the compressed response weak
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated
+    return decorator
@@ -0,0 +1,111 @@
+"""Fingerprinted, precompressed static assets.
+
+``flask build-assets`` copies every file under ``static/`` into ``static/dist/``
+with a content hash in its name, writes gzip (and brotli, when installed)
+variants of the text files next to it and records the mapping in
+``static/dist/manifest.json``. When a manifest exists, ``url_for('static', ...)``
+points at the fingerprinted copy, which is served with far-future cache headers
+and, where the client accepts one, a precompressed variant. Rebuild after
+changing a static file.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from flask import send_from_directory
+from app.compression import COMPRESS_MIMETYPES, accepted_encoding, add_vary, brotli
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+ONE_YEAR = 365 * 24 * 3600
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def _is_text(filename):
+    return mimetypes.guess_type(filename)[0] in COMPRESS_MIMETYPES
+
+
+def build_assets(static_folder, echo=None):
+    """Rebuild ``static/dist`` and its manifest; returns the manifest"""
+    dist = os.path.join(static_folder, DIST_DIR)
+    if os.path.isdir(dist):
+        shutil.rmtree(dist)
+
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != dist)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            filename = os.path.relpath(source, static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            stem, ext = os.path.splitext(filename)
+            fingerprinted = f'{DIST_DIR}/{stem}.{hashlib.md5(data).hexdigest()[:12]}{ext}'
+            target = os.path.join(static_folder, fingerprinted)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(data)
+
+            variants = []
+            if _is_text(filename):
+                with open(target + SUFFIXES['gzip'], 'wb') as f:
+                    f.write(gzip.compress(data, compresslevel=9, mtime=0))
+                variants.append('gzip')
+                if brotli is not None:
+                    with open(target + SUFFIXES['br'], 'wb') as f:
+                        f.write(brotli.compress(data, quality=11))
+                    variants.append('br')
+
+            manifest[filename] = fingerprinted
+            if echo:
+                echo(f'{filename} -> {fingerprinted} {" ".join(variants)}'.rstrip())
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def init_app(app):
+    """Point static URLs at fingerprinted files and serve them with long cache lifetimes"""
+    manifest = load_manifest(app.static_folder)
+    app.extensions['asset_manifest'] = manifest
+
+    @app.url_defaults
+    def fingerprint_static_url(endpoint, values):
+        if endpoint == 'static' and manifest:
+            values['filename'] = manifest.get(values.get('filename'), values.get('filename'))
+
+    def send_static(filename):
+        if not filename.startswith(DIST_DIR + '/'):
+            return app.send_static_file(filename)
+
+        # Fingerprinted names change with the content, so they can be cached for good
+        encoding = None
+        if _is_text(filename):
+            available = [encoding for encoding, suffix in SUFFIXES.items()
+                         if os.path.isfile(os.path.join(app.static_folder, filename + suffix))]
+            encoding = accepted_encoding(available)
+        response = send_from_directory(
+            app.static_folder, filename + SUFFIXES[encoding] if encoding else filename,
+            mimetype=mimetypes.guess_type(filename)[0], max_age=ONE_YEAR
+        )
+        if _is_text(filename):
+            add_vary(response)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions['static'] = send_static
@@ -0,0 +1,96 @@
+"""Cached choice lists for form select fields.
+
+Forms are built on every GET and POST, and used to query their choices each
+time. Lists are now cached per process together with the ``ChangeCounter``
+versions of the tables they are read from:
+
+- a commit in this process that writes one of those tables drops the cache
+- otherwise a cached list is served without any query when rendering a form,
+  and every ``CHOICES_RECHECK_SECONDS`` its versions are compared with the
+  database, so changes made by other workers show up within that time
+- a submitted form always compares the versions, so an option just created by
+  another worker validates
+"""
+import time
+from datetime import date
+from flask import has_request_context, request
+from sqlalchemy import event
+from app import db
+from app.cache import LRUCache
+from app.models import ChangeCounter, InventoryCategory, CompetitionGroup, ShootingEvent, bulk_deleted_table
+
+CHOICE_TABLES = frozenset({'inventory_category', 'competition_group', 'shooting_event'})
+
+# (name, *args) -> (table versions, choices, monotonic time last checked)
+_choices_cache = LRUCache(maxsize=256)
+_settings = {'recheck_seconds': 30}
+
+
+def init_app(app):
+    _settings['recheck_seconds'] = app.config['CHOICES_RECHECK_SECONDS']
+    _choices_cache.clear()
+
+
+def cached_choices(key, tables, load):
+    """Get the choices cached under ``key``, calling ``load()`` when ``tables`` have changed"""
+    now = time.monotonic()
+    entry = _choices_cache.get(key)
+    submitted = has_request_context() and request.method not in ('GET', 'HEAD')
+    if entry is not None and not submitted and now - entry[2] < _settings['recheck_seconds']:
+        return list(entry[1])
+
+    versions = ChangeCounter.versions(*tables)
+    choices = entry[1] if entry is not None and entry[0] == versions else load()
+    _choices_cache.set(key, (versions, choices, now))
+    return list(choices)
+
+
+def category_choices():
+    """(id, name) of every inventory category"""
+    return cached_choices(('inventory_categories',), ('inventory_category',), lambda: [
+        (category.id, category.name) for category in InventoryCategory.query.order_by(InventoryCategory.id)
+    ])
+
+
+def group_choices(competition_id):
+    """(id, name) of a competition's groups"""
+    return cached_choices(('competition_groups', competition_id), ('competition_group',), lambda: [
+        (group.id, group.name) for group in CompetitionGroup.query.filter_by(
+            competition_id=competition_id
+        ).order_by(CompetitionGroup.id)
+    ])
+
+
+def event_choices():
+    """(id, label) of today's and upcoming events"""
+    today = date.today()
+    return cached_choices(('upcoming_events', today), ('shooting_event',), lambda: [
+        (upcoming.id, f'{upcoming.name} ({upcoming.date.strftime("%Y-%m-%d")})')
+        for upcoming in ShootingEvent.query.filter(ShootingEvent.date >= today).order_by(
+            ShootingEvent.date, ShootingEvent.start_time
+        )
+    ])
+
+
+@event.listens_for(db.session, 'after_flush')
+def _note_choice_writes(session, flush_context):
+    if any(obj.__table__.name in CHOICE_TABLES
+           for obj in list(session.new) + list(session.deleted) + list(session.dirty)):
+        session.info['choices_stale'] = True
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _note_choice_bulk_deletes(orm_execute_state):
+    if bulk_deleted_table(orm_execute_state) in CHOICE_TABLES:
+        orm_execute_state.session.info['choices_stale'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_choices(session):
+    if session.info.pop('choices_stale', False):
+        _choices_cache.clear()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_choice_writes(session):
+    session.info.pop('choices_stale', None)
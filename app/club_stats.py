@@ -0,0 +1,75 @@
+"""Club-wide counters shown on the dashboard, the members page and the API.
+
+All counts are read in one round trip (a single SELECT of scalar subqueries)
+and cached for ``STATS_CACHE_TTL`` seconds. A commit that writes one of the
+counted tables clears the cache in this process; the TTL bounds how long
+other workers may serve older counts.
+"""
+from datetime import date, timedelta
+from sqlalchemy import event
+from app import db
+from app.cache import LRUCache
+from app.models import InventoryItem, InventoryCategory, User, ShootingEvent, bulk_deleted_table
+
+STATS_TABLES = frozenset({'inventory_item', 'inventory_category', 'user', 'shooting_event'})
+UPCOMING_DAYS = 30
+
+# Keyed by date, since the upcoming events window moves at midnight
+_stats_cache = LRUCache(maxsize=2, ttl=30)
+
+
+def init_app(app):
+    _stats_cache.ttl = app.config['STATS_CACHE_TTL']
+    _stats_cache.clear()
+
+
+def _count(model, *criteria):
+    return db.select(db.func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+
+def compute_stats(today):
+    """Count everything in a single query"""
+    row = db.session.execute(db.select(
+        _count(InventoryItem).label('total_items'),
+        _count(InventoryCategory).label('total_categories'),
+        _count(User).label('total_members'),
+        _count(User, User.is_active == True).label('active_members'),
+        _count(User, User.role == 'admin').label('admins'),
+        _count(ShootingEvent, ShootingEvent.date >= today,
+               ShootingEvent.date <= today + timedelta(days=UPCOMING_DAYS)).label('upcoming_events_count')
+    )).one()
+    return dict(row._mapping)
+
+
+def club_stats():
+    """Get the cached club counters as a dict"""
+    today = date.today()
+    stats = _stats_cache.get(today)
+    if stats is None:
+        stats = compute_stats(today)
+        _stats_cache.set(today, stats)
+    return dict(stats)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _note_counted_writes(session, flush_context):
+    if any(obj.__table__.name in STATS_TABLES
+           for obj in list(session.new) + list(session.deleted) + list(session.dirty)):
+        session.info['club_stats_stale'] = True
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _note_counted_bulk_deletes(orm_execute_state):
+    if bulk_deleted_table(orm_execute_state) in STATS_TABLES:
+        orm_execute_state.session.info['club_stats_stale'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_stats(session):
+    if session.info.pop('club_stats_stale', False):
+        _stats_cache.clear()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_counted_writes(session):
+    session.info.pop('club_stats_stale', None)
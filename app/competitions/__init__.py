@@ -1,12 +1,21 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app, make_response
 from flask_login import login_required, current_user
 from app import db
-from app.models import (ShootingEvent, Competition, CompetitionGroup, CompetitionTeam, 
-                       CompetitionRegistration, ArrowScore, User)
+from app.models import (ShootingEvent, Competition, CompetitionGroup,
+                       CompetitionRegistration, User, CompetitionResultSnapshot,
+                       ClubRecord)
+from app.db_routing import read_replica
+from app.competitions.results import build_results
+from app.competitions.statistics import competition_statistics
+from app.sqlite_profile import write_with_retry
+from app.competitions import tasks
+from app.jobs import redirect_to_job
+from app.jobs.runner import enqueue
 from app.forms import (CompetitionForm, CompetitionGroupForm, CompetitionRegistrationForm, 
                       ArrowScoreForm, BulkArrowScoreForm, TeamAssignmentForm)
 from datetime import datetime, date, timedelta
 from sqlalchemy import desc, func
+import hashlib
 import math
 import random
 
@@ -24,6 +33,7 @@ def admin_required(f):
 
 @competitions_bp.route('/')
 @login_required
+@read_replica
 def index():
     """List all competitions"""
     # Get upcoming competitions (within next 60 days)
@@ -77,6 +87,7 @@ def create_competition(event_id):
             target_size_cm=form.target_size_cm.data,
             arrows_per_round=form.arrows_per_round.data,
             max_team_size=form.max_team_size.data,
+            score_storage=current_app.config['SCORE_STORAGE'],
             created_by=current_user.id,
             status='setup'
         )
@@ -96,34 +107,35 @@ def view_competition(id):
     competition = Competition.query.get_or_404(id)
     
     # Get statistics
-    total_participants = len(competition.registrations)
-    groups_with_stats = []
-    
-    for group in competition.groups:
-        group_participants = [r for r in competition.registrations if r.group_id == group.id]
-        group_teams = group.teams
-        
-        groups_with_stats.append({
+    if competition.status == 'completed' and competition.results_snapshot:
+        # Group counts are frozen in the results snapshot; no need to load registrations
+        snapshot = competition.results_snapshot.data
+        total_participants = snapshot['competition']['participant_count']
+        groups_with_stats = [{
             'group': group,
-            'participant_count': len(group_participants),
-            'team_count': len(group_teams),
-            'participants': group_participants
-        })
-    
-    # Get available users for admin registration (users not already registered)
-    available_users = []
-    if current_user.is_admin() and competition.status == 'registration_open':
-        registered_user_ids = [registration.member_id for registration in competition.registrations]
-        available_users = User.query.filter(
-            User.is_active == True,
-            ~User.id.in_(registered_user_ids)
-        ).order_by(User.first_name, User.last_name).all()
+            'participant_count': group['participant_count'],
+            'team_count': group['team_count'],
+            'participants': group['participants']
+        } for group in snapshot['groups']]
+    else:
+        total_participants = len(competition.registrations)
+        groups_with_stats = []
+        
+        for group in competition.groups:
+            group_participants = [r for r in competition.registrations if r.group_id == group.id]
+            group_teams = group.teams
+            
+            groups_with_stats.append({
+                'group': group,
+                'participant_count': len(group_participants),
+                'team_count': len(group_teams),
+                'participants': group_participants
+            })
     
     return render_template('competitions/view.html',
                          competition=competition,
                          total_participants=total_participants,
-                         groups_with_stats=groups_with_stats,
-                         available_users=available_users)
+                         groups_with_stats=groups_with_stats)
 
 @competitions_bp.route('/<int:id>/setup-groups', methods=['GET', 'POST'])
 @login_required
@@ -222,6 +234,10 @@ def admin_register_member(id):
         flash('Please select a member', 'error')
         return redirect(url_for('competitions.view_competition', id=id))
     
+    if not User.query.filter_by(id=member_id, is_active=True).first():
+        flash('Please select an active member', 'error')
+        return redirect(url_for('competitions.view_competition', id=id))
+    
     if not group_id:
         flash('Please select a group', 'error')
         return redirect(url_for('competitions.view_competition', id=id))
@@ -268,92 +284,9 @@ def generate_teams(id):
         flash('Teams can only be generated when registration is open.', 'error')
         return redirect(url_for('competitions.view_competition', id=id))
     
-    # Delete existing teams
-    for group in competition.groups:
-        CompetitionTeam.query.filter_by(group_id=group.id).delete()
-    
-    teams_created = 0
-    
-    for group in competition.groups:
-        # Get registrations for this group
-        registrations = CompetitionRegistration.query.filter_by(
-            competition_id=id, group_id=group.id
-        ).all()
-        
-        if not registrations:
-            continue
-            
-        # Shuffle for random team assignment
-        import random
-        random.shuffle(registrations)
-        
-        # Smart team balancing logic
-        team_size = competition.max_team_size
-        total_members = len(registrations)
-        
-        # Calculate optimal team distribution
-        if total_members <= team_size:
-            # Everyone on one team
-            num_teams = 1
-        else:
-            # Calculate number of full teams and remainder
-            full_teams = total_members // team_size
-            remainder = total_members % team_size
-            
-            if remainder == 0:
-                # Perfect division
-                num_teams = full_teams
-            elif remainder == 1:
-                # One person left over - redistribute
-                # Make one less full team and distribute extras
-                if full_teams > 1:
-                    num_teams = full_teams
-                    # The last team will have (team_size + 1) members
-                else:
-                    num_teams = 1  # All members in one team
-            else:
-                # Remainder > 1, create one extra team with remainder members
-                num_teams = full_teams + 1
-        
-        # Create teams with balanced member distribution
-        for team_num in range(num_teams):
-            team = CompetitionTeam(
-                group_id=group.id,
-                team_number=team_num + 1,
-                target_number=teams_created + team_num + 1
-            )
-            db.session.add(team)
-            db.session.flush()  # Get team ID
-            
-        # Now assign members to teams with balanced distribution
-        members_per_team = [0] * num_teams
-        target_per_team = total_members // num_teams
-        extra_members = total_members % num_teams
-        
-        # Calculate how many members each team should get
-        for i in range(num_teams):
-            members_per_team[i] = target_per_team
-            if i < extra_members:  # Distribute extra members to first few teams
-                members_per_team[i] += 1
-        
-        # Get the created teams
-        created_teams = CompetitionTeam.query.filter_by(group_id=group.id).order_by(CompetitionTeam.team_number.desc()).limit(num_teams).all()
-        created_teams.reverse()  # Get in correct order
-        
-        # Assign members to teams
-        member_index = 0
-        for team_idx, team in enumerate(created_teams):
-            members_for_this_team = members_per_team[team_idx]
-            for _ in range(members_for_this_team):
-                if member_index < len(registrations):
-                    registrations[member_index].team_id = team.id
-                    member_index += 1
-        
-        teams_created += num_teams
-    
-    db.session.commit()
-    flash(f'Successfully generated {teams_created} teams.', 'success')
-    return redirect(url_for('competitions.view_competition', id=id))
+    # Large competitions can take a while, so a background worker does the work
+    job = enqueue(tasks.generate_teams, {'competition_id': id}, created_by=current_user.id, unique=True)
+    return redirect_to_job(job, url_for('competitions.view_competition', id=id))
 
 @competitions_bp.route('/<int:id>/start', methods=['POST'])
 @login_required
@@ -385,7 +318,7 @@ def scoring(id):
     """Competition scoring interface for admins"""
     competition = Competition.query.get_or_404(id)
     
-    if competition.status not in ['in_progress', 'completed']:
+    if competition.status not in ['in_progress', 'completing', 'completed']:
         flash('Competition must be in progress to access scoring.', 'error')
         return redirect(url_for('competitions.view_competition', id=id))
     
@@ -422,7 +355,7 @@ def score_registration(id, registration_id):
         return redirect(url_for('competitions.scoring', id=id))
     
     # Determine current round
-    completed_arrows = len(registration.arrow_scores)
+    completed_arrows = registration.arrow_count
     current_round = (completed_arrows // competition.arrows_per_round) + 1
     
     if current_round > competition.number_of_rounds:
@@ -441,9 +374,6 @@ def score_registration(id, registration_id):
             flash('Invalid round number.', 'error')
             return redirect(url_for('competitions.score_registration', id=id, registration_id=registration_id))
         
-        # Record scores for this round
-        base_arrow_number = (current_round - 1) * competition.arrows_per_round
-        
         # Validate all arrow scores are present and valid
         all_valid = True
         arrow_data = []
@@ -464,30 +394,15 @@ def score_registration(id, registration_id):
                     all_valid = False
                     continue
                     
-                arrow_data.append({
-                    'points': arrow_score,
-                    'is_x': is_x_checked,
-                    'arrow_number': base_arrow_number + i + 1
-                })
+                arrow_data.append((arrow_score, is_x_checked))
             except ValueError:
                 flash(f'Invalid score for Arrow {i+1}.', 'error')
                 all_valid = False
                 continue
         
         if all_valid:
-            # Save all arrow scores
-            for arrow_info in arrow_data:
-                arrow_score = ArrowScore(
-                    registration_id=registration.id,
-                    arrow_number=arrow_info['arrow_number'],
-                    points=arrow_info['points'],
-                    is_x=arrow_info['is_x'],
-                    round_number=current_round,
-                    recorded_by=current_user.id
-                )
-                db.session.add(arrow_score)
-            
-            db.session.commit()
+            # Save all arrow scores in one short write transaction
+            write_with_retry(lambda: registration.record_round(current_round, arrow_data, current_user.id))
             flash(f'Round {current_round} scored successfully for {registration.member.first_name} {registration.member.last_name}!', 'success')
             return redirect(url_for('competitions.scoring', id=id))
         else:
@@ -502,21 +417,51 @@ def score_registration(id, registration_id):
                          registration=registration,
                          current_round=current_round)
 
+def record_holders(competition_id):
+    """Get (group name, member id) pairs holding a club record set at this competition"""
+    return {(record.group_name, record.member_id)
+            for record in ClubRecord.query.filter_by(competition_id=competition_id).all()}
+
 @competitions_bp.route('/<int:id>/results')
 @login_required
+@read_replica
 def results(id):
     """View competition results"""
+    # Completed competitions are served from their frozen snapshot with a single read
+    snapshot = CompetitionResultSnapshot.query.filter_by(competition_id=id).first()
+    if snapshot:
+        # Record badges change when a later competition breaks a record set here,
+        # and the page embeds the navbar for the current user, so both go in the tag
+        holders = record_holders(id)
+        holders_hash = hashlib.sha1(repr(sorted(holders)).encode()).hexdigest()[:12]
+        etag = f'{snapshot.etag}-{holders_hash}-{current_user.id}'
+        # Weak comparison, as compression turns the ETag of the compressed response weak
+        if request.if_none_match.contains_weak(etag):
+            response = make_response('', 304)
+        else:
+            response = make_response(render_template(
+                'competitions/results.html',
+                results=snapshot.data,
+                stats=competition_statistics(id, snapshot.etag),
+                record_holders=holders
+            ))
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
     competition = Competition.query.get_or_404(id)
     
     if competition.status == 'setup':
         flash('Competition has not started yet.', 'info')
         return redirect(url_for('competitions.view_competition', id=id))
     
-    results_by_group = competition.get_results_by_group()
+    # Live results; competitions completed before snapshots existed are
+    # frozen by `flask backfill-snapshots`, as this view only reads
+    results_data = build_results(competition)
+    stats = competition_statistics(id, competition.results_version)
     
-    return render_template('competitions/results.html',
-                         competition=competition,
-                         results_by_group=results_by_group)
+    return render_template('competitions/results.html', results=results_data, stats=stats,
+                         record_holders=record_holders(id))
 
 @competitions_bp.route('/<int:id>/complete', methods=['POST'])
 @login_required
@@ -525,58 +470,25 @@ def complete_competition(id):
     """Complete the competition and fill missing arrows with 0-point scores"""
     competition = Competition.query.get_or_404(id)
     
-    if competition.status not in ['in_progress', 'registration_open']:
+    # A competition left 'completing' by a failed job can be completed again
+    if competition.status not in ['in_progress', 'registration_open', 'completing']:
         flash('Only competitions in progress or with open registration can be completed.', 'error')
         return redirect(url_for('competitions.view_competition', id=id))
     
-    # Fill missing arrows with 0-point scores for all registrations
-    total_arrows_needed = competition.total_arrows
-    filled_count = 0
-    
-    for registration in competition.registrations:
-        current_arrows = len(registration.arrow_scores)
-        
-        if current_arrows < total_arrows_needed:
-            # Fill remaining arrows with 0-point scores
-            for arrow_num in range(current_arrows + 1, total_arrows_needed + 1):
-                round_num = ((arrow_num - 1) // competition.arrows_per_round) + 1
-                
-                arrow_score = ArrowScore(
-                    registration_id=registration.id,
-                    arrow_number=arrow_num,
-                    points=0,
-                    is_x=False,
-                    round_number=round_num,
-                    recorded_by=current_user.id,
-                    notes="Auto-filled on competition completion"
-                )
-                db.session.add(arrow_score)
-                filled_count += 1
-    
-    # Mark competition as completed
-    competition.status = 'completed'
-    db.session.commit()
-    
-    if filled_count > 0:
-        flash(f'Competition completed! {filled_count} missing arrows were automatically filled with 0-point scores. Results are now final.', 'success')
-    else:
-        flash('Competition has been completed! Results are now final.', 'success')
-    
-    return redirect(url_for('competitions.view_competition', id=id))
+    # Filling arrows and updating the league and records runs in a background worker
+    job = enqueue(tasks.complete_competition, {'competition_id': id, 'user_id': current_user.id},
+                  created_by=current_user.id, unique=True)
+    return redirect_to_job(job, url_for('competitions.view_competition', id=id))
 
 @competitions_bp.route('/<int:id>/delete', methods=['POST'])
 @login_required
 @admin_required
 def delete_competition(id):
     """Delete a competition"""
-    competition = Competition.query.get_or_404(id)
-    event_name = competition.event.name
-    
-    db.session.delete(competition)
-    db.session.commit()
+    Competition.query.get_or_404(id)
     
-    flash(f'Competition for "{event_name}" has been deleted.', 'success')
-    return redirect(url_for('competitions.index'))
+    job = enqueue(tasks.delete_competition, {'competition_id': id}, created_by=current_user.id, unique=True)
+    return redirect_to_job(job, url_for('competitions.index'))
 
 @competitions_bp.route('/group/<int:group_id>/delete', methods=['POST'])
 @login_required
@@ -0,0 +1,155 @@
+"""Competition results assembly.
+
+Results are built as plain, JSON-serializable dicts so the same structure can be
+rendered live while a competition is running and stored as a frozen snapshot
+once it is completed.
+"""
+from sqlalchemy.orm import selectinload
+from app import db
+from app.models import Competition, CompetitionRegistration, CompetitionResultSnapshot
+
+
+def _load_registrations(competition):
+    """Load all registrations with members, teams and scores in a fixed number of queries"""
+    score_loader = (selectinload(CompetitionRegistration.end_scores) if competition.uses_end_storage
+                    else selectinload(CompetitionRegistration.arrow_scores))
+    return CompetitionRegistration.query.filter_by(competition_id=competition.id).options(
+        selectinload(CompetitionRegistration.member),
+        selectinload(CompetitionRegistration.team),
+        score_loader
+    ).all()
+
+
+def _participant_row(registration):
+    arrows = registration.arrow_values
+    member = registration.member
+    team = registration.team
+    return {
+        'registration_id': registration.id,
+        'member_id': member.id,
+        'first_name': member.first_name,
+        'last_name': member.last_name,
+        'username': member.username,
+        'team_id': team.id if team else None,
+        'team_number': team.team_number if team else None,
+        'target_number': team.target_number if team else None,
+        'total_score': sum(value.points for value in arrows),
+        'x_count': sum(1 for value in arrows if value.is_x),
+        'arrow_count': len(arrows),
+        'round_scores': registration.get_round_scores(),
+        'completed_rounds': registration.completed_rounds,
+        'is_complete': registration.is_complete
+    }
+
+
+def _team_rows(participants):
+    teams = {}
+    for participant in participants:
+        if participant['team_id'] is None:
+            continue
+        team = teams.setdefault(participant['team_id'], {
+            'team_id': participant['team_id'],
+            'team_number': participant['team_number'],
+            'target_number': participant['target_number'],
+            'members': [],
+            'total_score': 0
+        })
+        team['members'].append({
+            'name': f"{participant['first_name']} {participant['last_name']}",
+            'total_score': participant['total_score']
+        })
+        team['total_score'] += participant['total_score']
+
+    rows = sorted(teams.values(), key=lambda team: team['team_number'])
+    for team in rows:
+        team['average_score'] = team['total_score'] / len(team['members'])
+    return rows
+
+
+def build_results(competition):
+    """Build the complete results structure for a competition.
+
+    Contains the competition header, per-group individual rankings (ranked by
+    total score, then X count), round breakdowns, team standings and completion
+    statistics.
+    """
+    event = competition.event
+    registrations = _load_registrations(competition)
+
+    groups = []
+    team_count = 0
+    for group in competition.groups:
+        participants = [_participant_row(r) for r in registrations if r.group_id == group.id]
+        participants.sort(key=lambda p: (p['total_score'], p['x_count']), reverse=True)
+        for rank, participant in enumerate(participants, start=1):
+            participant['rank'] = rank
+
+        teams = _team_rows(participants)
+        team_count += len(group.teams)
+        scores = [p['total_score'] for p in participants]
+        groups.append({
+            'id': group.id,
+            'name': group.name,
+            'description': group.description,
+            'min_age': group.min_age,
+            'max_age': group.max_age,
+            'participant_count': len(participants),
+            'team_count': len(group.teams),
+            'participants': participants,
+            'teams': teams,
+            'high_score': max(scores) if scores else 0,
+            'average_score': (sum(scores) / len(scores)) if scores else 0
+        })
+
+    total_participants = len(registrations)
+    completed_participants = sum(1 for r in registrations if r.is_complete)
+
+    return {
+        'competition': {
+            'id': competition.id,
+            'event_id': event.id,
+            'name': event.name,
+            'date': event.date.isoformat(),
+            'date_display': event.date.strftime('%B %d, %Y'),
+            'location': event.location,
+            'status': competition.status,
+            'number_of_rounds': competition.number_of_rounds,
+            'arrows_per_round': competition.arrows_per_round,
+            'total_arrows': competition.total_arrows,
+            'target_size_cm': competition.target_size_cm,
+            'max_possible_score': competition.max_possible_score,
+            'max_team_size': competition.max_team_size,
+            'participant_count': total_participants,
+            'group_count': len(groups),
+            'team_count': team_count
+        },
+        'groups': groups,
+        'stats': {
+            'total_participants': total_participants,
+            'completed_participants': completed_participants,
+            'completion_percentage': (completed_participants / total_participants * 100) if total_participants else 0
+        }
+    }
+
+
+def backfill_snapshots(batch_size=20, echo=None):
+    """Freeze the results of completed competitions that have no snapshot yet.
+
+    Competitions completed before snapshots existed are served live until
+    then. Commits after each batch; returns the number of snapshots taken.
+    """
+    competition_ids = [row.id for row in db.session.query(Competition.id).outerjoin(
+        CompetitionResultSnapshot, CompetitionResultSnapshot.competition_id == Competition.id
+    ).filter(
+        Competition.status == 'completed', CompetitionResultSnapshot.id.is_(None)
+    ).order_by(Competition.id).all()]
+
+    for start in range(0, len(competition_ids), batch_size):
+        for competition_id in competition_ids[start:start + batch_size]:
+            CompetitionResultSnapshot.capture(db.session.get(Competition, competition_id))
+        db.session.commit()
+        db.session.expunge_all()
+        if echo:
+            echo(f'Captured {min(start + batch_size, len(competition_ids))}/{len(competition_ids)} snapshots')
+
+    return len(competition_ids)
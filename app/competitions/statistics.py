@@ -0,0 +1,175 @@
+"""Vectorized competition statistics.
+
+A competition's arrows are loaded with a single query into a dense
+(archers x arrows) NumPy matrix, with NaN marking arrows not shot yet. Every
+statistic is then computed with array operations, so the cost stays flat per
+arrow however large the field is.
+"""
+import warnings
+import numpy as np
+from app import db
+from app.cache import LRUCache
+from app.models import Competition, CompetitionRegistration, ArrowScore, EndScore
+
+RING_VALUES = 11  # Scores 0 through 10
+
+# Keyed by (competition id, version); a new version simply misses
+_statistics_cache = LRUCache(maxsize=64)
+
+
+def _load_registrations(competition):
+    rows = db.session.execute(
+        db.select(CompetitionRegistration.id, CompetitionRegistration.group_id,
+                  db.func.coalesce(CompetitionRegistration.team_id, 0))
+        .where(CompetitionRegistration.competition_id == competition.id)
+        .order_by(CompetitionRegistration.id)
+    ).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    table = np.array(rows, dtype=np.int64)
+    return table[:, 0], table[:, 1], table[:, 2]
+
+
+def _load_arrows(competition):
+    """Get flat (registration_id, arrow_index, points, is_x) arrays for every recorded arrow"""
+    if competition.uses_end_storage:
+        rows = db.session.execute(
+            db.select(EndScore.registration_id, EndScore.round_number, EndScore.arrows, EndScore.x_mask)
+            .join(CompetitionRegistration, EndScore.registration_id == CompetitionRegistration.id)
+            .where(CompetitionRegistration.competition_id == competition.id)
+        ).all()
+        if not rows:
+            return (np.empty(0, dtype=np.int64),) * 4
+        registration_ids, round_numbers, blobs, masks = zip(*rows)
+        lengths = np.array([len(blob) for blob in blobs], dtype=np.int64)
+        points = np.frombuffer(b''.join(blobs), dtype=np.uint8).astype(np.int64)
+        # Expand per-end columns to per-arrow columns without looping over arrows
+        end_of_arrow = np.repeat(np.arange(len(rows)), lengths)
+        position = np.arange(points.size) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        arrow_index = (np.array(round_numbers, dtype=np.int64)[end_of_arrow] - 1) * competition.arrows_per_round + position
+        is_x = (np.array(masks, dtype=np.int64)[end_of_arrow] >> position) & 1
+        return np.array(registration_ids, dtype=np.int64)[end_of_arrow], arrow_index, points, is_x
+
+    rows = db.session.execute(
+        db.select(ArrowScore.registration_id, ArrowScore.arrow_number - 1, ArrowScore.points,
+                  db.func.coalesce(ArrowScore.is_x, False))
+        .join(CompetitionRegistration, ArrowScore.registration_id == CompetitionRegistration.id)
+        .where(CompetitionRegistration.competition_id == competition.id)
+    ).all()
+    if not rows:
+        return (np.empty(0, dtype=np.int64),) * 4
+    table = np.array(rows, dtype=np.int64)
+    return table[:, 0], table[:, 1], table[:, 2], table[:, 3]
+
+
+def _to_list(values, digits=3):
+    """Convert a NumPy array to a JSON-friendly list with NaN as None"""
+    return [None if np.isnan(v) else round(float(v), digits) for v in np.asarray(values, dtype=float)]
+
+
+def _to_float(value, digits=3):
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def _pooled(points, is_x, end_totals, histograms):
+    """Summary statistics pooled over a subset of archers (rows)"""
+    arrows_shot = int(np.count_nonzero(~np.isnan(points)))
+    total = float(np.nansum(points))
+    return {
+        'archers': int(points.shape[0]),
+        'arrows_shot': arrows_shot,
+        'mean_per_arrow': round(total / arrows_shot, 3) if arrows_shot else None,
+        'std_per_end': _to_float(np.nanstd(end_totals)) if end_totals.size else None,
+        'x_count': int(is_x.sum()),
+        'x_rate': round(int(is_x.sum()) / arrows_shot, 4) if arrows_shot else None,
+        'histogram': histograms.sum(axis=0).astype(int).tolist(),
+        # Average end score per round across the subset
+        'progression': _to_list(np.nanmean(end_totals, axis=0)) if end_totals.size else []
+    }
+
+
+def compute_statistics(competition):
+    """Compute per-archer, per-group, per-team and overall statistics for a competition"""
+    rounds, per_round = competition.number_of_rounds, competition.arrows_per_round
+    registration_ids, group_ids, team_ids = _load_registrations(competition)
+    archer_count, arrow_count = registration_ids.size, rounds * per_round
+
+    points = np.full((archer_count, arrow_count), np.nan)
+    is_x = np.zeros((archer_count, arrow_count), dtype=bool)
+
+    arrow_registrations, arrow_index, arrow_points, arrow_x = _load_arrows(competition)
+    if arrow_points.size and archer_count:
+        rows = np.searchsorted(registration_ids, arrow_registrations)
+        valid = (arrow_index >= 0) & (arrow_index < arrow_count) & (rows < archer_count)
+        rows, arrow_index = rows[valid], arrow_index[valid]
+        points[rows, arrow_index] = arrow_points[valid]
+        is_x[rows, arrow_index] = arrow_x[valid].astype(bool)
+
+    shot = ~np.isnan(points)
+    ends = points.reshape(archer_count, rounds, per_round)
+    end_complete = shot.reshape(archer_count, rounds, per_round).all(axis=2)
+
+    with warnings.catch_warnings():
+        # Archers with no complete ends yet legitimately produce empty-slice NaNs
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        end_totals = np.where(end_complete, np.nansum(ends, axis=2), np.nan)
+        arrows_shot = shot.sum(axis=1)
+        totals = np.nansum(points, axis=1)
+        mean_per_arrow = np.where(arrows_shot > 0, totals / np.maximum(arrows_shot, 1), np.nan)
+        std_per_end = np.nanstd(end_totals, axis=1)
+        x_counts = is_x.sum(axis=1)
+        x_rate = np.where(arrows_shot > 0, x_counts / np.maximum(arrows_shot, 1), np.nan)
+        progression = np.where(end_complete, np.cumsum(np.nan_to_num(end_totals), axis=1), np.nan)
+
+        row_of_arrow = np.nonzero(shot)[0]
+        histograms = np.bincount(
+            row_of_arrow * RING_VALUES + points[shot].astype(np.int64),
+            minlength=archer_count * RING_VALUES
+        ).reshape(archer_count, RING_VALUES)
+
+        archers = {}
+        for row, registration_id in enumerate(registration_ids.tolist()):
+            archers[registration_id] = {
+                'arrows_shot': int(arrows_shot[row]),
+                'total_score': int(totals[row]),
+                'mean_per_arrow': _to_float(mean_per_arrow[row]),
+                'std_per_end': _to_float(std_per_end[row]),
+                'x_count': int(x_counts[row]),
+                'x_rate': _to_float(x_rate[row], 4),
+                'histogram': histograms[row].tolist(),
+                'end_scores': _to_list(end_totals[row], 0),
+                'progression': _to_list(progression[row], 0)
+            }
+
+        def subset(mask):
+            return _pooled(points[mask], is_x[mask], end_totals[mask], histograms[mask])
+
+        groups = {int(g): subset(group_ids == g) for g in np.unique(group_ids)}
+        teams = {int(t): subset(team_ids == t) for t in np.unique(team_ids) if t != 0}
+        overall = subset(np.ones(archer_count, dtype=bool))
+
+    return {
+        'competition_id': competition.id,
+        'rounds': rounds,
+        'arrows_per_round': per_round,
+        'overall': overall,
+        'groups': groups,
+        'teams': teams,
+        'archers': archers
+    }
+
+
+def competition_statistics(competition_id, version):
+    """Get cached statistics for a competition at a given results version.
+
+    ``version`` is anything that changes when the results change: the
+    competition's ``results_version`` while live, or the snapshot ETag once
+    completed. The competition is only loaded on a cache miss.
+    """
+    key = (competition_id, version)
+    statistics = _statistics_cache.get(key)
+    if statistics is None:
+        statistics = compute_statistics(Competition.query.get(competition_id))
+        _statistics_cache.set(key, statistics)
+    return statistics
@@ -0,0 +1,180 @@
+"""Background jobs for the slow competition admin actions (see app/jobs/runner.py).
+
+Each task re-checks the competition, since it may have changed between the
+admin's click and a worker picking the job up, and commits in steps that are
+safe to repeat if the job is retried.
+"""
+import random
+from app import db
+from app.models import Competition, CompetitionTeam, CompetitionRegistration, CompetitionResultSnapshot
+from app.jobs.runner import task, report_progress, JobError
+from app.league.rollups import record_competition
+from app.league.club_records import check_competition as check_club_records
+from app.deletion import delete_competitions
+
+# Registrations filled per commit when completing a competition
+FILL_BATCH_SIZE = 25
+
+
+def _get_competition(competition_id):
+    competition = db.session.get(Competition, competition_id)
+    if competition is None:
+        raise JobError('The competition no longer exists.')
+    return competition
+
+
+@task('competition.complete', 'Complete competition')
+def complete_competition(job, competition_id, user_id):
+    """Fill missing arrows with 0-point scores, then freeze the results into the league and records"""
+    competition = _get_competition(competition_id)
+    if competition.results_snapshot:
+        return {'message': 'Competition has already been completed.'}
+    # 'completing' means an earlier attempt got part of the way
+    if competition.status not in ['in_progress', 'registration_open', 'completing']:
+        raise JobError('Only competitions in progress or with open registration can be completed.')
+
+    # Close scoring first so nothing changes while missing arrows are filled in batches.
+    # Results aren't final until 'completed' is committed together with the snapshot below.
+    competition.status = 'completing'
+    db.session.commit()
+
+    registration_ids = [row.id for row in db.session.query(CompetitionRegistration.id).filter_by(
+        competition_id=competition_id
+    ).order_by(CompetitionRegistration.id)]
+    steps = len(registration_ids) + 1
+    filled_count = 0
+
+    for start in range(0, len(registration_ids), FILL_BATCH_SIZE):
+        batch = registration_ids[start:start + FILL_BATCH_SIZE]
+        for registration in CompetitionRegistration.query.filter(CompetitionRegistration.id.in_(batch)):
+            filled_count += registration.fill_missing_arrows(
+                user_id, notes="Auto-filled on competition completion"
+            )
+        report_progress(job, start + len(batch), steps, 'Filling missing arrows')
+
+    # Results can no longer change, so freeze them and fold them into the league and records
+    competition = _get_competition(competition_id)
+    competition.status = 'completed'
+    CompetitionResultSnapshot.capture(competition)
+    db.session.flush()
+    record_competition(competition)
+    new_records = check_club_records(competition)
+    db.session.commit()
+
+    if filled_count > 0:
+        message = (f'Competition completed! {filled_count} missing arrows were automatically filled with '
+                   f'0-point scores. Results are now final.')
+    else:
+        message = 'Competition has been completed! Results are now final.'
+    notes = [f'New club record: {record.member.first_name} {record.member.last_name} scored {record.score} '
+             f'({record.group_name}, {record.format_label}).' for record in new_records]
+    return {'message': message, 'notes': notes, 'filled': filled_count}
+
+
+@task('competition.generate_teams', 'Generate teams')
+def generate_teams(job, competition_id):
+    """Split each group's registrations into balanced, randomly drawn teams, one group per commit"""
+    competition = _get_competition(competition_id)
+    if competition.status != 'registration_open':
+        raise JobError('Teams can only be generated when registration is open.')
+
+    group_ids = [group.id for group in competition.groups]
+    team_size = competition.max_team_size
+    teams_created = 0
+
+    for group_index, group_id in enumerate(group_ids):
+        # Delete existing teams, once no registration points at them
+        CompetitionRegistration.query.filter_by(group_id=group_id).update({'team_id': None})
+        CompetitionTeam.query.filter_by(group_id=group_id).delete()
+
+        # Get registrations for this group
+        registrations = CompetitionRegistration.query.filter_by(
+            competition_id=competition_id, group_id=group_id
+        ).all()
+
+        if not registrations:
+            db.session.commit()
+            report_progress(job, group_index + 1, len(group_ids), 'Generating teams')
+            continue
+
+        # Shuffle for random team assignment
+        random.shuffle(registrations)
+
+        # Smart team balancing logic
+        total_members = len(registrations)
+
+        # Calculate optimal team distribution
+        if total_members <= team_size:
+            # Everyone on one team
+            num_teams = 1
+        else:
+            # Calculate number of full teams and remainder
+            full_teams = total_members // team_size
+            remainder = total_members % team_size
+
+            if remainder == 0:
+                # Perfect division
+                num_teams = full_teams
+            elif remainder == 1:
+                # One person left over - redistribute
+                # Make one less full team and distribute extras
+                if full_teams > 1:
+                    num_teams = full_teams
+                    # The last team will have (team_size + 1) members
+                else:
+                    num_teams = 1  # All members in one team
+            else:
+                # Remainder > 1, create one extra team with remainder members
+                num_teams = full_teams + 1
+
+        # Create teams with balanced member distribution
+        created_teams = []
+        for team_num in range(num_teams):
+            team = CompetitionTeam(
+                group_id=group_id,
+                team_number=team_num + 1,
+                target_number=teams_created + team_num + 1
+            )
+            db.session.add(team)
+            created_teams.append(team)
+        db.session.flush()  # Get team IDs
+
+        # Now assign members to teams with balanced distribution
+        members_per_team = [0] * num_teams
+        target_per_team = total_members // num_teams
+        extra_members = total_members % num_teams
+
+        # Calculate how many members each team should get
+        for i in range(num_teams):
+            members_per_team[i] = target_per_team
+            if i < extra_members:  # Distribute extra members to first few teams
+                members_per_team[i] += 1
+
+        # Assign members to teams
+        member_index = 0
+        for team_idx, team in enumerate(created_teams):
+            members_for_this_team = members_per_team[team_idx]
+            for _ in range(members_for_this_team):
+                if member_index < len(registrations):
+                    registrations[member_index].team_id = team.id
+                    member_index += 1
+
+        teams_created += num_teams
+        db.session.commit()
+        report_progress(job, group_index + 1, len(group_ids), 'Generating teams')
+
+    return {'message': f'Successfully generated {teams_created} teams.', 'teams': teams_created}
+
+
+@task('competition.delete', 'Delete competition')
+def delete_competition(job, competition_id):
+    """Take a competition out of the league and records, then delete it with its scores"""
+    competition = db.session.get(Competition, competition_id)
+    if competition is None:
+        return {'message': 'Competition has already been deleted.'}
+    event_name = competition.event.name
+
+    delete_competitions([competition_id])
+    db.session.commit()
+
+    return {'message': f'Competition for "{event_name}" has been deleted.'}
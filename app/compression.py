@@ -0,0 +1,95 @@
+"""Response compression.
+
+Text responses (HTML, JSON, CSS, ...) at least ``COMPRESS_MIN_SIZE`` bytes
+long are compressed with brotli when the client accepts it and the brotli
+package is installed, or gzip otherwise. Streamed responses are compressed
+chunk by chunk, so they still reach the client as they are generated. Files
+sent with ``send_file`` and responses that already carry a Content-Encoding
+(such as precompressed static assets) are left alone.
+"""
+import gzip
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
+COMPRESS_MIMETYPES = ('text/html', 'text/css', 'text/plain', 'text/csv', 'text/xml',
+                      'text/javascript', 'application/javascript', 'application/json',
+                      'application/xml', 'image/svg+xml')
+
+
+def init_app(app):
+    app.after_request(compress_response)
+
+
+def accepted_encoding(available=('br', 'gzip')):
+    """Get the preferred content coding the client accepts, or None"""
+    best, best_quality = None, 0
+    for encoding in available:
+        if encoding == 'br' and brotli is None:
+            continue
+        quality = request.accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def add_vary(response, header='Accept-Encoding'):
+    if header.lower() not in (value.lower() for value in response.vary):
+        response.vary.add(header)
+
+
+def _compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=level)
+
+
+def _compress_stream(chunks, encoding, level):
+    """Compress an iterable of byte chunks, flushing after each one"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=min(level, 11))
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+
+def compress_response(response):
+    config = current_app.config
+    if (not config['COMPRESS_ENABLED'] or
+            response.status_code < 200 or response.status_code in (204, 304) or
+            response.direct_passthrough or
+            'Content-Encoding' in response.headers or
+            response.mimetype not in config['COMPRESS_MIMETYPES']):
+        return response
+
+    if not response.is_streamed and response.calculate_content_length() < config['COMPRESS_MIN_SIZE']:
+        return response
+
+    # The body depends on Accept-Encoding from here on, whether or not this client gets it compressed
+    add_vary(response)
+    encoding = accepted_encoding()
+    if encoding is None:
+        return response
+
+    level = config['COMPRESS_LEVEL']
+    if response.is_streamed:
+        response.response = _compress_stream(response.iter_encoded(), encoding, level)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(_compress(response.get_data(), encoding, level))
+    response.headers['Content-Encoding'] = encoding
+
+    # The compressed body is a different representation, so a strong validator no longer applies
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
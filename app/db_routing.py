@@ -0,0 +1,98 @@
+"""Read-replica routing for ``db.session``.
+
+Replica URLs come from ``DATABASE_REPLICA_URLS`` (comma separated) and are
+registered as ``replica_<n>`` binds. Views decorated with ``read_replica`` send
+their SELECTs for GET and HEAD requests to a randomly chosen replica.
+Everything else stays on the primary:
+
+- flushes, DML and explicit connections
+- every query in a session after it has written
+- other views and methods
+- requests from a client that wrote within the last ``REPLICA_STICKY_SECONDS``,
+  tracked with a short-lived cookie, so the redirect after a POST reads its
+  own writes
+
+Any database URL works as a replica, so a second local SQLite file can stand in
+for one in tests (create its tables with ``db.metadata.create_all(engine)``, see
+test_db_routing.py).
+"""
+import random
+from functools import wraps
+from flask import g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND_PREFIX = 'replica_'
+PRIMARY_COOKIE = 'db_primary'
+
+
+def replica_binds(urls, options_for):
+    """SQLALCHEMY_BINDS entries for the replica URLs; ``options_for(url)`` gives engine options"""
+    return {f'{REPLICA_BIND_PREFIX}{n}': {'url': url, **options_for(url)} for n, url in enumerate(urls)}
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica inside ``read_replica`` views"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            replicas = [engine for key, engine in self._db.engines.items()
+                        if key and key.startswith(REPLICA_BIND_PREFIX)]
+            if replicas:
+                return random.choice(replicas)
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        return (has_request_context() and g.get('db_replica', False) and not g.get('db_wrote', False) and
+                not self._flushing and not self.info.get('wrote') and
+                getattr(clause, 'is_select', False))
+
+
+def read_replica(f):
+    """Decorator letting a read-only view query a replica for GET and HEAD requests"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and PRIMARY_COOKIE not in request.cookies:
+            g.db_replica = True
+        return f(*args, **kwargs)
+    return decorated
+
+
+def init_app(app):
+    if not any(key and key.startswith(REPLICA_BIND_PREFIX) for key in app.config['SQLALCHEMY_BINDS']):
+        return
+
+    @app.before_request
+    def reset_routing():
+        g.pop('db_replica', None)
+        g.pop('db_wrote', None)
+
+    @app.after_request
+    def stick_to_primary(response):
+        # Send this client's next reads to the primary until replicas have caught up
+        if g.get('db_wrote'):
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=app.config['REPLICA_STICKY_SECONDS'],
+                                httponly=True, samesite='Lax')
+        return response
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _note_write(session, flush_context):
+    session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _note_bulk_write(orm_execute_state):
+    if orm_execute_state.is_delete or orm_execute_state.is_update:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _note_committed_write(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        g.db_wrote = True
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_write(session):
+    session.info.pop('wrote', None)
@@ -0,0 +1,155 @@
+"""Set-based deletion of competitions, events and members.
+
+The ORM cascades on these models load every registration, arrow score,
+attendance and charge into the session and delete them one row at a time.
+These functions issue one DELETE per table instead, children before parents:
+
+    arrow_score/end_score -> competition_registration -> competition_team
+    -> competition_group -> competition -> event_attendance/member_charge/equipment_loan
+    -> shooting_event
+
+Parents are handled ``DELETE_CHUNK_SIZE`` ids at a time, so memory stays flat
+however much is deleted. Nothing is committed; the caller commits the whole
+deletion as one transaction or rolls it back. Caches and change counters see
+the bulk DELETEs through ``do_orm_execute`` listeners (see
+``bulk_deleted_table`` in app/models.py).
+"""
+from sqlalchemy import Select, union
+from app import db
+from app.models import (User, ShootingEvent, EventAttendance, MemberCharge, BeginnersStudent, Competition,
+                        CompetitionGroup, CompetitionTeam, CompetitionRegistration, ArrowScore, EndScore,
+                        CompetitionResultSnapshot, LeagueResult, SeasonRollup, ClubRecord, RevokedToken,
+                        ClubSettings, Job, EquipmentLoan)
+from app.league import rollups, club_records
+
+# Parent ids per round of DELETEs; also keeps IN lists under SQLite's variable limit
+DELETE_CHUNK_SIZE = 500
+
+
+def _id_list(ids):
+    """Accept a list of ids or a SELECT of one id column"""
+    if isinstance(ids, Select):
+        return list(db.session.scalars(ids))
+    return list(ids)
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), DELETE_CHUNK_SIZE):
+        yield ids[start:start + DELETE_CHUNK_SIZE]
+
+
+def _delete(model, *criteria):
+    result = db.session.execute(
+        db.delete(model).where(*criteria).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _clear(column, ids):
+    """Null a nullable reference to rows about to be deleted"""
+    db.session.execute(
+        db.update(column.class_).where(column.in_(ids)).values({column.key: None})
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _take_out_of_league(competition_ids):
+    """Remove completed competitions from the season rollups and club records while their results exist.
+
+    This is the only per-competition ORM work; it touches league rows, not scores.
+    """
+    excluding = set(competition_ids)
+    for chunk in _chunks(competition_ids):
+        completed = list(db.session.scalars(db.select(Competition.id).where(
+            Competition.id.in_(chunk), Competition.status == 'completed'
+        )))
+        for competition_id in completed:
+            competition = db.session.get(Competition, competition_id)
+            rollups.remove_competition(competition)
+            club_records.remove_competition(competition, excluding=excluding)
+            db.session.flush()
+
+
+def delete_competitions(competition_ids):
+    """Delete competitions with their groups, teams, registrations, scores and league entries.
+
+    ``competition_ids`` is a list of ids or a SELECT of them. Returns the number
+    of competitions deleted. Nothing is committed.
+    """
+    ids = _id_list(competition_ids)
+    if not ids:
+        return 0
+    _take_out_of_league(ids)
+
+    deleted = 0
+    for chunk in _chunks(ids):
+        registrations = db.select(CompetitionRegistration.id).where(CompetitionRegistration.competition_id.in_(chunk))
+        groups = db.select(CompetitionGroup.id).where(CompetitionGroup.competition_id.in_(chunk))
+        _delete(ArrowScore, ArrowScore.registration_id.in_(registrations))
+        _delete(EndScore, EndScore.registration_id.in_(registrations))
+        _delete(CompetitionRegistration, CompetitionRegistration.competition_id.in_(chunk))
+        _delete(CompetitionTeam, CompetitionTeam.group_id.in_(groups))
+        _delete(CompetitionGroup, CompetitionGroup.competition_id.in_(chunk))
+        _delete(CompetitionResultSnapshot, CompetitionResultSnapshot.competition_id.in_(chunk))
+        _delete(LeagueResult, LeagueResult.competition_id.in_(chunk))
+        _delete(ClubRecord, ClubRecord.competition_id.in_(chunk))
+        deleted += _delete(Competition, Competition.id.in_(chunk))
+    return deleted
+
+
+def delete_events(event_ids):
+    """Delete events with their competitions, attendances, charges, equipment loans and beginners course students.
+
+    ``event_ids`` is a list of ids or a SELECT of them. Returns the number of
+    events deleted. Nothing is committed.
+    """
+    ids = _id_list(event_ids)
+    deleted = 0
+    for chunk in _chunks(ids):
+        delete_competitions(db.select(Competition.id).where(Competition.event_id.in_(chunk)))
+        _delete(EventAttendance, EventAttendance.event_id.in_(chunk))
+        _delete(MemberCharge, MemberCharge.event_id.in_(chunk))
+        _delete(BeginnersStudent, BeginnersStudent.event_id.in_(chunk))
+        _delete(EquipmentLoan, EquipmentLoan.event_id.in_(chunk))
+        deleted += _delete(ShootingEvent, ShootingEvent.id.in_(chunk))
+    return deleted
+
+
+def members_with_activity(member_ids):
+    """Ids among ``member_ids`` that registered, attended, were charged, borrowed or recorded anything.
+
+    Deleting those would orphan club history, so they should be deactivated instead.
+    """
+    ids = _id_list(member_ids)
+    active = set()
+    for chunk in _chunks(ids):
+        references = [
+            db.select(column).where(column.in_(chunk)) for column in (
+                CompetitionRegistration.member_id, EventAttendance.member_id, EventAttendance.recorded_by,
+                MemberCharge.member_id, MemberCharge.paid_by_admin, ShootingEvent.created_by,
+                Competition.created_by, ArrowScore.recorded_by, EndScore.recorded_by,
+                EquipmentLoan.member_id, EquipmentLoan.created_by
+            )
+        ]
+        active.update(db.session.scalars(union(*references)))
+    return active
+
+
+def delete_members(member_ids):
+    """Delete members along with their revoked tokens and league entries.
+
+    Check ``members_with_activity`` first: with foreign keys enforced, the
+    database rejects deleting a member with recorded activity. Returns the
+    number of members deleted. Nothing is committed.
+    """
+    ids = _id_list(member_ids)
+    deleted = 0
+    for chunk in _chunks(ids):
+        _clear(ClubSettings.updated_by, chunk)
+        _clear(Job.created_by, chunk)
+        _delete(RevokedToken, RevokedToken.user_id.in_(chunk))
+        _delete(LeagueResult, LeagueResult.member_id.in_(chunk))
+        _delete(SeasonRollup, SeasonRollup.member_id.in_(chunk))
+        _delete(ClubRecord, ClubRecord.member_id.in_(chunk))
+        deleted += _delete(User, User.id.in_(chunk))
+    return deleted
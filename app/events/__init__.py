@@ -2,6 +2,9 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from app import db
 from app.models import ShootingEvent, EventAttendance, MemberCharge, User, Competition, BeginnersStudent
+from app.db_routing import read_replica
+from app.deletion import delete_events
+from app.events.equipment import match_course_equipment
 from app.forms import ShootingEventForm, AttendanceForm, PaymentUpdateForm, CompetitionForm, BeginnersStudentForm
 from datetime import datetime, date, time
 from sqlalchemy import desc, asc
@@ -21,6 +24,7 @@ def admin_required(f):
 
 @events_bp.route('/')
 @login_required
+@read_replica
 def calendar():
     """Show shooting calendar"""
     # Get upcoming events
@@ -105,16 +109,6 @@ def view_event(id):
         beginners_students = BeginnersStudent.query.filter_by(event_id=id).all()
         beginners_student_form = BeginnersStudentForm()
     
-    # Get unregistered members for regular events (for quick registration)
-    unregistered_members = []
-    if event.event_type == 'regular' and current_user.is_admin():
-        registered_member_ids = [p.id for p in all_participants]
-        unregistered_members = User.query.filter(
-            User.role == 'member',
-            User.is_active == True,
-            ~User.id.in_(registered_member_ids)
-        ).order_by(User.first_name, User.last_name).all()
-    
     # Count totals for display
     total_members = len(all_participants)
     total_students = len(beginners_students) if event.event_type == 'beginners_course' else 0
@@ -132,14 +126,29 @@ def view_event(id):
                          competition_form=competition_form,
                          beginners_students=beginners_students,
                          beginners_student_form=beginners_student_form,
-                         unregistered_members=unregistered_members,
                          total_members=total_members,
                          total_students=total_students,
                          total_registered=total_registered,
                          total_attended=total_attended,
                          attended_count=attended_count,
                          attendance_count=attendance_count,
-                         user_registration=user_registration)
+                         user_registration=user_registration,
+                         event_teams=event_teams)
+
+def event_teams(event):
+    """Teams of the event's competitions, ordered for grouping by group name.
+    
+    Called from the cached teams fragment of view_event.html, so it only runs
+    when the fragment is re-rendered.
+    """
+    from app.models import CompetitionGroup, CompetitionTeam, CompetitionRegistration
+    from sqlalchemy.orm import contains_eager, selectinload
+    return CompetitionTeam.query.join(CompetitionTeam.group).join(CompetitionGroup.competition).filter(
+        Competition.event_id == event.id
+    ).options(
+        contains_eager(CompetitionTeam.group),
+        selectinload(CompetitionTeam.registrations).joinedload(CompetitionRegistration.member)
+    ).order_by(CompetitionGroup.name, CompetitionTeam.team_number).all()
 
 @events_bp.route('/event/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -186,12 +195,13 @@ def delete_event(id):
     event = ShootingEvent.query.get_or_404(id)
     
     # Check if event has attendances
-    if event.attendances:
+    if EventAttendance.query.filter_by(event_id=id).first():
         flash('Cannot delete event with recorded attendances. Consider canceling the event instead.', 'error')
         return redirect(url_for('events.view_event', id=id))
     
     event_name = event.name
-    db.session.delete(event)
+    # Set-based: its competition, charges and students go without being loaded
+    delete_events([id])
     db.session.commit()
     
     flash(f'Event "{event_name}" deleted successfully.', 'success')
@@ -273,13 +283,6 @@ def manage_attendance(id):
     # Calculate statistics for template
     attended_count = sum(1 for attendance in attendances if attendance.attended_at is not None)
     
-    # Get available users for the add attendee modal (users not already registered)
-    registered_user_ids = [attendance.member_id for attendance in attendances]
-    available_users = User.query.filter(
-        User.is_active == True,
-        ~User.id.in_(registered_user_ids)
-    ).order_by(User.first_name, User.last_name).all()
-    
     # Get competition groups if this is a competition event
     competition_groups = []
     if event.competition and len(event.competition) > 0:
@@ -295,7 +298,6 @@ def manage_attendance(id):
                          attendances=attendances,
                          all_attendees=all_attendees,
                          attended_count=attended_count,
-                         available_users=available_users,
                          competition_groups=competition_groups)
 
 @events_bp.route('/payments')
@@ -385,6 +387,10 @@ def add_attendee(event_id):
         flash('Please select a member', 'error')
         return redirect(url_for('events.manage_attendance', id=event_id))
     
+    if not User.query.filter_by(id=member_id, is_active=True).first():
+        flash('Please select an active member', 'error')
+        return redirect(url_for('events.manage_attendance', id=event_id))
+    
     # Check if already registered
     existing = EventAttendance.query.filter_by(
         event_id=event_id, member_id=member_id
@@ -928,3 +934,26 @@ def delete_beginners_student(event_id, student_id):
     
     flash(f'Student {student_name} removed from course.', 'success')
     return redirect(url_for('events.view_event', id=event_id))
+
+
+@events_bp.route('/events/<int:event_id>/beginners/match-equipment', methods=['POST'])
+@login_required
+@admin_required
+def match_beginners_equipment(event_id):
+    """Assign bows and arrows from the inventory to every student of a beginners course"""
+    event = ShootingEvent.query.get_or_404(event_id)
+    
+    if event.event_type != 'beginners_course':
+        flash('This is not a beginners course event.', 'error')
+        return redirect(url_for('events.view_event', id=event_id))
+    
+    result = match_course_equipment(event)
+    db.session.commit()
+    
+    flash(f"Equipment matched: {result['bows']} of {result['students']} students have a bow, "
+          f"{result['arrows']} have arrows.", 'success')
+    if result['without_bow']:
+        flash(f"No suitable bow left for: {', '.join(result['without_bow'])}", 'warning')
+    if result['without_arrows']:
+        flash(f"No suitable arrows left for: {', '.join(result['without_arrows'])}", 'warning')
+    return redirect(url_for('events.view_event', id=event_id))
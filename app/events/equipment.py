@@ -0,0 +1,276 @@
+"""Matching bows and arrows from the inventory to beginners course students.
+
+``match_course_equipment`` assigns every student of a course a bow and a set
+of arrows in one go:
+
+1. Each student's needs are estimated: shooting hand, a draw weight window
+   by age nudged by height, and a draw length from height (wingspan / 2.5,
+   taking wingspan as height; height is estimated from age when missing).
+2. Candidate items come from two indexed queries, one for bows (on
+   bow_type, handedness and draw_weight) and one for arrows (on length),
+   covering the whole course at once.
+3. A min-cost assignment over students and item units picks the set of
+   matches that fits the course best overall. An item is never handed out
+   more times than its quantity, counting other courses on the same day and
+   loans during the course (see app/inventory/loans.py).
+
+Students with nothing suitable left keep no bow or arrows, and are
+reported so staff can sort them out by hand.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from app import db
+from app.models import BeginnersStudent, InventoryItem, InventoryCategory, ShootingEvent
+from app.inventory.loans import units_on_loan
+
+# Beginner draw weight window (lbs) by age: (up to age, lightest, heaviest)
+DRAW_WEIGHT_BY_AGE = ((9, 10, 16), (12, 12, 20), (15, 16, 24), (17, 18, 26), (200, 18, 28))
+# Heights (cm) mapped onto the bottom and top of the draw weight window
+SHORT_CM, TALL_CM = 140, 190
+# Arrows must be at least this much longer than the draw length, and at most this much more again
+ARROW_CLEARANCE_IN = 1.0
+ARROW_MAX_EXTRA_IN = 4.0
+# Recommended bow length (inches) by draw length: (up to draw length, bow length)
+BOW_LENGTH_BY_DRAW = ((24, 62), (26, 66), (28, 68), (99, 70))
+UNUSABLE_CONDITIONS = ('poor', 'damaged')
+# Cost of leaving a student without an item; any suitable item costs less
+UNMATCHED_COST = 1000.0
+
+
+@dataclass
+class Needs:
+    """What a student needs from a bow and arrows"""
+    student_id: int
+    handedness: str
+    draw_weight_min: int
+    draw_weight_max: int
+    draw_weight_target: float
+    draw_length: float
+    bow_length: int
+
+
+def estimated_height(student):
+    """Height in cm, or a typical height for the student's age"""
+    if student.height_cm:
+        return student.height_cm
+    return min(170, 110 + 6 * max(0, student.age - 5))
+
+
+def student_needs(student):
+    height = estimated_height(student)
+    low, high = next((low, high) for up_to, low, high in DRAW_WEIGHT_BY_AGE if student.age <= up_to)
+    # Taller students aim for the heavier end of their window
+    position = min(1.0, max(0.0, (height - SHORT_CM) / (TALL_CM - SHORT_CM)))
+    draw_length = round(height / 2.54 / 2.5, 1)
+    return Needs(
+        student_id=student.id,
+        handedness='left' if student.orientation == 'left_handed' else 'right',
+        draw_weight_min=low,
+        draw_weight_max=high,
+        draw_weight_target=low + (high - low) * position,
+        draw_length=draw_length,
+        bow_length=next(length for up_to, length in BOW_LENGTH_BY_DRAW if draw_length <= up_to),
+    )
+
+
+def _category_ids(name):
+    return db.select(InventoryCategory.id).where(db.func.lower(InventoryCategory.name) == name)
+
+
+def candidate_bows(needs):
+    """Usable bows fitting at least one student, in one indexed query"""
+    if not needs:
+        return []
+    return InventoryItem.query.filter(
+        InventoryItem.category_id.in_(_category_ids('bows')),
+        db.or_(InventoryItem.bow_type.is_(None), InventoryItem.bow_type != 'compound'),
+        InventoryItem.handedness.in_({need.handedness for need in needs}),
+        InventoryItem.draw_weight.between(min(need.draw_weight_min for need in needs),
+                                          max(need.draw_weight_max for need in needs)),
+        InventoryItem.condition.not_in(UNUSABLE_CONDITIONS),
+        InventoryItem.quantity > 0,
+    ).all()
+
+
+def candidate_arrows(needs):
+    """Usable arrow sets fitting at least one student, in one indexed query"""
+    if not needs:
+        return []
+    return InventoryItem.query.filter(
+        InventoryItem.category_id.in_(_category_ids('arrows')),
+        InventoryItem.length.between(min(need.draw_length for need in needs) + ARROW_CLEARANCE_IN,
+                                     max(need.draw_length for need in needs) + ARROW_CLEARANCE_IN
+                                     + ARROW_MAX_EXTRA_IN),
+        InventoryItem.condition.not_in(UNUSABLE_CONDITIONS),
+        InventoryItem.quantity > 0,
+    ).all()
+
+
+def bow_cost(need, bow):
+    """How well a bow suits a student (lower is better), or None if it doesn't"""
+    if bow.handedness != need.handedness:
+        return None
+    if not need.draw_weight_min <= bow.draw_weight <= need.draw_weight_max:
+        return None
+    cost = abs(bow.draw_weight - need.draw_weight_target)
+    if bow.length:
+        cost += abs(bow.length - need.bow_length) / 2
+    if bow.condition == 'fair':
+        cost += 2
+    return cost
+
+
+def arrows_cost(need, arrows):
+    """How well a set of arrows suits a student (lower is better), or None if it doesn't"""
+    shortest = need.draw_length + ARROW_CLEARANCE_IN
+    if not shortest <= arrows.length <= shortest + ARROW_MAX_EXTRA_IN:
+        return None
+    cost = arrows.length - shortest
+    if arrows.condition == 'fair':
+        cost += 2
+    return cost
+
+
+def min_cost_assignment(costs):
+    """Assign each row a distinct column, minimising the total cost (Hungarian method).
+
+    ``costs`` is a list of equally long rows with at least as many columns as
+    rows. Returns the chosen column of each row.
+    """
+    rows = len(costs)
+    if not rows:
+        return []
+    columns = len(costs[0])
+    infinity = float('inf')
+    # Potentials and matches are 1-based, with 0 as the virtual starting column
+    row_potential = [0.0] * (rows + 1)
+    column_potential = [0.0] * (columns + 1)
+    row_of_column = [0] * (columns + 1)
+    previous_column = [0] * (columns + 1)
+
+    for row in range(1, rows + 1):
+        row_of_column[0] = row
+        column = 0
+        min_slack = [infinity] * (columns + 1)
+        used = [False] * (columns + 1)
+        while True:
+            used[column] = True
+            current_row = row_of_column[column]
+            delta = infinity
+            next_column = 0
+            row_costs = costs[current_row - 1]
+            for candidate in range(1, columns + 1):
+                if used[candidate]:
+                    continue
+                slack = row_costs[candidate - 1] - row_potential[current_row] - column_potential[candidate]
+                if slack < min_slack[candidate]:
+                    min_slack[candidate] = slack
+                    previous_column[candidate] = column
+                if min_slack[candidate] < delta:
+                    delta = min_slack[candidate]
+                    next_column = candidate
+            for candidate in range(columns + 1):
+                if used[candidate]:
+                    row_potential[row_of_column[candidate]] += delta
+                    column_potential[candidate] -= delta
+                else:
+                    min_slack[candidate] -= delta
+            column = next_column
+            if row_of_column[column] == 0:
+                break
+        # Flip the augmenting path
+        while column:
+            previous = previous_column[column]
+            row_of_column[column] = row_of_column[previous]
+            column = previous
+
+    assignment = [None] * rows
+    for column in range(1, columns + 1):
+        if row_of_column[column]:
+            assignment[row_of_column[column] - 1] = column - 1
+    return assignment
+
+
+def _assign(needs, items, cost_of, booked):
+    """Pick at most one item per student, using each item no more than its free quantity"""
+    free = {item.id: item.quantity - booked.get(item.id, 0) for item in items}
+    # A student only ever needs to choose between their len(needs) cheapest
+    # units, so each item contributes as many units as any student could use
+    unit_counts = {}
+    for need in needs:
+        fitting = []
+        for item in items:
+            cost = cost_of(need, item)
+            if cost is not None and free[item.id] > 0:
+                fitting.append((cost, item.id))
+        taken = 0
+        for cost, item_id in sorted(fitting):
+            if taken >= len(needs):
+                break
+            count = min(free[item_id], len(needs) - taken)
+            unit_counts[item_id] = max(unit_counts.get(item_id, 0), count)
+            taken += count
+    items_by_id = {item.id: item for item in items}
+    units = [items_by_id[item_id] for item_id in sorted(unit_counts) for _ in range(unit_counts[item_id])]
+
+    forbidden = UNMATCHED_COST * 2
+    costs = []
+    for need in needs:
+        row = []
+        for item in units:
+            cost = cost_of(need, item)
+            row.append(forbidden if cost is None else cost)
+        # One "no item" column per student keeps every row assignable
+        costs.append(row + [UNMATCHED_COST] * len(needs))
+
+    picks = {}
+    for row, column in enumerate(min_cost_assignment(costs)):
+        if costs[row][column] < UNMATCHED_COST:
+            picks[needs[row].student_id] = units[column]
+    return picks
+
+
+def _booked_elsewhere(event, column, items):
+    """Units of each item already given to students of other courses on the same day or lent during the course"""
+    rows = db.session.query(column, db.func.count()).join(
+        ShootingEvent, BeginnersStudent.event_id == ShootingEvent.id
+    ).filter(
+        ShootingEvent.date == event.date, BeginnersStudent.event_id != event.id, column.isnot(None)
+    ).group_by(column).all()
+    booked = dict(rows)
+
+    starts_at = datetime.combine(event.date, event.start_time)
+    lent = units_on_loan(starts_at, starts_at + timedelta(hours=event.duration_hours),
+                         [item.id for item in items], exclude_event_id=event.id)
+    for item_id, units in lent.items():
+        booked[item_id] = booked.get(item_id, 0) + units
+    return booked
+
+
+def match_course_equipment(event):
+    """Assign a bow and arrows to every student of a beginners course.
+
+    Replaces earlier assignments for the course. Returns a dict with the
+    number of students, how many got a bow and arrows, and the names of those
+    left without. Nothing is committed.
+    """
+    students = BeginnersStudent.query.filter_by(event_id=event.id).order_by(BeginnersStudent.id).all()
+    needs = [student_needs(student) for student in students]
+
+    bow_items = candidate_bows(needs)
+    arrow_items = candidate_arrows(needs)
+    bows = _assign(needs, bow_items, bow_cost, _booked_elsewhere(event, BeginnersStudent.bow_id, bow_items))
+    arrows = _assign(needs, arrow_items, arrows_cost,
+                     _booked_elsewhere(event, BeginnersStudent.arrows_id, arrow_items))
+
+    for student in students:
+        student.bow = bows.get(student.id)
+        student.arrows = arrows.get(student.id)
+
+    return {
+        'students': len(students),
+        'bows': len(bows),
+        'arrows': len(arrows),
+        'without_bow': [student.name for student in students if student.id not in bows],
+        'without_arrows': [student.name for student in students if student.id not in arrows],
+    }
@@ -1,8 +1,8 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, TextAreaField, IntegerField, DecimalField, SelectField, DateField, PasswordField, SubmitField, BooleanField
+from wtforms import StringField, TextAreaField, IntegerField, DecimalField, SelectField, DateField, DateTimeLocalField, PasswordField, SubmitField, BooleanField
 from wtforms.validators import DataRequired, Length, Email, EqualTo, NumberRange, Optional, ValidationError
 from wtforms.widgets import TextArea
-from app.models import InventoryCategory
+from app.choices import category_choices, group_choices, event_choices
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(1, 64)])
@@ -59,48 +59,33 @@ class InventoryItemForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(InventoryItemForm, self).__init__(*args, **kwargs)
-        # Populate category choices dynamically
-        self.category_id.choices = [(c.id, c.name) for c in InventoryCategory.query.all()]
+        # Populate category choices dynamically (cached, see app/choices.py)
+        self.category_id.choices = category_choices()
 
-# Specialized forms for different inventory categories
-class BowForm(InventoryItemForm):
-    draw_weight = IntegerField('Draw Weight (lbs)', validators=[Optional(), NumberRange(min=10, max=80)])
-    length = DecimalField('Length (inches)', validators=[Optional(), NumberRange(min=48, max=72)], places=1)
-    bow_type = SelectField('Bow Type', choices=[
-        ('recurve', 'Recurve'),
-        ('compound', 'Compound'),
-        ('longbow', 'Longbow'),
-        ('barebow', 'Barebow')
-    ], validators=[Optional()])
-    handedness = SelectField('Direction', choices=[
-        ('right', 'Right Handed'),
-        ('left', 'Left Handed')
-    ], validators=[Optional()])
-
-class ArrowForm(InventoryItemForm):
-    spine = IntegerField('Spine', validators=[Optional(), NumberRange(min=200, max=1000)])
-    length = DecimalField('Length (inches)', validators=[Optional(), NumberRange(min=20, max=35)], places=1)
-    point_weight = IntegerField('Point Weight (grains)', validators=[Optional(), NumberRange(min=60, max=300)])
-    fletching_type = SelectField('Fletching Type', choices=[
-        ('feather', 'Feather'),
-        ('plastic', 'Plastic Vane'),
-        ('carbon', 'Carbon Vane')
-    ], validators=[Optional()])
-
-class TargetForm(InventoryItemForm):
-    face_size = IntegerField('Face Size (cm)', validators=[Optional(), NumberRange(min=20, max=150)])
-    target_type = SelectField('Target Type', choices=[
-        ('10-ring', '10-Ring Target'),
-        ('3-spot', '3-Spot Vertical'),
-        ('field', 'Field Target'),
-        ('3d', '3D Target')
-    ], validators=[Optional()])
-    material = SelectField('Material', choices=[
-        ('straw', 'Straw'),
-        ('foam', 'Foam'),
-        ('paper', 'Paper'),
-        ('cardboard', 'Cardboard')
-    ], validators=[Optional()])
+class EquipmentLoanForm(FlaskForm):
+    quantity = IntegerField('Quantity', validators=[DataRequired(), NumberRange(min=1)], default=1)
+    # Lent to a member (picked with the member search typeahead) or for an event
+    member_id = IntegerField('Member', validators=[Optional()])
+    event_id = SelectField('Event', coerce=int, default=0)
+    starts_at = DateTimeLocalField('From', format='%Y-%m-%dT%H:%M', validators=[DataRequired()])
+    ends_at = DateTimeLocalField('Due Back', format='%Y-%m-%dT%H:%M', validators=[DataRequired()])
+    notes = TextAreaField('Notes', validators=[Optional(), Length(0, 500)])
+    submit = SubmitField('Lend')
+    
+    def __init__(self, *args, **kwargs):
+        super(EquipmentLoanForm, self).__init__(*args, **kwargs)
+        self.event_id.choices = [(0, 'No event')] + event_choices()
+    
+    def validate_member_id(self, field):
+        from app.models import User
+        if field.data and not User.query.filter_by(id=field.data, is_active=True).first():
+            raise ValidationError('Choose an active member.')
+        if not field.data and not self.event_id.data:
+            raise ValidationError('Choose a member or an event to lend to.')
+    
+    def validate_ends_at(self, field):
+        if self.starts_at.data and field.data and field.data <= self.starts_at.data:
+            raise ValidationError('The loan must end after it starts.')
 
 class MemberEditForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(1, 64)])
@@ -149,16 +134,15 @@ class ShootingEventForm(FlaskForm):
                 self.location.data = settings.default_location
 
 class AttendanceForm(FlaskForm):
-    member_id = SelectField('Member', coerce=int, validators=[DataRequired()])
+    # Picked with the member search typeahead rather than a list of every member
+    member_id = IntegerField('Member', validators=[DataRequired()])
     notes = TextAreaField('Notes', validators=[Optional(), Length(0, 500)])
     submit = SubmitField('Mark Attendance')
     
-    def __init__(self, *args, **kwargs):
-        super(AttendanceForm, self).__init__(*args, **kwargs)
+    def validate_member_id(self, field):
         from app.models import User
-        # Only show active members
-        self.member_id.choices = [(u.id, f"{u.first_name} {u.last_name} ({u.username})") 
-                                 for u in User.query.filter_by(is_active=True).order_by(User.first_name, User.last_name).all()]
+        if not User.query.filter_by(id=field.data, is_active=True).first():
+            raise ValidationError('Choose an active member.')
 
 class PaymentUpdateForm(FlaskForm):
     payment_notes = TextAreaField('Payment Notes', validators=[Optional(), Length(0, 500)])
@@ -193,8 +177,7 @@ class CompetitionRegistrationForm(FlaskForm):
     def __init__(self, competition_id=None, *args, **kwargs):
         super(CompetitionRegistrationForm, self).__init__(*args, **kwargs)
         if competition_id:
-            from app.models import CompetitionGroup
-            self.group_id.choices = [(g.id, g.name) for g in CompetitionGroup.query.filter_by(competition_id=competition_id).all()]
+            self.group_id.choices = group_choices(competition_id)
 
 class ArrowScoreForm(FlaskForm):
     points = IntegerField('Points', validators=[DataRequired(), NumberRange(min=0, max=10)])
@@ -0,0 +1,173 @@
+"""Cached template fragments.
+
+Templates wrap an expensive section in a call block::
+
+    {% call cached('dashboard-stats', today, tables=('user', 'inventory_item')) %}
+        ...
+    {% endcall %}
+
+The rendered HTML is keyed by the fragment name, the viewer's role, any extra
+key parts and the ChangeCounter version of each table the section reads, so a
+committed write to one of those tables in any worker makes old entries
+unreachable. Entries live in a bounded in-process cache and, when
+``FRAGMENT_CACHE_URL`` points at a Redis server (and the redis package is
+installed), in that shared store as well. Local entries that depend on a table
+are also dropped as soon as a write to it is committed in this process.
+"""
+import hashlib
+import threading
+from collections import defaultdict
+from flask import current_app, g, has_app_context
+from flask_login import current_user
+from markupsafe import Markup
+from sqlalchemy import event
+from app import db
+from app.cache import LRUCache
+from app.models import ChangeCounter, bulk_deleted_table
+
+try:
+    import redis
+except ImportError:  # Optional shared backend
+    redis = None
+
+_fragment_cache = LRUCache(maxsize=512, ttl=300)
+_shared = {'client': None}
+
+# Per-fragment counters and the local keys depending on each table
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_keys_by_table = defaultdict(set)
+_lock = threading.Lock()
+
+
+def init_app(app):
+    """Size the cache, connect the shared backend and expose ``cached`` to templates"""
+    _fragment_cache.maxsize = app.config['FRAGMENT_CACHE_SIZE']
+    _fragment_cache.ttl = app.config['FRAGMENT_CACHE_TTL']
+    _fragment_cache.clear()
+    with _lock:
+        _stats.clear()
+        _keys_by_table.clear()
+
+    _shared['client'] = None
+    url = app.config.get('FRAGMENT_CACHE_URL')
+    if url:
+        if redis is None:
+            app.logger.warning('FRAGMENT_CACHE_URL is set but redis is not installed; '
+                               'using the in-process fragment cache only')
+        else:
+            _shared['client'] = redis.Redis.from_url(url)
+
+    app.jinja_env.globals['cached'] = cached
+    app.before_request(_reset_table_versions)
+
+
+def viewer_role():
+    if not current_user.is_authenticated:
+        return 'anonymous'
+    return current_user.role
+
+
+def _reset_table_versions():
+    g.pop('_fragment_versions', None)
+
+
+def _table_versions(tables):
+    """ChangeCounter versions of ``tables``, read once per request"""
+    versions = g.setdefault('_fragment_versions', {})
+    if tables not in versions:
+        versions[tables] = ChangeCounter.versions(*tables) if tables else ()
+    return versions[tables]
+
+
+def _shared_get(key):
+    client = _shared['client']
+    if client is None:
+        return None
+    try:
+        value = client.get(key)
+    except redis.RedisError:
+        current_app.logger.exception('Fragment cache backend unavailable')
+        return None
+    return None if value is None else Markup(value.decode())
+
+
+def _shared_set(key, html):
+    client = _shared['client']
+    if client is None:
+        return
+    try:
+        client.set(key, str(html).encode(), ex=current_app.config['FRAGMENT_CACHE_TTL'])
+    except redis.RedisError:
+        current_app.logger.exception('Fragment cache backend unavailable')
+
+
+def cached(name, *vary, tables=(), caller=None):
+    """Render the body of a ``{% call %}`` block once per name, role, key parts and table versions"""
+    if not current_app.config['FRAGMENT_CACHE_ENABLED']:
+        return caller()
+
+    tables = tuple(tables)
+    parts = (viewer_role(), vary, _table_versions(tables))
+    key = f'fragment:{name}:{hashlib.sha1(repr(parts).encode()).hexdigest()}'
+
+    html = _fragment_cache.get(key)
+    if html is None:
+        html = _shared_get(key)
+        if html is not None:
+            _fragment_cache.set(key, html)
+    with _lock:
+        _stats[name]['hits' if html is not None else 'misses'] += 1
+    if html is not None:
+        return html
+
+    html = Markup(caller())
+    _fragment_cache.set(key, html)
+    _shared_set(key, html)
+    with _lock:
+        for table in tables:
+            _keys_by_table[table].add(key)
+    return html
+
+
+def fragment_stats():
+    """Hit and miss counts per fragment, for the admin settings page"""
+    with _lock:
+        rows = [dict(name=name, **counts) for name, counts in sorted(_stats.items())]
+    for row in rows:
+        total = row['hits'] + row['misses']
+        row['hit_rate'] = row['hits'] / total if total else 0.0
+    return {'fragments': rows, 'entries': len(_fragment_cache), 'maxsize': _fragment_cache.maxsize,
+            'shared': _shared['client'] is not None}
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_written_tables(session, flush_context):
+    tables = session.info.setdefault('fragment_tables', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        tables.add(obj.__table__.name)
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _collect_bulk_deleted_table(orm_execute_state):
+    table_name = bulk_deleted_table(orm_execute_state)
+    if table_name:
+        orm_execute_state.session.info.setdefault('fragment_tables', set()).add(table_name)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_fragments(session):
+    tables = session.info.pop('fragment_tables', None)
+    if not tables:
+        return
+    with _lock:
+        keys = set().union(*(_keys_by_table.pop(table, ()) for table in tables))
+    for key in keys:
+        _fragment_cache.pop(key)
+    # Later fragments in this request must see the new versions
+    if has_app_context():
+        _reset_table_versions()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_written_tables(session):
+    session.info.pop('fragment_tables', None)
@@ -1,13 +1,20 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, Response
 from flask_login import login_required, current_user
 from app import db
-from app.models import InventoryItem, InventoryCategory
-from app.forms import InventoryItemForm, InventoryCategoryForm, BowForm, ArrowForm, TargetForm
+from app.models import InventoryItem, InventoryCategory, EquipmentLoan, User, ShootingEvent
+from app.forms import InventoryCategoryForm, EquipmentLoanForm
+from app.inventory.schemas import schema_for
+from app.inventory.search import search_items
+from app.inventory.filters import parse_filters, apply_filters, filter_args, FilterError
+from app.inventory.loans import available_units, fully_booked_item_ids, lend, return_loan, LoanError
 from datetime import datetime
 import json
 
 inventory_bp = Blueprint('inventory', __name__)
 
+# As posted by <input type="datetime-local">
+DATETIME_LOCAL_FORMAT = '%Y-%m-%dT%H:%M'
+
 def admin_required(f):
     """Decorator to require admin role"""
     def decorated_function(*args, **kwargs):
@@ -18,6 +25,13 @@ def admin_required(f):
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+def _parse_datetime(value):
+    """Parse a datetime-local value, or None if blank or invalid"""
+    try:
+        return datetime.strptime((value or '').strip(), DATETIME_LOCAL_FORMAT)
+    except ValueError:
+        return None
+
 @inventory_bp.route('/')
 @login_required
 def index():
@@ -30,21 +44,53 @@ def index():
     if category_id:
         query = query.filter_by(category_id=category_id)
     
+    # Equipment spec filters, e.g. draw_weight_min=20&handedness=right
+    try:
+        filters = parse_filters(request.args)
+    except FilterError as e:
+        flash(str(e), 'error')
+        filters = {}
+    query = apply_filters(query, filters)
+    
+    # Only items with a unit free for the whole window, e.g. Saturday 10:00-12:00
+    available_from = _parse_datetime(request.args.get('available_from'))
+    available_until = _parse_datetime(request.args.get('available_until'))
+    if available_from and available_until and available_until <= available_from:
+        flash('The availability window must end after it starts.', 'error')
+        available_from = available_until = None
+    if available_from:
+        query = query.filter(InventoryItem.quantity > 0)
+        booked = fully_booked_item_ids(available_from, available_until)
+        if booked:
+            query = query.filter(InventoryItem.id.not_in(booked))
+    
+    # Full-text matches come ranked by relevance (see app/inventory/search.py)
     if search:
-        query = query.filter(InventoryItem.name.contains(search) | 
-                           InventoryItem.description.contains(search))
+        query = search_items(query, search)
+    else:
+        query = query.order_by(InventoryItem.name)
     
-    items = query.order_by(InventoryItem.name).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    items = query.paginate(page=page, per_page=20, error_out=False)
+    # Units free right now, or during the requested window
+    available = available_units(items.items, available_from, available_until)
     
     categories = InventoryCategory.query.all()
     
+    window = {}
+    if available_from:
+        window['available_from'] = available_from.strftime(DATETIME_LOCAL_FORMAT)
+        if available_until:
+            window['available_until'] = available_until.strftime(DATETIME_LOCAL_FORMAT)
+    
     return render_template('inventory/index.html', 
                          items=items, 
                          categories=categories,
                          current_category=category_id,
-                         search=search)
+                         search=search,
+                         # Pagination links carry the availability window too
+                         filters={**filter_args(filters), **window},
+                         available=available,
+                         window=window)
 
 @inventory_bp.route('/categories')
 @login_required
@@ -89,7 +135,10 @@ def edit_category(id):
 @login_required
 @admin_required
 def new_item():
-    form = InventoryItemForm()
+    # The posted category decides which attribute fields are validated
+    category = db.session.get(InventoryCategory, request.form.get('category_id', type=int) or 0)
+    schema = schema_for(category)
+    form = schema.form_class()
     
     if form.validate_on_submit():
         # Create base item
@@ -103,33 +152,37 @@ def new_item():
             purchase_price=form.purchase_price.data,
             condition=form.condition.data,
             notes=form.notes.data,
-            category_id=form.category_id.data
+            category_id=form.category_id.data,
+            attributes=schema.attributes(form)
         )
         
-        # Add category-specific attributes from form data
-        category = InventoryCategory.query.get(form.category_id.data)
-        if category:
-            item.attributes = extract_category_attributes(request.form, category.name)
-        
         db.session.add(item)
         db.session.commit()
         flash('Item added successfully!', 'success')
         return redirect(url_for('inventory.index'))
     
-    return render_template('inventory/item_form.html', form=form, title='New Item')
+    category_values, category_errors = schema.submitted(form)
+    return render_template('inventory/item_form.html', form=form, title='New Item',
+                           category_values=category_values, category_errors=category_errors)
 
 @inventory_bp.route('/item/<int:id>')
 @login_required
 def view_item(id):
     item = InventoryItem.query.get_or_404(id)
-    return render_template('inventory/view_item.html', item=item)
+    available = available_units([item])[item.id]
+    loans = item.loans.filter(EquipmentLoan.returned_at.is_(None)).order_by(EquipmentLoan.starts_at).all()
+    return render_template('inventory/view_item.html', item=item, available=available, loans=loans)
 
 @inventory_bp.route('/item/<int:id>/edit', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def edit_item(id):
     item = InventoryItem.query.get_or_404(id)
-    form = InventoryItemForm(obj=item)
+    category = item.category
+    if request.method == 'POST':
+        category = db.session.get(InventoryCategory, request.form.get('category_id', type=int) or 0)
+    schema = schema_for(category)
+    form = schema.form_class(obj=item)
     
     if form.validate_on_submit():
         item.name = form.name.data
@@ -143,17 +196,15 @@ def edit_item(id):
         item.notes = form.notes.data
         item.category_id = form.category_id.data
         item.updated_at = datetime.utcnow()
-        
-        # Update category-specific attributes from form data
-        category = InventoryCategory.query.get(form.category_id.data)
-        if category:
-            item.attributes = extract_category_attributes(request.form, category.name)
+        item.attributes = schema.attributes(form)
         
         db.session.commit()
         flash('Item updated successfully!', 'success')
         return redirect(url_for('inventory.view_item', id=id))
     
-    return render_template('inventory/item_form.html', form=form, title='Edit Item', item=item)
+    category_values, category_errors = schema.submitted(form)
+    return render_template('inventory/item_form.html', form=form, title='Edit Item', item=item,
+                           category_values=category_values, category_errors=category_errors)
 
 @inventory_bp.route('/item/<int:id>/delete', methods=['POST'])
 @login_required
@@ -165,137 +216,68 @@ def delete_item(id):
     flash('Item deleted successfully!', 'success')
     return redirect(url_for('inventory.index'))
 
+@inventory_bp.route('/item/<int:id>/lend', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def lend_item(id):
+    item = InventoryItem.query.get_or_404(id)
+    form = EquipmentLoanForm()
+    
+    if form.validate_on_submit():
+        try:
+            lend(item, form.quantity.data, form.starts_at.data, form.ends_at.data, current_user,
+                 member=db.session.get(User, form.member_id.data) if form.member_id.data else None,
+                 event=db.session.get(ShootingEvent, form.event_id.data) if form.event_id.data else None,
+                 notes=form.notes.data)
+        except LoanError as e:
+            db.session.rollback()
+            flash(str(e), 'error')
+        else:
+            db.session.commit()
+            flash(f'{form.quantity.data} {item.name} lent.', 'success')
+            return redirect(url_for('inventory.view_item', id=id))
+    
+    if request.method == 'GET':
+        form.starts_at.data = datetime.now().replace(second=0, microsecond=0)
+    return render_template('inventory/lend_item.html', form=form, item=item)
+
+@inventory_bp.route('/loans')
+@login_required
+@admin_required
+def loans():
+    """Equipment currently out or booked, soonest first"""
+    page = request.args.get('page', 1, type=int)
+    loans = EquipmentLoan.query.filter(EquipmentLoan.returned_at.is_(None)).order_by(
+        EquipmentLoan.starts_at
+    ).paginate(page=page, per_page=50, error_out=False)
+    return render_template('inventory/loans.html', loans=loans, now=datetime.now())
+
+@inventory_bp.route('/loans/<int:id>/return', methods=['POST'])
+@login_required
+@admin_required
+def return_item(id):
+    loan = EquipmentLoan.query.get_or_404(id)
+    item_id, item_name = loan.item_id, loan.item.name
+    started = loan.starts_at < datetime.now()
+    return_loan(loan)
+    db.session.commit()
+    flash(f'{item_name} checked back in.' if started else f'{item_name} booking cancelled.', 'success')
+    if request.form.get('next') == 'item':
+        return redirect(url_for('inventory.view_item', id=item_id))
+    return redirect(url_for('inventory.loans'))
+
 @inventory_bp.route('/api/category-fields/<int:category_id>')
 @login_required
 def get_category_fields(category_id):
     """API endpoint to get form fields for a specific category"""
     category = InventoryCategory.query.get_or_404(category_id)
+    schema = schema_for(category)
     
-    fields = []
-    
-    if category.name.lower() == 'bows':
-        fields = [
-            {
-                'name': 'draw_weight',
-                'label': 'Draw Weight (lbs)',
-                'type': 'number',
-                'min': 10,
-                'max': 80,
-                'required': False
-            },
-            {
-                'name': 'length', 
-                'label': 'Length (inches)',
-                'type': 'number',
-                'min': 48,
-                'max': 72,
-                'step': '0.1',
-                'required': False
-            },
-            {
-                'name': 'bow_type',
-                'label': 'Bow Type',
-                'type': 'select',
-                'options': [
-                    {'value': '', 'label': 'Select Type'},
-                    {'value': 'recurve', 'label': 'Recurve'},
-                    {'value': 'compound', 'label': 'Compound'},
-                    {'value': 'longbow', 'label': 'Longbow'},
-                    {'value': 'barebow', 'label': 'Barebow'}
-                ],
-                'required': False
-            },
-            {
-                'name': 'handedness',
-                'label': 'Direction',
-                'type': 'select',
-                'options': [
-                    {'value': '', 'label': 'Select Direction'},
-                    {'value': 'right', 'label': 'Right Handed'},
-                    {'value': 'left', 'label': 'Left Handed'}
-                ],
-                'required': False
-            }
-        ]
-    elif category.name.lower() == 'arrows':
-        fields = [
-            {
-                'name': 'spine',
-                'label': 'Spine',
-                'type': 'number',
-                'min': 200,
-                'max': 1000,
-                'required': False
-            },
-            {
-                'name': 'length',
-                'label': 'Length (inches)',
-                'type': 'number',
-                'min': 20,
-                'max': 35,
-                'step': '0.1',
-                'required': False
-            },
-            {
-                'name': 'point_weight',
-                'label': 'Point Weight (grains)',
-                'type': 'number',
-                'min': 60,
-                'max': 300,
-                'required': False
-            },
-            {
-                'name': 'fletching_type',
-                'label': 'Fletching Type',
-                'type': 'select',
-                'options': [
-                    {'value': '', 'label': 'Select Type'},
-                    {'value': 'feather', 'label': 'Feather'},
-                    {'value': 'plastic', 'label': 'Plastic Vane'},
-                    {'value': 'carbon', 'label': 'Carbon Vane'}
-                ],
-                'required': False
-            }
-        ]
-    elif category.name.lower() == 'targets':
-        fields = [
-            {
-                'name': 'face_size',
-                'label': 'Face Size (cm)', 
-                'type': 'number',
-                'min': 20,
-                'max': 150,
-                'required': False
-            },
-            {
-                'name': 'target_type',
-                'label': 'Target Type',
-                'type': 'select',
-                'options': [
-                    {'value': '', 'label': 'Select Type'},
-                    {'value': '10-ring', 'label': '10-Ring Target'},
-                    {'value': '3-spot', 'label': '3-Spot Vertical'},
-                    {'value': 'field', 'label': 'Field Target'},
-                    {'value': '3d', 'label': '3D Target'}
-                ],
-                'required': False
-            },
-            {
-                'name': 'material',
-                'label': 'Material',
-                'type': 'select',
-                'options': [
-                    {'value': '', 'label': 'Select Material'},
-                    {'value': 'straw', 'label': 'Straw'},
-                    {'value': 'foam', 'label': 'Foam'},
-                    {'value': 'paper', 'label': 'Paper'},
-                    {'value': 'cardboard', 'label': 'Cardboard'}
-                ],
-                'required': False
-            }
-        ]
-    
-    return jsonify({'fields': fields})
+    # The field specs are encoded once at startup (see app/inventory/schemas.py)
+    response = Response(schema.body, mimetype='application/json')
+    response.set_etag(schema.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 @inventory_bp.route('/api/item-attributes/<int:item_id>')
 @login_required 
@@ -303,104 +285,3 @@ def get_item_attributes(item_id):
     """API endpoint to get existing attributes for an item (for edit forms)"""
     item = InventoryItem.query.get_or_404(item_id)
     return jsonify({'attributes': item.attributes or {}})
-
-def get_form_for_category(category):
-    """Return appropriate form class based on category"""
-    if not category:
-        return InventoryItemForm()
-    
-    category_forms = {
-        'bows': BowForm,
-        'arrows': ArrowForm,
-        'targets': TargetForm,
-    }
-    
-    form_class = category_forms.get(category.name.lower(), InventoryItemForm)
-    return form_class()
-
-def get_category_attributes(form, category_name):
-    """Extract category-specific attributes from form"""
-    attributes = {}
-    
-    if category_name.lower() == 'bows':
-        if hasattr(form, 'draw_weight') and form.draw_weight.data:
-            attributes['draw_weight'] = form.draw_weight.data
-        if hasattr(form, 'length') and form.length.data:
-            attributes['length'] = float(form.length.data)
-        if hasattr(form, 'bow_type') and form.bow_type.data:
-            attributes['bow_type'] = form.bow_type.data
-        if hasattr(form, 'handedness') and form.handedness.data:
-            attributes['handedness'] = form.handedness.data
-    
-    elif category_name.lower() == 'arrows':
-        if hasattr(form, 'spine') and form.spine.data:
-            attributes['spine'] = form.spine.data
-        if hasattr(form, 'length') and form.length.data:
-            attributes['length'] = float(form.length.data)
-        if hasattr(form, 'point_weight') and form.point_weight.data:
-            attributes['point_weight'] = form.point_weight.data
-        if hasattr(form, 'fletching_type') and form.fletching_type.data:
-            attributes['fletching_type'] = form.fletching_type.data
-    
-    elif category_name.lower() == 'targets':
-        if hasattr(form, 'face_size') and form.face_size.data:
-            attributes['face_size'] = form.face_size.data
-        if hasattr(form, 'target_type') and form.target_type.data:
-            attributes['target_type'] = form.target_type.data
-        if hasattr(form, 'material') and form.material.data:
-            attributes['material'] = form.material.data
-    
-    return attributes
-
-def populate_form_from_item(form, item):
-    """Populate form with item data including category-specific attributes"""
-    form.name.data = item.name
-    form.description.data = item.description
-    form.quantity.data = item.quantity
-    form.unit.data = item.unit
-    form.location.data = item.location
-    form.purchase_date.data = item.purchase_date
-    form.purchase_price.data = item.purchase_price
-    form.condition.data = item.condition
-    form.notes.data = item.notes
-    form.category_id.data = item.category_id
-    
-    # Populate category-specific attributes
-    if item.attributes:
-        for attr_name, attr_value in item.attributes.items():
-            if hasattr(form, attr_name):
-                getattr(form, attr_name).data = attr_value
-
-def extract_category_attributes(form_data, category_name):
-    """Extract category-specific attributes from form data"""
-    attributes = {}
-    
-    if category_name.lower() == 'bows':
-        if form_data.get('draw_weight'):
-            attributes['draw_weight'] = int(form_data['draw_weight'])
-        if form_data.get('length'):
-            attributes['length'] = float(form_data['length'])
-        if form_data.get('bow_type'):
-            attributes['bow_type'] = form_data['bow_type']
-        if form_data.get('handedness'):
-            attributes['handedness'] = form_data['handedness']
-    
-    elif category_name.lower() == 'arrows':
-        if form_data.get('spine'):
-            attributes['spine'] = int(form_data['spine'])
-        if form_data.get('length'):
-            attributes['length'] = float(form_data['length'])
-        if form_data.get('point_weight'):
-            attributes['point_weight'] = int(form_data['point_weight'])
-        if form_data.get('fletching_type'):
-            attributes['fletching_type'] = form_data['fletching_type']
-    
-    elif category_name.lower() == 'targets':
-        if form_data.get('face_size'):
-            attributes['face_size'] = int(form_data['face_size'])
-        if form_data.get('target_type'):
-            attributes['target_type'] = form_data['target_type']
-        if form_data.get('material'):
-            attributes['material'] = form_data['material']
-    
-    return attributes
@@ -0,0 +1,64 @@
+"""Structured equipment filters for the inventory listing and API.
+
+Filters run against the indexed spec columns on ``InventoryItem`` (copied from
+``attributes`` on save), so they are answered in SQL instead of by loading
+every item and inspecting its JSON:
+
+- numeric specs take ``<name>_min`` and ``<name>_max`` (inclusive) or an exact ``<name>``
+- text specs take ``<name>``, or several values separated by commas
+
+e.g. ``?bow_type=recurve&handedness=right&draw_weight_min=20&draw_weight_max=26``
+"""
+from app.models import InventoryItem
+
+RANGE_FILTERS = ('draw_weight', 'spine', 'length', 'face_size')
+CHOICE_FILTERS = ('bow_type', 'handedness')
+
+
+class FilterError(ValueError):
+    """Invalid filter value; the message is safe to show"""
+
+
+def _number(name, raw):
+    cast = InventoryItem.SPEC_ATTRIBUTES[name]
+    try:
+        return cast(raw)
+    except ValueError:
+        raise FilterError(f'{name} must be a number')
+
+
+def parse_filters(args):
+    """Get the active filters from request args as {param: value}, ignoring blanks.
+
+    Raises FilterError for a non-numeric range bound.
+    """
+    filters = {}
+    for name in RANGE_FILTERS:
+        for param in (name, f'{name}_min', f'{name}_max'):
+            raw = (args.get(param) or '').strip()
+            if raw:
+                filters[param] = _number(name, raw)
+    for name in CHOICE_FILTERS:
+        values = [value.strip().lower() for value in (args.get(name) or '').split(',') if value.strip()]
+        if values:
+            filters[name] = values
+    return filters
+
+
+def apply_filters(query, filters):
+    """Restrict an InventoryItem query to the items matching ``parse_filters`` output"""
+    for param, value in filters.items():
+        if param.endswith('_min'):
+            query = query.filter(getattr(InventoryItem, param[:-4]) >= value)
+        elif param.endswith('_max'):
+            query = query.filter(getattr(InventoryItem, param[:-4]) <= value)
+        elif param in CHOICE_FILTERS:
+            query = query.filter(getattr(InventoryItem, param).in_(value))
+        else:
+            query = query.filter(getattr(InventoryItem, param) == value)
+    return query
+
+
+def filter_args(filters):
+    """The filters as query string args again, for pagination links"""
+    return {param: ','.join(value) if isinstance(value, list) else value for param, value in filters.items()}
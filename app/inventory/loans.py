@@ -0,0 +1,137 @@
+"""Equipment loans and item availability over time.
+
+An ``EquipmentLoan`` takes ``quantity`` units of an item from ``starts_at``
+until ``ends_at``. Returning it early moves ``ends_at`` to the return time;
+a loan that is not back by ``ends_at`` is overdue and stays out until it is
+returned. Loans last at most ``MAX_LOAN_DAYS``, which keeps the availability
+lookups on the indexes however long the loan history grows. The loans that
+hold units at some point in a window [start, end) are:
+
+- those starting in [start - MAX_LOAN_DAYS, end) and ending after start,
+  a bounded range scan of ``ix_equipment_loan_interval``
+- the overdue ones, from ``ix_equipment_loan_open``
+
+That is O(log n + k) for the k loans found. The units out at once are then
+counted per item by sweeping over those k intervals, so a unit lent twice
+back to back within the window is counted once.
+"""
+from datetime import datetime, timedelta
+from app import db
+from app.models import EquipmentLoan, InventoryItem
+
+MAX_LOAN_DAYS = 90
+
+
+class LoanError(ValueError):
+    """A loan that can't be made; the message is safe to show"""
+
+
+def _holds_until(loan, now):
+    """When a loan frees its units; overdue loans hold them indefinitely"""
+    if loan.returned_at is None and loan.ends_at <= now:
+        return datetime.max
+    return loan.ends_at
+
+
+def overlapping_loans(starts_at, ends_at=None, item_ids=None, exclude_event_id=None):
+    """Loans holding units at some point in [starts_at, ends_at), or at the instant ``starts_at``"""
+    now = datetime.now()
+    if ends_at is None:
+        starts_before = EquipmentLoan.starts_at <= starts_at
+    else:
+        starts_before = EquipmentLoan.starts_at < ends_at
+
+    criteria = []
+    if item_ids is not None:
+        criteria.append(EquipmentLoan.item_id.in_(item_ids))
+    if exclude_event_id is not None:
+        criteria.append(db.or_(EquipmentLoan.event_id.is_(None), EquipmentLoan.event_id != exclude_event_id))
+
+    scheduled = EquipmentLoan.query.filter(
+        EquipmentLoan.starts_at >= starts_at - timedelta(days=MAX_LOAN_DAYS),
+        starts_before,
+        EquipmentLoan.ends_at > starts_at,
+        *criteria
+    ).all()
+    overdue = EquipmentLoan.query.filter(
+        EquipmentLoan.returned_at.is_(None),
+        EquipmentLoan.ends_at <= now,
+        starts_before,
+        *criteria
+    ).all()
+    return list({loan.id: loan for loan in scheduled + overdue}.values())
+
+
+def units_on_loan(starts_at, ends_at=None, item_ids=None, exclude_event_id=None):
+    """The most units of each item out at once during the window, as {item id: units}"""
+    now = datetime.now()
+    changes = {}
+    for loan in overlapping_loans(starts_at, ends_at, item_ids, exclude_event_id):
+        changes.setdefault(loan.item_id, []).extend([
+            (max(loan.starts_at, starts_at), 1, loan.quantity),
+            (_holds_until(loan, now), 0, -loan.quantity),
+        ])
+
+    peaks = {}
+    for item_id, item_changes in changes.items():
+        # Returns sort before loans starting at the same time
+        out = peak = 0
+        for _, _, units in sorted(item_changes):
+            out += units
+            peak = max(peak, out)
+        peaks[item_id] = peak
+    return peaks
+
+
+def available_units(items, starts_at=None, ends_at=None):
+    """Units of each item free for the whole window (default: right now), as {item id: units}"""
+    items = list(items)
+    out = units_on_loan(starts_at or datetime.now(), ends_at, [item.id for item in items])
+    return {item.id: max(0, item.quantity - out.get(item.id, 0)) for item in items}
+
+
+def fully_booked_item_ids(starts_at, ends_at=None):
+    """Ids of the items with no unit free for the whole window"""
+    out = units_on_loan(starts_at, ends_at)
+    if not out:
+        return set()
+    quantities = db.session.query(InventoryItem.id, InventoryItem.quantity).filter(
+        InventoryItem.id.in_(list(out))
+    )
+    return {item_id for item_id, quantity in quantities if out[item_id] >= quantity}
+
+
+def lend(item, quantity, starts_at, ends_at, created_by, member=None, event=None, notes=None):
+    """Lend units of an item to a member or an event.
+
+    Raises LoanError if the interval is invalid or not enough units are free
+    during it. Nothing is committed.
+    """
+    if member is None and event is None:
+        raise LoanError('Choose a member or an event to lend to.')
+    if ends_at <= starts_at:
+        raise LoanError('The loan must end after it starts.')
+    if ends_at - starts_at > timedelta(days=MAX_LOAN_DAYS):
+        raise LoanError(f'Loans can last at most {MAX_LOAN_DAYS} days.')
+
+    # Lock the item so two loans can't both take the last units
+    item = db.session.query(InventoryItem).filter_by(id=item.id).with_for_update().one()
+    free = available_units([item], starts_at, ends_at)[item.id]
+    if quantity > free:
+        raise LoanError(f'Only {free} of {item.quantity} {item.name} free for that time.')
+
+    loan = EquipmentLoan(item_id=item.id, quantity=quantity, member_id=member.id if member else None,
+                         event_id=event.id if event else None, starts_at=starts_at, ends_at=ends_at,
+                         notes=notes, created_by=created_by.id)
+    db.session.add(loan)
+    return loan
+
+
+def return_loan(loan):
+    """Check a loan back in; a loan that hasn't started yet is cancelled. Nothing is committed."""
+    now = datetime.now()
+    if loan.starts_at >= now:
+        db.session.delete(loan)
+        return
+    loan.returned_at = now
+    loan.ends_at = min(loan.ends_at, now)
@@ -0,0 +1,131 @@
+"""Category-specific inventory fields, declared once per category.
+
+``CATEGORY_FIELDS`` maps a category name (lower case) to its fields. At import
+each entry is compiled into a ``CategorySchema`` holding everything the
+inventory views need:
+
+- ``form_class``: ``InventoryItemForm`` plus the category's fields and validators
+- ``body``/``etag``: the pre-encoded JSON field specs the item form's script renders
+- ``attributes(form)``: the typed ``attributes`` dict from a validated form
+
+Adding a category means adding an entry here; nothing is rebuilt per request.
+Categories without an entry get the plain item form and no extra fields.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from wtforms import IntegerField, DecimalField, SelectField
+from wtforms.validators import Optional, NumberRange
+from app.forms import InventoryItemForm
+
+
+@dataclass(frozen=True)
+class Number:
+    """A whole number, or a decimal with ``step`` when ``places`` is set"""
+    name: str
+    label: str
+    min: int
+    max: int
+    places: int = 0
+
+    def form_field(self):
+        validators = [Optional(), NumberRange(min=self.min, max=self.max)]
+        if self.places:
+            return DecimalField(self.label, validators=validators, places=self.places)
+        return IntegerField(self.label, validators=validators)
+
+    def spec(self):
+        spec = {'name': self.name, 'label': self.label, 'type': 'number', 'min': self.min, 'max': self.max,
+                'required': False}
+        if self.places:
+            spec['step'] = str(10 ** -self.places)
+        return spec
+
+    def value(self, data):
+        return float(data) if self.places else int(data)
+
+
+@dataclass(frozen=True)
+class Choice:
+    """One of a fixed set of values; ``placeholder`` labels the empty choice"""
+    name: str
+    label: str
+    choices: tuple
+    placeholder: str
+
+    def form_field(self):
+        return SelectField(self.label, choices=[('', self.placeholder), *self.choices], validators=[Optional()])
+
+    def spec(self):
+        options = [{'value': value, 'label': label} for value, label in [('', self.placeholder), *self.choices]]
+        return {'name': self.name, 'label': self.label, 'type': 'select', 'options': options, 'required': False}
+
+    def value(self, data):
+        return data
+
+
+CATEGORY_FIELDS = {
+    'bows': (
+        Number('draw_weight', 'Draw Weight (lbs)', 10, 80),
+        Number('length', 'Length (inches)', 48, 72, places=1),
+        Choice('bow_type', 'Bow Type', (
+            ('recurve', 'Recurve'), ('compound', 'Compound'), ('longbow', 'Longbow'), ('barebow', 'Barebow'),
+        ), 'Select Type'),
+        Choice('handedness', 'Direction', (('right', 'Right Handed'), ('left', 'Left Handed')), 'Select Direction'),
+    ),
+    'arrows': (
+        Number('spine', 'Spine', 200, 1000),
+        Number('length', 'Length (inches)', 20, 35, places=1),
+        Number('point_weight', 'Point Weight (grains)', 60, 300),
+        Choice('fletching_type', 'Fletching Type', (
+            ('feather', 'Feather'), ('plastic', 'Plastic Vane'), ('carbon', 'Carbon Vane'),
+        ), 'Select Type'),
+    ),
+    'targets': (
+        Number('face_size', 'Face Size (cm)', 20, 150),
+        Choice('target_type', 'Target Type', (
+            ('10-ring', '10-Ring Target'), ('3-spot', '3-Spot Vertical'), ('field', 'Field Target'), ('3d', '3D Target'),
+        ), 'Select Type'),
+        Choice('material', 'Material', (
+            ('straw', 'Straw'), ('foam', 'Foam'), ('paper', 'Paper'), ('cardboard', 'Cardboard'),
+        ), 'Select Material'),
+    ),
+}
+
+
+class CategorySchema:
+    """The compiled form class, JSON field specs and attribute extraction of one category"""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self.field_names = tuple(field.name for field in fields)
+        self.form_class = type(f'{name.title().replace(" ", "")}ItemForm', (InventoryItemForm,),
+                               {field.name: field.form_field() for field in fields})
+        self.body = json.dumps({'fields': [field.spec() for field in fields]}).encode()
+        self.etag = hashlib.sha1(self.body).hexdigest()
+
+    def attributes(self, form):
+        """The category attributes of a validated form, leaving out blank fields"""
+        attributes = {}
+        for field in self.fields:
+            data = getattr(form, field.name).data
+            if data not in (None, ''):
+                attributes[field.name] = field.value(data)
+        return attributes
+
+    def submitted(self, form):
+        """Raw submitted values and errors of the category fields, to re-fill them after a failed submit"""
+        values = {name: getattr(form, name).raw_data[0] for name in self.field_names if getattr(form, name).raw_data}
+        errors = {name: getattr(form, name).errors for name in self.field_names if getattr(form, name).errors}
+        return values, errors
+
+
+_schemas = {name: CategorySchema(name, fields) for name, fields in CATEGORY_FIELDS.items()}
+_no_fields = CategorySchema('item', ())
+
+
+def schema_for(category):
+    """The compiled schema of a category (or category name); categories without fields get an empty one"""
+    name = getattr(category, 'name', category)
+    return _schemas.get((name or '').lower(), _no_fields)
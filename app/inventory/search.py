@@ -0,0 +1,173 @@
+"""Full-text search over inventory items.
+
+Each item's name, description, notes, location and ``attributes`` values are
+indexed in a table next to ``inventory_item``:
+
+- SQLite: an FTS5 virtual table ``inventory_item_fts`` keyed by the item id,
+  ranked with ``bm25``
+- PostgreSQL: ``inventory_item_search`` holding a weighted ``tsvector`` with a
+  GIN index, ranked with ``ts_rank``
+
+Both are created by ``db.create_all()`` and kept in step by a flush listener
+as items are added, edited and deleted. Other databases fall back to
+substring matching. ``flask reindex-inventory`` rebuilds the index and fills
+the spec columns of app/inventory/filters.py from the items. ``flask init-db``
+adds those columns to an existing database and then reindexes.
+"""
+import re
+from sqlalchemy import event, text
+from app import db
+from app.models import InventoryItem
+
+FTS_TABLE = 'inventory_item_fts'
+TSVECTOR_TABLE = 'inventory_item_search'
+INDEXED_FIELDS = ('name', 'description', 'notes', 'location', 'attributes')
+# Relative weight of a match in each field, for bm25 on SQLite
+FIELD_WEIGHTS = (10.0, 4.0, 2.0, 2.0, 3.0)
+REINDEX_BATCH_SIZE = 500
+
+_SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(INDEXED_FIELDS)}, tokenize='unicode61 remove_diacritics 2')",
+]
+_POSTGRESQL_DDL = [
+    f"CREATE TABLE IF NOT EXISTS {TSVECTOR_TABLE} ("
+    "item_id INTEGER PRIMARY KEY REFERENCES inventory_item (id) ON DELETE CASCADE, "
+    "document TSVECTOR NOT NULL)",
+    f"CREATE INDEX IF NOT EXISTS ix_{TSVECTOR_TABLE}_document ON {TSVECTOR_TABLE} USING GIN (document)",
+]
+# Name weighs most, then description, then everything else
+_POSTGRESQL_DOCUMENT = (
+    "setweight(to_tsvector('simple', CAST(:name AS TEXT)), 'A') || "
+    "setweight(to_tsvector('simple', CAST(:description AS TEXT)), 'B') || "
+    "setweight(to_tsvector('simple', CAST(:notes AS TEXT) || ' ' || CAST(:location AS TEXT) || ' ' || "
+    "CAST(:attributes AS TEXT)), 'C')"
+)
+
+
+def _backend(dialect_name):
+    return dialect_name if dialect_name in ('sqlite', 'postgresql') else None
+
+
+def _words(term):
+    return re.findall(r'\w+', (term or '').lower())
+
+
+def _attribute_text(attributes):
+    """The values of an item's category attributes as one string"""
+    if not isinstance(attributes, dict):
+        return ''
+    values = []
+    for value in attributes.values():
+        values.extend(value if isinstance(value, list) else [value])
+    return ' '.join(str(value) for value in values if value not in (None, ''))
+
+
+def _document(item):
+    document = {field: getattr(item, field) or '' for field in INDEXED_FIELDS}
+    document['attributes'] = _attribute_text(item.attributes)
+    return document
+
+
+def _write(connection, items):
+    backend = _backend(connection.dialect.name)
+    if backend is None or not items:
+        return
+    rows = [{'id': item.id, **_document(item)} for item in items]
+    if backend == 'sqlite':
+        connection.execute(text(f'DELETE FROM {FTS_TABLE} WHERE rowid = :id'), rows)
+        connection.execute(text(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(INDEXED_FIELDS)}) "
+            f"VALUES (:id, {', '.join(':' + field for field in INDEXED_FIELDS)})"
+        ), rows)
+    else:
+        connection.execute(text(
+            f'INSERT INTO {TSVECTOR_TABLE} (item_id, document) VALUES (:id, {_POSTGRESQL_DOCUMENT}) '
+            'ON CONFLICT (item_id) DO UPDATE SET document = EXCLUDED.document'
+        ), rows)
+
+
+def _remove(connection, item_ids):
+    # PostgreSQL rows go with the item through ON DELETE CASCADE
+    if _backend(connection.dialect.name) == 'sqlite' and item_ids:
+        connection.execute(text(f'DELETE FROM {FTS_TABLE} WHERE rowid = :id'), [{'id': id} for id in item_ids])
+
+
+def _indexed_fields_changed(item):
+    state = db.inspect(item)
+    return any(state.attrs[field].history.has_changes() for field in INDEXED_FIELDS)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _create_index_tables(target, connection, **kw):
+    backend = _backend(connection.dialect.name)
+    for statement in {'sqlite': _SQLITE_DDL, 'postgresql': _POSTGRESQL_DDL}.get(backend, []):
+        connection.execute(text(statement))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_index(session, flush_context):
+    """Index added and edited items and drop deleted ones, in the same transaction"""
+    changed = [obj for obj in session.new if isinstance(obj, InventoryItem)]
+    changed += [obj for obj in session.dirty if isinstance(obj, InventoryItem) and _indexed_fields_changed(obj)]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, InventoryItem)]
+    if changed or deleted:
+        connection = session.connection(bind_arguments={'mapper': InventoryItem})
+        _write(connection, changed)
+        _remove(connection, deleted)
+
+
+def reindex(batch_size=REINDEX_BATCH_SIZE):
+    """Rebuild the whole index, and the spec columns, from the items; returns the number indexed. Commits."""
+    connection = db.session.connection(bind_arguments={'mapper': InventoryItem})
+    backend = _backend(connection.dialect.name)
+    if backend is None:
+        return 0
+    connection.execute(text(f'DELETE FROM {FTS_TABLE if backend == "sqlite" else TSVECTOR_TABLE}'))
+
+    count = 0
+    last_id = 0
+    while True:
+        items = InventoryItem.query.filter(InventoryItem.id > last_id).order_by(InventoryItem.id).limit(batch_size).all()
+        if not items:
+            break
+        # Items saved before the spec columns existed only have their attributes
+        for item in items:
+            item.sync_spec_columns('attributes', item.attributes)
+        db.session.flush()
+        _write(connection, items)
+        count += len(items)
+        last_id = items[-1].id
+        db.session.expunge_all()
+    db.session.commit()
+    return count
+
+
+def search_items(query, term):
+    """Restrict an InventoryItem query to the items matching ``term``, best matches first"""
+    words = _words(term)
+    if not words:
+        return query.filter(db.false())
+
+    backend = _backend(db.session.get_bind(mapper=InventoryItem.__mapper__).dialect.name)
+    if backend == 'sqlite':
+        fts = db.table(FTS_TABLE, db.column('rowid'))
+        fts_match = ' '.join(f'"{word}"*' for word in words)
+        matches = db.select(
+            fts.c.rowid.label('item_id'),
+            db.func.bm25(db.literal_column(FTS_TABLE), *FIELD_WEIGHTS).label('rank')
+        ).where(db.literal_column(FTS_TABLE).op('MATCH')(fts_match)).subquery()
+        # bm25 scores better matches lower
+        return query.join(matches, matches.c.item_id == InventoryItem.id).order_by(matches.c.rank, InventoryItem.name)
+
+    if backend == 'postgresql':
+        documents = db.table(TSVECTOR_TABLE, db.column('item_id'), db.column('document'))
+        tsquery = db.func.to_tsquery('simple', ' & '.join(f'{word}:*' for word in words))
+        return query.join(documents, documents.c.item_id == InventoryItem.id).filter(
+            documents.c.document.op('@@')(tsquery)
+        ).order_by(db.func.ts_rank(documents.c.document, tsquery).desc(), InventoryItem.name)
+
+    for word in words:
+        query = query.filter(db.or_(*[getattr(InventoryItem, field).icontains(word, autoescape=True)
+                                      for field in INDEXED_FIELDS[:-1]]))
+    return query.order_by(InventoryItem.name)
@@ -0,0 +1,95 @@
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask_login import login_required, current_user
+from functools import wraps
+from datetime import datetime
+from app import db
+from app.models import Job
+from app.jobs.runner import task_labels, run_inline
+
+jobs_bp = Blueprint('jobs', __name__)
+
+def admin_required(f):
+    """Decorator to require admin role"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin():
+            flash('Admin access required.', 'error')
+            return redirect(url_for('main.dashboard'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def _local_url(url):
+    """Only follow relative links back into the app"""
+    if url and url.startswith('/') and not url.startswith('//'):
+        return url
+    return None
+
+def flash_outcome(job):
+    """Flash a finished job's message and notes, as the route would have done itself"""
+    if job.status == 'failed':
+        flash(job.message or 'The job failed.', 'error')
+        return
+    result = job.result_data or {}
+    flash(job.message or 'Done.', 'success')
+    for note in result.get('notes', []):
+        flash(note, 'success')
+
+def redirect_to_job(job, next_url):
+    """Send the admin to a queued job's status page, or straight to ``next_url`` once it has finished"""
+    if job.is_finished:
+        flash_outcome(job)
+        return redirect(next_url)
+    return redirect(url_for('jobs.view_job', id=job.id, next=next_url))
+
+@jobs_bp.route('/')
+@login_required
+@admin_required
+def index():
+    """Recent background jobs"""
+    jobs = Job.query.order_by(Job.id.desc()).limit(50).all()
+    return render_template('jobs/index.html', jobs=jobs, labels=task_labels())
+
+@jobs_bp.route('/<int:id>')
+@login_required
+@admin_required
+def view_job(id):
+    """Progress of a single job; the page polls the status endpoint until the job finishes"""
+    job = Job.query.get_or_404(id)
+    next_url = _local_url(request.args.get('next'))
+    return render_template('jobs/view.html', job=job, label=task_labels().get(job.kind, job.kind),
+                           next_url=next_url)
+
+@jobs_bp.route('/<int:id>/status')
+@login_required
+@admin_required
+def job_status(id):
+    """Current job state as JSON"""
+    job = Job.query.get_or_404(id)
+    return jsonify(job.to_dict())
+
+@jobs_bp.route('/<int:id>/retry', methods=['POST'])
+@login_required
+@admin_required
+def retry_job(id):
+    """Queue a failed job again with a fresh set of attempts"""
+    job = Job.query.get_or_404(id)
+    next_url = _local_url(request.args.get('next'))
+
+    if job.status != 'failed':
+        flash('Only failed jobs can be retried.', 'error')
+        return redirect(url_for('jobs.view_job', id=id, next=next_url))
+
+    job.status = 'queued'
+    job.attempts = 0
+    job.progress = 0
+    job.run_after = datetime.utcnow()
+    job.message = 'Queued again.'
+    job.error = None
+    job.finished_at = None
+    db.session.commit()
+
+    job = run_inline(job)
+    if job.is_finished and next_url:
+        return redirect_to_job(job, next_url)
+    flash('Job queued again.', 'info')
+    return redirect(url_for('jobs.view_job', id=id, next=next_url))
@@ -0,0 +1,224 @@
+"""Database-backed background jobs.
+
+Admin routes ``enqueue`` slow work and send the admin to the job's status
+page instead of running it inside the request (and the gunicorn timeout).
+``flask run-jobs`` starts worker threads that claim queued jobs with a
+conditional UPDATE, so any number of worker processes can share the queue.
+
+A job that raises is retried with exponential backoff until it has used
+``max_attempts``; ``JobError`` fails it straight away. A running job whose
+worker stops sending heartbeats for ``JOB_STALE_SECONDS`` goes back in the
+queue. Tasks run again from the start on retry, so they should commit in
+small units that are safe to repeat and call ``report_progress`` between them.
+"""
+import json
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import Job
+
+# Queued jobs looked at per claim attempt, in case other workers take the first ones
+CLAIM_BATCH = 5
+
+_tasks = {}
+
+
+class JobError(Exception):
+    """A failure retrying won't fix; the message is shown to the admin"""
+
+
+def task(kind, label=None):
+    """Register a function as the task run for jobs of ``kind``.
+
+    The function is called with the Job and the job's payload as keyword
+    arguments. It may return a JSON-serialisable dict; its ``message`` becomes
+    the job's message and its ``notes`` are listed on the status page.
+    """
+    def register(f):
+        f.job_kind = kind
+        f.job_label = label or kind
+        _tasks[kind] = f
+        return f
+    return register
+
+
+def task_labels():
+    return {kind: f.job_label for kind, f in _tasks.items()}
+
+
+def enqueue(task_function, payload=None, created_by=None, max_attempts=None, unique=False):
+    """Queue a registered task with ``payload`` as its keyword arguments and return the Job.
+
+    With ``unique``, an unfinished job for the same task and payload is
+    returned instead of queueing another. Commits the session. When
+    ``JOBS_RUN_INLINE`` is set the job also runs right away, in this request.
+    """
+    body = json.dumps(payload or {}, sort_keys=True)
+    if unique:
+        existing = Job.query.filter(Job.kind == task_function.job_kind, Job.payload == body,
+                                    Job.status.in_(('queued', 'running'))).first()
+        if existing:
+            return existing
+
+    job = Job(kind=task_function.job_kind, payload=body, created_by=created_by,
+              max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'])
+    db.session.add(job)
+    db.session.commit()
+    return run_inline(job)
+
+
+def run_inline(job):
+    """Run a queued job right away when ``JOBS_RUN_INLINE`` is set (development and tests); returns the job"""
+    if current_app.config['JOBS_RUN_INLINE']:
+        claimed = claim('inline', job_id=job.id)
+        if claimed is not None:
+            return run_job(claimed)
+    return job
+
+
+def report_progress(job, done, total, message=None):
+    """Record progress and a heartbeat for ``job``. Commits the session, so call it between units of work."""
+    job.progress = min(99, int(done * 100 / total)) if total else 0
+    job.heartbeat_at = datetime.utcnow()
+    if message:
+        job.message = message[:255]
+    db.session.commit()
+
+
+def claim(worker, job_id=None):
+    """Mark the next due job (or job ``job_id``) as running for ``worker`` and return it, or None"""
+    now = datetime.utcnow()
+    query = db.select(Job.id).where(Job.status == 'queued', Job.run_after <= now)
+    if job_id is not None:
+        query = query.where(Job.id == job_id)
+    candidates = db.session.scalars(query.order_by(Job.run_after, Job.id).limit(CLAIM_BATCH)).all()
+
+    for candidate in candidates:
+        # Only one worker's UPDATE can still see the job as queued
+        claimed = db.session.execute(
+            db.update(Job).where(Job.id == candidate, Job.status == 'queued').values(
+                status='running', worker=worker, attempts=Job.attempts + 1,
+                started_at=now, heartbeat_at=now, progress=0
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, candidate)
+    return None
+
+
+def run_job(job):
+    """Run a claimed job's task and record the outcome; returns the job"""
+    job_id, kind = job.id, job.kind
+    try:
+        task_function = _tasks.get(kind)
+        if task_function is None:
+            raise JobError(f'No task is registered for {kind} jobs.')
+        result = task_function(job, **job.args)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Job %s (%s) failed', job_id, kind)
+        return _record_failure(db.session.get(Job, job_id), e)
+
+    job = db.session.get(Job, job_id)
+    job.status = 'succeeded'
+    job.progress = 100
+    job.finished_at = datetime.utcnow()
+    job.error = None
+    if result is not None:
+        job.result = json.dumps(result)
+        if isinstance(result, dict) and result.get('message'):
+            job.message = result['message'][:255]
+    db.session.commit()
+    return job
+
+
+def _record_failure(job, error):
+    job.error = traceback.format_exc()
+    if isinstance(error, JobError) or job.attempts >= job.max_attempts:
+        job.status = 'failed'
+        job.finished_at = datetime.utcnow()
+        job.message = (str(error) or type(error).__name__)[:255]
+    else:
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(
+            seconds=current_app.config['JOB_RETRY_DELAY'] * 2 ** (job.attempts - 1)
+        )
+        job.message = f'Attempt {job.attempts} of {job.max_attempts} failed; retrying.'
+    db.session.commit()
+    return job
+
+
+def requeue_stale():
+    """Put running jobs whose worker stopped sending heartbeats back in the queue (or fail them)"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_STALE_SECONDS'])
+    stale = Job.query.filter(Job.status == 'running', Job.heartbeat_at < cutoff).all()
+    for job in stale:
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+            job.message = 'The worker running this job stopped responding.'
+        else:
+            job.status = 'queued'
+            job.run_after = datetime.utcnow()
+            job.message = 'The worker running this job stopped responding; retrying.'
+    if stale:
+        db.session.commit()
+    return len(stale)
+
+
+def work(worker, stop, poll_interval=None, burst=False):
+    """Run jobs until ``stop`` is set, or the queue is empty with ``burst``; returns the number run"""
+    poll_interval = poll_interval or current_app.config['JOB_POLL_INTERVAL']
+    count = 0
+    while not stop.is_set():
+        try:
+            requeue_stale()
+            job = claim(worker)
+            if job is not None:
+                run_job(job)
+                count += 1
+        except Exception:
+            # Keep the worker alive through database outages
+            current_app.logger.exception('Job worker %s could not reach the queue', worker)
+            db.session.rollback()
+            job = None
+        finally:
+            # A fresh session per job, so nothing leaks from one task into the next
+            db.session.remove()
+
+        if job is None:
+            if burst:
+                break
+            stop.wait(poll_interval)
+    return count
+
+
+def run_workers(app, threads=1, poll_interval=None, burst=False, stop=None):
+    """Run ``threads`` workers in this process until stopped; returns the number of jobs run"""
+    stop = stop or threading.Event()
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    counts = [0] * threads
+
+    def worker(n):
+        with app.app_context():
+            counts[n] = work(f'{name}:{n}', stop, poll_interval=poll_interval, burst=burst)
+
+    workers = [threading.Thread(target=worker, args=(n,), name=f'job-worker-{n}', daemon=True)
+               for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    try:
+        for thread in workers:
+            thread.join()
+    except KeyboardInterrupt:
+        # Let running jobs finish; the queue is not touched again
+        stop.set()
+        for thread in workers:
+            thread.join()
+    return sum(counts)
@@ -0,0 +1,87 @@
+from flask import Blueprint, render_template, request
+from flask_login import login_required
+from app import db
+from app.models import SeasonRollup, LeagueResult, User, Competition, ShootingEvent, ClubRecord
+from app.db_routing import read_replica
+from app.league.rollups import season_for, season_label
+from datetime import date
+from sqlalchemy import desc
+from sqlalchemy.orm import joinedload
+
+league_bp = Blueprint('league', __name__)
+
+# Ranking orders for league tables; ties are broken by X count
+LEAGUE_SORTS = {
+    'best': (desc(SeasonRollup.best_score), desc(SeasonRollup.x_count)),
+    'average': (desc(SeasonRollup.total_score * 1.0 / SeasonRollup.competitions_shot), desc(SeasonRollup.x_count)),
+    'shot': (desc(SeasonRollup.competitions_shot), desc(SeasonRollup.best_score)),
+    'x': (desc(SeasonRollup.x_count), desc(SeasonRollup.best_score)),
+}
+
+def league_table_query(season, sort='best'):
+    """Ranking query for one season's league table"""
+    order = LEAGUE_SORTS.get(sort, LEAGUE_SORTS['best'])
+    return SeasonRollup.query.filter_by(season=season).options(
+        joinedload(SeasonRollup.member)
+    ).order_by(*order, SeasonRollup.member_id)
+
+def available_seasons():
+    """Get all seasons that have league data, newest first"""
+    return [row.season for row in db.session.query(SeasonRollup.season).distinct().order_by(
+        desc(SeasonRollup.season)
+    ).all()]
+
+@league_bp.route('/')
+@login_required
+@read_replica
+def index():
+    """Season league table"""
+    seasons = available_seasons()
+    season = request.args.get('season', type=int) or (seasons[0] if seasons else season_for(date.today()))
+    sort = request.args.get('sort', 'best')
+    if sort not in LEAGUE_SORTS:
+        sort = 'best'
+    page = request.args.get('page', 1, type=int)
+
+    rollups = league_table_query(season, sort).paginate(page=page, per_page=25, error_out=False)
+
+    return render_template('league/index.html',
+                         rollups=rollups,
+                         season=season,
+                         season_name=season_label(season),
+                         seasons=[(s, season_label(s)) for s in seasons],
+                         sort=sort)
+
+@league_bp.route('/member/<int:id>')
+@login_required
+@read_replica
+def member_bests(id):
+    """Personal bests and season history for a member"""
+    member = User.query.get_or_404(id)
+
+    rollups = SeasonRollup.query.filter_by(member_id=id).order_by(desc(SeasonRollup.season)).all()
+
+    best_results = db.session.query(LeagueResult, ShootingEvent).join(
+        Competition, LeagueResult.competition_id == Competition.id
+    ).join(
+        ShootingEvent, Competition.event_id == ShootingEvent.id
+    ).filter(
+        LeagueResult.member_id == id
+    ).order_by(desc(LeagueResult.total_score), desc(LeagueResult.x_count)).limit(10).all()
+
+    return render_template('league/member.html',
+                         member=member,
+                         rollups=[(rollup, season_label(rollup.season)) for rollup in rollups],
+                         best_results=best_results)
+
+@league_bp.route('/records')
+@login_required
+@read_replica
+def records():
+    """Club records by round format and group"""
+    club_records = ClubRecord.query.options(joinedload(ClubRecord.member)).order_by(
+        ClubRecord.target_size_cm, ClubRecord.number_of_rounds,
+        ClubRecord.arrows_per_round, ClubRecord.group_name
+    ).all()
+    
+    return render_template('league/records.html', records=club_records)
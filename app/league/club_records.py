@@ -0,0 +1,128 @@
+"""Club records per round format and competition group.
+
+Records are keyed by (rounds, arrows per round, target size, group name) and
+checked as a competition's totals become final on completion, so answering
+"is that a club record?" is a single indexed read.
+"""
+from app import db
+from app.models import ClubRecord, Competition, ShootingEvent
+from app.league.rollups import final_results_data
+
+
+def _group_bests(competition):
+    """Get (group_name, best participant) for each group that has a scored archer"""
+    for group in final_results_data(competition)['groups']:
+        # Participants are already ranked by total score, then X count
+        participants = [p for p in group['participants'] if p['arrow_count']]
+        if participants:
+            yield group['name'], participants[0]
+
+
+def _apply(competition, group_name, participant):
+    """Make a result the record for its key if it beats the current one"""
+    record = ClubRecord.lookup(competition.number_of_rounds, competition.arrows_per_round,
+                               competition.target_size_cm, group_name)
+    if record and not record.is_beaten_by(participant['total_score'], participant['x_count']):
+        return None
+
+    is_new = record is None
+    if is_new:
+        record = ClubRecord(
+            number_of_rounds=competition.number_of_rounds,
+            arrows_per_round=competition.arrows_per_round,
+            target_size_cm=competition.target_size_cm,
+            group_name=group_name
+        )
+    # Fill in before adding so autoflush never sees a half-built record
+    _hold(record, competition, participant)
+    if is_new:
+        db.session.add(record)
+    return record
+
+
+def _hold(record, competition, participant):
+    """Point a record at a participant's result"""
+    record.set_on = competition.event.date
+    record.member_id = participant['member_id']
+    record.competition_id = competition.id
+    record.score = participant['total_score']
+    record.x_count = participant['x_count']
+
+
+def check_competition(competition):
+    """Check a completed competition's final totals against the club records.
+
+    Returns the records that were set or broken. Nothing is committed.
+    """
+    if competition.status != 'completed':
+        return []
+
+    new_records = []
+    for group_name, participant in _group_bests(competition):
+        record = _apply(competition, group_name, participant)
+        if record is not None:
+            # Flush so a second group with the same name sees this record
+            db.session.flush()
+            new_records.append(record)
+    return new_records
+
+
+def _completed_with_format(record, batch_size=20):
+    """Stream completed competitions shot in a record's format, oldest first"""
+    return Competition.query.join(ShootingEvent).filter(
+        Competition.status == 'completed',
+        Competition.number_of_rounds == record.number_of_rounds,
+        Competition.arrows_per_round == record.arrows_per_round,
+        Competition.target_size_cm == record.target_size_cm
+    ).order_by(ShootingEvent.date, Competition.id).yield_per(batch_size)
+
+
+def remove_competition(competition, excluding=()):
+    """Re-derive any records held by a competition from the remaining ones (e.g. before deleting it).
+
+    Competitions in ``excluding`` (ids deleted along with this one) are not
+    considered either. Nothing is committed. Returns the number of records affected.
+    """
+    records = ClubRecord.query.filter_by(competition_id=competition.id).all()
+    for record in records:
+        best = None
+        for other in _completed_with_format(record):
+            if other.id == competition.id or other.id in excluding:
+                continue
+            for group_name, participant in _group_bests(other):
+                if group_name != record.group_name:
+                    continue
+                if best is None or (participant['total_score'], participant['x_count']) > \
+                        (best[1]['total_score'], best[1]['x_count']):
+                    best = (other, participant)
+
+        if best is None:
+            db.session.delete(record)
+            continue
+        _hold(record, *best)
+
+    return len(records)
+
+
+def backfill_all(batch_size=20, echo=None):
+    """Rebuild every club record from history, streaming completed competitions in date order.
+
+    Commits after each batch so memory stays bounded however long the history is.
+    Returns the number of competitions processed.
+    """
+    ClubRecord.query.delete()
+    db.session.commit()
+
+    competition_ids = [row.id for row in db.session.query(Competition.id).join(ShootingEvent).filter(
+        Competition.status == 'completed'
+    ).order_by(ShootingEvent.date, Competition.id).all()]
+
+    for start in range(0, len(competition_ids), batch_size):
+        for competition_id in competition_ids[start:start + batch_size]:
+            check_competition(Competition.query.get(competition_id))
+        db.session.commit()
+        db.session.expunge_all()
+        if echo:
+            echo(f'Processed {min(start + batch_size, len(competition_ids))}/{len(competition_ids)} competitions')
+
+    return len(competition_ids)
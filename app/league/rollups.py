@@ -0,0 +1,159 @@
+"""Incremental season rollups for the league tables.
+
+Each completed competition contributes one LeagueResult per archer and updates
+that archer's SeasonRollup in place, so league tables and personal bests are
+read from small summary tables instead of raw arrow scores.
+"""
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import Competition, LeagueResult, SeasonRollup
+
+
+def season_for(event_date):
+    """Get the season (year the season starts in) an event date belongs to"""
+    start_month = current_app.config.get('LEAGUE_SEASON_START_MONTH', 1)
+    return event_date.year if event_date.month >= start_month else event_date.year - 1
+
+
+def season_label(season):
+    """Human readable season name, e.g. '2025' or '2025/26' for split seasons"""
+    if current_app.config.get('LEAGUE_SEASON_START_MONTH', 1) == 1:
+        return str(season)
+    return f'{season}/{(season + 1) % 100:02d}'
+
+
+def final_results_data(competition):
+    """Get a competition's results structure, preferring the frozen snapshot"""
+    if competition.results_snapshot:
+        return competition.results_snapshot.data
+    from app.competitions.results import build_results
+    return build_results(competition)
+
+
+def _final_results(competition):
+    """Get (member_id, total_score, x_count, arrows_shot) per archer"""
+    data = final_results_data(competition)
+    return [
+        (p['member_id'], p['total_score'], p['x_count'], p['arrow_count'])
+        for group in data['groups'] for p in group['participants']
+    ]
+
+
+def record_competition(competition):
+    """Fold a completed competition into the season rollups.
+
+    Idempotent: a competition that already has league results is skipped.
+    Returns the number of archers recorded. Nothing is committed.
+    """
+    if competition.status != 'completed':
+        return 0
+    if LeagueResult.query.filter_by(competition_id=competition.id).first():
+        return 0
+
+    season = season_for(competition.event.date)
+    results = _final_results(competition)
+    member_ids = [member_id for member_id, _, _, _ in results]
+    rollups = {
+        rollup.member_id: rollup
+        for rollup in SeasonRollup.query.filter(
+            SeasonRollup.season == season,
+            SeasonRollup.member_id.in_(member_ids)
+        ).all()
+    }
+
+    for member_id, total_score, x_count, arrows_shot in results:
+        db.session.add(LeagueResult(
+            competition_id=competition.id,
+            member_id=member_id,
+            season=season,
+            total_score=total_score,
+            x_count=x_count,
+            arrows_shot=arrows_shot
+        ))
+
+        rollup = rollups.get(member_id)
+        if rollup is None:
+            rollup = SeasonRollup(member_id=member_id, season=season, competitions_shot=0,
+                                  total_score=0, best_score=0, x_count=0, arrows_shot=0)
+            db.session.add(rollup)
+        rollup.competitions_shot += 1
+        rollup.total_score += total_score
+        rollup.best_score = max(rollup.best_score, total_score)
+        rollup.x_count += x_count
+        rollup.arrows_shot += arrows_shot
+
+    return len(results)
+
+
+def remove_competition(competition):
+    """Take a competition back out of the season rollups (e.g. before deleting it).
+
+    Sums are decremented in place; best scores are recomputed from the remaining
+    league results of the affected archers only. Nothing is committed.
+    """
+    results = LeagueResult.query.filter_by(competition_id=competition.id).all()
+    if not results:
+        return 0
+
+    season = results[0].season
+    rollups = {
+        rollup.member_id: rollup
+        for rollup in SeasonRollup.query.filter(
+            SeasonRollup.season == season,
+            SeasonRollup.member_id.in_([r.member_id for r in results])
+        ).all()
+    }
+
+    for result in results:
+        db.session.delete(result)
+    db.session.flush()
+
+    best_scores = dict(
+        db.session.query(LeagueResult.member_id, func.max(LeagueResult.total_score)).filter(
+            LeagueResult.season == season,
+            LeagueResult.member_id.in_(list(rollups))
+        ).group_by(LeagueResult.member_id).all()
+    )
+
+    for result in results:
+        rollup = rollups.get(result.member_id)
+        if rollup is None:
+            continue
+        rollup.competitions_shot -= 1
+        if rollup.competitions_shot <= 0:
+            db.session.delete(rollup)
+            continue
+        rollup.total_score -= result.total_score
+        rollup.x_count -= result.x_count
+        rollup.arrows_shot -= result.arrows_shot
+        rollup.best_score = best_scores.get(result.member_id, 0)
+
+    return len(results)
+
+
+def rebuild_all(batch_size=20, echo=None):
+    """Recompute every rollup from scratch, streaming completed competitions in batches.
+
+    Commits after each batch so memory stays bounded however long the history is.
+    Returns the number of competitions processed.
+    """
+    SeasonRollup.query.delete()
+    LeagueResult.query.delete()
+    db.session.commit()
+
+    competition_ids = [row.id for row in db.session.query(Competition.id).filter(
+        Competition.status == 'completed'
+    ).order_by(Competition.id).all()]
+
+    for start in range(0, len(competition_ids), batch_size):
+        for competition_id in competition_ids[start:start + batch_size]:
+            record_competition(Competition.query.get(competition_id))
+            # Flush so the next competition sees rollups created by this one
+            db.session.flush()
+        db.session.commit()
+        db.session.expunge_all()
+        if echo:
+            echo(f'Processed {min(start + batch_size, len(competition_ids))}/{len(competition_ids)} competitions')
+
+    return len(competition_ids)
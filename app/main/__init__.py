@@ -1,9 +1,10 @@
 from flask import Blueprint, render_template
 from flask_login import login_required, current_user
-from app.models import InventoryItem, InventoryCategory, ShootingEvent
-from datetime import datetime, timedelta
+from app.models import InventoryItem
+from datetime import datetime
 from app.forms import ClubSettingsForm
 from app.models import ClubSettings
+from app.club_stats import club_stats
 from app import db
 from flask import flash, redirect, url_for, request
 
@@ -27,40 +28,23 @@ def index():
 @main_bp.route('/dashboard')
 @login_required
 def dashboard():
-    # Get inventory statistics
-    total_items = InventoryItem.query.count()
-    total_categories = InventoryCategory.query.count()
-    
-    # Get member statistics
-    from app.models import User
-    total_members = User.query.count()
-    active_members = User.query.filter_by(is_active=True).count()
-    
     # Get recent items
     recent_items = InventoryItem.query.order_by(InventoryItem.created_at.desc()).limit(5).all()
     
-    # Get upcoming events count (next 30 days)
-    thirty_days_from_now = datetime.now().date() + timedelta(days=30)
-    upcoming_events_count = ShootingEvent.query.filter(
-        ShootingEvent.date >= datetime.now().date(),
-        ShootingEvent.date <= thirty_days_from_now
-    ).count()
-    
+    # The stats cards are a cached fragment; the counters are only read when it is re-rendered
     return render_template('dashboard.html', 
-                         total_items=total_items,
-                         total_categories=total_categories,
-                         total_members=total_members,
-                         active_members=active_members,
-                         recent_items=recent_items,
-                         upcoming_events_count=upcoming_events_count)
+                         club_stats=club_stats,
+                         today=datetime.now().date(),
+                         recent_items=recent_items)
 
 @main_bp.route('/settings')
 @login_required
 @admin_required
 def settings():
     """Display club settings page"""
+    from app.fragments import fragment_stats
     settings = ClubSettings.get_settings()
-    return render_template('main/settings.html', settings=settings)
+    return render_template('main/settings.html', settings=settings, fragment_stats=fragment_stats())
 
 @main_bp.route('/settings/edit', methods=['GET', 'POST'])
 @login_required
@@ -1,9 +1,14 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.models import User
+from app.club_stats import club_stats
+from app.db_routing import read_replica
+from app.members.search import search_members
+from app.deletion import delete_members, members_with_activity
 from app.forms import RegistrationForm, MemberEditForm
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 
 members_bp = Blueprint('members', __name__)
 
@@ -48,18 +53,34 @@ def index():
     )
     
     # Get stats for dashboard cards
-    total_members = User.query.count()
-    active_members = User.query.filter_by(is_active=True).count()
-    admins = User.query.filter_by(role='admin').count()
+    stats = club_stats()
     
     return render_template('members/index.html', 
                          members=members,
                          search=search,
                          role_filter=role_filter,
                          status_filter=status_filter,
-                         total_members=total_members,
-                         active_members=active_members,
-                         admins=admins)
+                         total_members=stats['total_members'],
+                         active_members=stats['active_members'],
+                         admins=stats['admins'])
+
+@members_bp.route('/search')
+@login_required
+@admin_required
+@read_replica
+def search():
+    """Typeahead lookup of active members by name or username, returning the top matches as JSON"""
+    members = search_members(
+        request.args.get('q', ''),
+        role=request.args.get('role') or None,
+        exclude_event_id=request.args.get('exclude_event', type=int),
+        exclude_competition_id=request.args.get('exclude_competition', type=int)
+    )
+    return jsonify({'members': [{
+        'id': member.id,
+        'name': f'{member.first_name} {member.last_name}',
+        'username': member.username
+    } for member in members]})
 
 @members_bp.route('/new', methods=['GET', 'POST'])
 @login_required
@@ -204,8 +225,20 @@ def delete_member(id):
             return redirect(url_for('members.view_member', id=member.id))
     
     username = member.username
-    db.session.delete(member)
-    db.session.commit()
+    activity_message = (f'Cannot delete member {username} because they have recorded activity. '
+                        'Deactivate the account instead.')
+    if members_with_activity([id]):
+        flash(activity_message, 'error')
+        return redirect(url_for('members.view_member', id=id))
+    
+    try:
+        delete_members([id])
+        db.session.commit()
+    except IntegrityError:
+        # Foreign keys are enforced, so anything referencing the member blocks the delete
+        db.session.rollback()
+        flash(activity_message, 'error')
+        return redirect(url_for('members.view_member', id=id))
     
     flash(f'Member {username} has been deleted.', 'success')
     return redirect(url_for('members.index'))
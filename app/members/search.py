@@ -0,0 +1,112 @@
+"""Member lookup for the typeahead pickers on the event and competition pages.
+
+Matches are found in three passes, each only when the one before came up short:
+
+1. every word of the query is a prefix of the first name, last name or
+   username, which the ``lower()`` expression indexes on ``user`` answer as
+   range scans;
+2. every word appears anywhere in one of those columns;
+3. a fuzzy match against every active member's name, to forgive typos. The
+   name list is cached per ``ChangeCounter`` version of the ``user`` table,
+   so it is rebuilt only after members change.
+"""
+from difflib import SequenceMatcher
+from app import db
+from app.cache import LRUCache
+from app.models import User, EventAttendance, CompetitionRegistration, ChangeCounter
+
+SEARCH_LIMIT = 20
+# Queries shorter than this only use the prefix pass
+MIN_FUZZY_LENGTH = 3
+FUZZY_CUTOFF = 0.75
+
+# Active member names keyed by the user table's change version
+_names_cache = LRUCache(maxsize=2)
+
+
+def _prefix(column, word):
+    """``lower(column)`` starts with ``word``, written as a range the index can serve"""
+    lowered = db.func.lower(column)
+    upper_bound = word[:-1] + chr(ord(word[-1]) + 1)
+    return db.and_(lowered >= word, lowered < upper_bound)
+
+
+def _contains(column, word):
+    return column.icontains(word, autoescape=True)
+
+
+def _matching(words, match):
+    return db.and_(*[db.or_(match(User.first_name, word), match(User.last_name, word),
+                            match(User.username, word)) for word in words])
+
+
+def _active_names():
+    """(id, names) for every active member, cached until the user table changes"""
+    version = ChangeCounter.versions('user')
+    names = _names_cache.get(version)
+    if names is None:
+        rows = db.session.execute(
+            db.select(User.id, User.first_name, User.last_name, User.username).where(User.is_active == True)
+        ).all()
+        names = [(row.id, tuple(name.lower() for name in (
+            row.first_name, row.last_name, row.username, f'{row.first_name} {row.last_name}'
+        ))) for row in rows]
+        _names_cache.set(version, names)
+    return names
+
+
+def _fuzzy_ids(term, limit):
+    """Ids of the members whose names best resemble ``term``, best first"""
+    matcher = SequenceMatcher(None, b=term)
+    scored = []
+    for member_id, names in _active_names():
+        best = 0
+        for name in names:
+            matcher.set_seq1(name)
+            if matcher.real_quick_ratio() >= FUZZY_CUTOFF and matcher.quick_ratio() >= FUZZY_CUTOFF:
+                best = max(best, matcher.ratio())
+        if best >= FUZZY_CUTOFF:
+            scored.append((best, member_id))
+    scored.sort(key=lambda pair: -pair[0])
+    return [member_id for _, member_id in scored[:limit]]
+
+
+def search_members(term, limit=SEARCH_LIMIT, role=None, exclude_event_id=None, exclude_competition_id=None):
+    """Find active members matching ``term``, best matches first.
+
+    ``exclude_event_id`` and ``exclude_competition_id`` leave out members who
+    already attend the event or are registered for the competition.
+    """
+    term = ' '.join((term or '').lower().split())
+    if not term:
+        return []
+    words = term.split(' ')
+
+    query = db.select(User).where(User.is_active == True)
+    if role:
+        query = query.where(User.role == role)
+    if exclude_event_id:
+        query = query.where(User.id.not_in(
+            db.select(EventAttendance.member_id).where(EventAttendance.event_id == exclude_event_id)
+        ))
+    if exclude_competition_id:
+        query = query.where(User.id.not_in(
+            db.select(CompetitionRegistration.member_id)
+            .where(CompetitionRegistration.competition_id == exclude_competition_id)
+        ))
+    by_name = (User.first_name, User.last_name)
+
+    members = list(db.session.scalars(query.where(_matching(words, _prefix)).order_by(*by_name).limit(limit)))
+    if len(members) < limit and len(term) >= 2:
+        found = [member.id for member in members]
+        members += db.session.scalars(
+            query.where(_matching(words, _contains), User.id.not_in(found)).order_by(*by_name)
+            .limit(limit - len(members))
+        )
+    if len(members) < limit and len(term) >= MIN_FUZZY_LENGTH:
+        found = {member.id for member in members}
+        candidates = [member_id for member_id in _fuzzy_ids(term, limit * 2) if member_id not in found]
+        if candidates:
+            rows = {member.id: member for member in db.session.scalars(query.where(User.id.in_(candidates)))}
+            members += [rows[member_id] for member_id in candidates if member_id in rows][:limit - len(members)]
+    return members
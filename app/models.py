@@ -1,11 +1,26 @@
 from app import db, login_manager
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
+from collections import namedtuple
+import hashlib
+import json
+import zlib
+
+# Storage-independent view of a single arrow, see CompetitionRegistration.arrow_values;
+# id is the ArrowScore id, or None for competitions storing one row per end
+ArrowValue = namedtuple('ArrowValue', ['arrow_number', 'round_number', 'points', 'is_x', 'id'], defaults=(None,))
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from the principal cache; inactive members are logged out immediately
+    from app.principal import get_principal
+    principal = get_principal(int(user_id))
+    if principal is None or not principal.is_active:
+        return None
+    return principal
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -18,9 +33,19 @@ class User(UserMixin, db.Model):
     membership_type = db.Column(db.String(20), nullable=False, default='monthly')  # 'annual', 'quarterly', 'monthly', 'per_event'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    token_version = db.Column(db.Integer, nullable=False, default=0)  # Bumped to revoke all API tokens
+    
+    # Case-insensitive prefix lookups for the member search (app/members/search.py)
+    __table_args__ = (
+        db.Index('ix_user_first_name_lower', db.func.lower(first_name)),
+        db.Index('ix_user_last_name_lower', db.func.lower(last_name)),
+        db.Index('ix_user_username_lower', db.func.lower(username)),
+    )
     
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
+        # A new password invalidates every API token issued before it
+        self.token_version = (self.token_version or 0) + 1
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -78,9 +103,87 @@ class InventoryItem(db.Model):
     # Specific attributes for different categories (JSON field for flexibility)
     attributes = db.Column(db.JSON)  # Store category-specific attributes
     
+    # Common specs copied out of ``attributes`` into indexed columns, so equipment
+    # can be filtered in SQL (see app/inventory/filters.py)
+    draw_weight = db.Column(db.Integer)  # Bows, lbs
+    bow_type = db.Column(db.String(20))  # Bows
+    handedness = db.Column(db.String(10))  # Bows
+    spine = db.Column(db.Integer, index=True)  # Arrows
+    length = db.Column(db.Float, index=True)  # Bows and arrows, inches
+    face_size = db.Column(db.Integer, index=True)  # Targets, cm
+    
+    __table_args__ = (
+        # Bow lookups filter on type and hand, then a draw weight range
+        db.Index('ix_inventory_item_bow_spec', 'bow_type', 'handedness', 'draw_weight'),
+        db.Index('ix_inventory_item_draw_weight', 'draw_weight'),
+    )
+    
+    # Spec columns and the type their attribute values are stored as
+    SPEC_ATTRIBUTES = {
+        'draw_weight': int, 'bow_type': str, 'handedness': str,
+        'spine': int, 'length': float, 'face_size': int,
+    }
+    
+    @db.validates('attributes')
+    def sync_spec_columns(self, key, attributes):
+        """Keep the spec columns in step whenever the attributes are replaced"""
+        specs = attributes if isinstance(attributes, dict) else {}
+        for name, cast in self.SPEC_ATTRIBUTES.items():
+            value = specs.get(name)
+            try:
+                value = cast(value) if value not in (None, '') else None
+            except (TypeError, ValueError):
+                value = None
+            setattr(self, name, value)
+        return attributes
+    
     def __repr__(self):
         return f'<InventoryItem {self.name}>'
 
+class EquipmentLoan(db.Model):
+    """Units of an inventory item lent to a member or an event for a time interval (see app/inventory/loans.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, db.ForeignKey('inventory_item.id', ondelete='CASCADE'), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    member_id = db.Column(db.Integer, db.ForeignKey('user.id'))  # Borrowing member, or
+    event_id = db.Column(db.Integer, db.ForeignKey('shooting_event.id'))  # the event it is lent for
+    starts_at = db.Column(db.DateTime, nullable=False)
+    ends_at = db.Column(db.DateTime, nullable=False)  # Due back; moved to the return time if returned early
+    returned_at = db.Column(db.DateTime)  # None while out (overdue once ends_at has passed)
+    notes = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Overlap lookups scan a bounded starts_at range and check ends_at in the index
+        db.Index('ix_equipment_loan_interval', 'starts_at', 'ends_at'),
+        db.Index('ix_equipment_loan_item', 'item_id', 'starts_at'),
+        # Loans still out, for the overdue lookup
+        db.Index('ix_equipment_loan_open', 'returned_at', 'ends_at'),
+    )
+    
+    item = db.relationship('InventoryItem', backref=db.backref(
+        'loans', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True
+    ))
+    member = db.relationship('User', foreign_keys=[member_id])
+    event = db.relationship('ShootingEvent')
+    lender = db.relationship('User', foreign_keys=[created_by])
+    
+    @property
+    def is_overdue(self):
+        """Check if the loan is still out after it was due back"""
+        return self.returned_at is None and self.ends_at < datetime.now()
+    
+    @property
+    def borrower(self):
+        """Name of the member or event the items are lent to"""
+        if self.member:
+            return f'{self.member.first_name} {self.member.last_name}'
+        return self.event.name if self.event else '-'
+    
+    def __repr__(self):
+        return f'<EquipmentLoan {self.item_id} x{self.quantity}>'
+
 # Sample category-specific attributes structure:
 # For Bows: {"draw_weight": 45, "draw_length": 28, "bow_type": "recurve", "handedness": "right"}
 # For Arrows: {"spine": 500, "length": 30, "point_weight": 125, "fletching_type": "feather"}
@@ -210,6 +313,8 @@ class Competition(db.Model):
     arrows_per_round = db.Column(db.Integer, nullable=False, default=6)
     max_team_size = db.Column(db.Integer, nullable=False, default=4)  # Can be 3 or 4
     status = db.Column(db.String(20), nullable=False, default='setup')  # setup, registration_open, in_progress, completed
+    score_storage = db.Column(db.String(10), nullable=False, default='arrow')  # 'arrow' (one row per arrow) or 'end' (one row per round)
+    results_version = db.Column(db.Integer, nullable=False, default=0)  # Bumped on every score or registration change
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
@@ -218,6 +323,8 @@ class Competition(db.Model):
     creator = db.relationship('User', backref='created_competitions')
     groups = db.relationship('CompetitionGroup', backref='competition', lazy=True, cascade='all, delete-orphan')
     registrations = db.relationship('CompetitionRegistration', backref='competition', lazy=True, cascade='all, delete-orphan')
+    results_snapshot = db.relationship('CompetitionResultSnapshot', backref='competition', uselist=False,
+                                       cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Competition for {self.event.name}>'
@@ -232,6 +339,40 @@ class Competition(db.Model):
         """Calculate maximum possible score (assuming 10 points per arrow)"""
         return self.total_arrows * 10
     
+    @property
+    def uses_end_storage(self):
+        """Check if scores are stored compactly as one EndScore row per round"""
+        return self.score_storage == 'end'
+    
+    def compact_scores(self):
+        """Convert this competition's per-arrow ArrowScore rows into packed EndScore rows.
+        
+        Returns the number of ArrowScore rows removed. Nothing is committed.
+        """
+        if self.uses_end_storage:
+            return 0
+        
+        removed = 0
+        for registration in self.registrations:
+            rounds = {}
+            for score in sorted(registration.arrow_scores, key=lambda s: s.arrow_number):
+                rounds.setdefault(score.round_number, []).append(score)
+            
+            for round_number, scores in rounds.items():
+                end = EndScore(
+                    registration_id=registration.id,
+                    round_number=round_number,
+                    recorded_by=scores[-1].recorded_by,
+                    recorded_at=scores[-1].recorded_at
+                )
+                end.set_arrows([(score.points, bool(score.is_x)) for score in scores])
+                db.session.add(end)
+            
+            removed += ArrowScore.query.filter_by(registration_id=registration.id).delete()
+        
+        self.score_storage = 'end'
+        return removed
+    
     @property
     def registration_count(self):
         """Get total number of registered participants"""
@@ -260,7 +401,7 @@ class Competition(db.Model):
         total_participants = len(self.registrations)
         completed_participants = sum(1 for reg in self.registrations if reg.is_complete)
         missing_arrows_total = sum(
-            max(0, self.total_arrows - len(reg.arrow_scores)) 
+            max(0, self.total_arrows - reg.arrow_count) 
             for reg in self.registrations
         )
         
@@ -342,6 +483,8 @@ class CompetitionRegistration(db.Model):
     # Relationships
     member = db.relationship('User', backref='competition_registrations')
     arrow_scores = db.relationship('ArrowScore', backref='registration', lazy=True, cascade='all, delete-orphan')
+    end_scores = db.relationship('EndScore', backref='registration', lazy=True, cascade='all, delete-orphan',
+                                 order_by='EndScore.round_number')
     
     # Unique constraint: one registration per member per competition
     __table_args__ = (db.UniqueConstraint('competition_id', 'member_id', name='unique_member_per_competition'),)
@@ -349,25 +492,53 @@ class CompetitionRegistration(db.Model):
     def __repr__(self):
         return f'<CompetitionRegistration {self.member.username} in {self.competition.event.name}>'
     
+    @property
+    def arrow_values(self):
+        """Get all recorded arrows as ArrowValue tuples, ordered by arrow number.
+        
+        Works for both per-arrow and per-end storage so callers never need to
+        know how the competition stores its scores.
+        """
+        if self.competition.uses_end_storage:
+            values = []
+            for end in self.end_scores:
+                values.extend(end.arrow_values(self.competition.arrows_per_round))
+            return values
+        return sorted(
+            (ArrowValue(s.arrow_number, s.round_number, s.points, bool(s.is_x), s.id) for s in self.arrow_scores),
+            key=lambda value: value.arrow_number
+        )
+    
+    @property
+    def arrow_count(self):
+        """Get number of arrows recorded so far"""
+        if self.competition.uses_end_storage:
+            return sum(len(end.arrows) for end in self.end_scores)
+        return len(self.arrow_scores)
+    
     @property
     def total_score(self):
         """Calculate total score from all arrows"""
+        if self.competition.uses_end_storage:
+            return sum(end.total for end in self.end_scores)
         return sum(score.points for score in self.arrow_scores)
     
     @property
     def completed_rounds(self):
         """Get number of completed rounds"""
-        total_arrows = len(self.arrow_scores)
-        return total_arrows // self.competition.arrows_per_round
+        return self.arrow_count // self.competition.arrows_per_round
     
     @property
     def is_complete(self):
         """Check if all rounds are completed"""
         expected_arrows = self.competition.total_arrows
-        return len(self.arrow_scores) >= expected_arrows
+        return self.arrow_count >= expected_arrows
     
     def get_round_score(self, round_number):
         """Get score for a specific round (1-indexed)"""
+        if self.competition.uses_end_storage:
+            return sum(end.total for end in self.end_scores if end.round_number == round_number)
+        
         start_arrow = (round_number - 1) * self.competition.arrows_per_round
         end_arrow = start_arrow + self.competition.arrows_per_round
         
@@ -381,6 +552,112 @@ class CompetitionRegistration(db.Model):
         for round_num in range(1, self.competition.number_of_rounds + 1):
             scores.append(self.get_round_score(round_num))
         return scores
+    
+    def record_round(self, round_number, arrows, recorded_by, notes=None):
+        """Record a full round of arrows using the competition's storage mode.
+        
+        ``arrows`` is a list of ``(points, is_x)`` pairs in shooting order.
+        The new rows are added to the session but not committed.
+        """
+        if self.competition.uses_end_storage:
+            end = EndScore(
+                registration_id=self.id,
+                round_number=round_number,
+                recorded_by=recorded_by
+            )
+            end.set_arrows(arrows)
+            db.session.add(end)
+            return
+        
+        base_arrow_number = (round_number - 1) * self.competition.arrows_per_round
+        for index, (points, is_x) in enumerate(arrows):
+            db.session.add(ArrowScore(
+                registration_id=self.id,
+                arrow_number=base_arrow_number + index + 1,
+                points=points,
+                is_x=is_x,
+                round_number=round_number,
+                recorded_by=recorded_by,
+                notes=notes
+            ))
+    
+    def fill_missing_arrows(self, recorded_by, notes=None):
+        """Record 0-point arrows for every arrow not yet shot.
+        
+        Returns the number of arrows added. Nothing is committed.
+        """
+        competition = self.competition
+        
+        if competition.uses_end_storage:
+            ends = {end.round_number: end for end in self.end_scores}
+            filled = 0
+            for round_num in range(1, competition.number_of_rounds + 1):
+                end = ends.get(round_num)
+                if end is None:
+                    self.record_round(round_num, [(0, False)] * competition.arrows_per_round, recorded_by)
+                    filled += competition.arrows_per_round
+                elif len(end.arrows) < competition.arrows_per_round:
+                    arrows = end.get_arrows()
+                    filled += competition.arrows_per_round - len(arrows)
+                    end.set_arrows(arrows + [(0, False)] * (competition.arrows_per_round - len(arrows)))
+            return filled
+        
+        recorded = {score.arrow_number for score in self.arrow_scores}
+        filled = 0
+        for arrow_num in range(1, competition.total_arrows + 1):
+            if arrow_num in recorded:
+                continue
+            db.session.add(ArrowScore(
+                registration_id=self.id,
+                arrow_number=arrow_num,
+                points=0,
+                is_x=False,
+                round_number=((arrow_num - 1) // competition.arrows_per_round) + 1,
+                recorded_by=recorded_by,
+                notes=notes
+            ))
+            filled += 1
+        return filled
+    
+    def record_arrow(self, round_number, arrow_in_round, points, is_x, recorded_by):
+        """Record or overwrite a single arrow (1-indexed within its round).
+        
+        Used by the API, which submits arrows one at a time. With end storage the
+        round's row is updated in place and padded with zeros as needed.
+        """
+        arrow_number = (round_number - 1) * self.competition.arrows_per_round + arrow_in_round
+        
+        if self.competition.uses_end_storage:
+            end = EndScore.query.filter_by(registration_id=self.id, round_number=round_number).first()
+            if not end:
+                end = EndScore(registration_id=self.id, round_number=round_number, recorded_by=recorded_by)
+                db.session.add(end)
+            arrows = end.get_arrows() if end.arrows else []
+            while len(arrows) < arrow_in_round:
+                arrows.append((0, False))
+            arrows[arrow_in_round - 1] = (points, is_x)
+            end.set_arrows(arrows)
+            end.recorded_by = recorded_by
+            end.recorded_at = datetime.utcnow()
+            return
+        
+        existing_score = ArrowScore.query.filter_by(
+            registration_id=self.id,
+            arrow_number=arrow_number
+        ).first()
+        
+        if existing_score:
+            existing_score.points = points
+            existing_score.is_x = is_x
+        else:
+            db.session.add(ArrowScore(
+                registration_id=self.id,
+                arrow_number=arrow_number,
+                points=points,
+                is_x=is_x,
+                round_number=round_number,
+                recorded_by=recorded_by
+            ))
 
 class ArrowScore(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -412,6 +689,263 @@ class ArrowScore(db.Model):
         """Check if this hit the inner ring (9 or 10 points)"""
         return self.points >= 9
 
+class EndScore(db.Model):
+    """Compact score storage: one row per round (end) instead of one per arrow.
+    
+    Arrow values are packed one byte per arrow in shooting order and X flags
+    are packed into a bitmask (bit 0 = first arrow of the end). The round total
+    and X count are stored alongside so aggregates can be computed in SQL.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    registration_id = db.Column(db.Integer, db.ForeignKey('competition_registration.id'), nullable=False)
+    round_number = db.Column(db.Integer, nullable=False)
+    arrows = db.Column(db.LargeBinary, nullable=False)  # One byte (0-10) per arrow
+    x_mask = db.Column(db.Integer, nullable=False, default=0)  # Bit n set = arrow n+1 was an X
+    total = db.Column(db.Integer, nullable=False, default=0)
+    x_count = db.Column(db.Integer, nullable=False, default=0)
+    recorded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    recorder = db.relationship('User')
+    
+    # Unique constraint: one row per round per registration
+    __table_args__ = (db.UniqueConstraint('registration_id', 'round_number', name='unique_end_per_registration'),)
+    
+    def __repr__(self):
+        return f'<EndScore round {self.round_number}: {self.total} points>'
+    
+    def set_arrows(self, arrows):
+        """Pack a list of (points, is_x) pairs into this row"""
+        self.arrows = bytes(points for points, _ in arrows)
+        self.x_mask = sum(1 << index for index, (_, is_x) in enumerate(arrows) if is_x)
+        self.total = sum(points for points, _ in arrows)
+        self.x_count = sum(1 for _, is_x in arrows if is_x)
+    
+    def get_arrows(self):
+        """Unpack this row into a list of (points, is_x) pairs"""
+        return [(points, bool(self.x_mask >> index & 1)) for index, points in enumerate(self.arrows)]
+    
+    def arrow_values(self, arrows_per_round):
+        """Unpack this row into ArrowValue tuples with competition-wide arrow numbers"""
+        base_arrow_number = (self.round_number - 1) * arrows_per_round
+        return [
+            ArrowValue(base_arrow_number + index + 1, self.round_number, points, is_x)
+            for index, (points, is_x) in enumerate(self.get_arrows())
+        ]
+
+class CompetitionResultSnapshot(db.Model):
+    """Immutable, compressed copy of a completed competition's results.
+    
+    Written once when the competition is completed so results pages and the API
+    can be served with a single indexed read instead of recomputing from arrows.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    competition_id = db.Column(db.Integer, db.ForeignKey('competition.id'), nullable=False, unique=True, index=True)
+    payload = db.Column(db.LargeBinary, nullable=False)  # zlib-compressed JSON from build_results()
+    etag = db.Column(db.String(64), nullable=False)  # SHA-256 of the payload
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CompetitionResultSnapshot for competition {self.competition_id}>'
+    
+    @property
+    def data(self):
+        """Get the decoded results structure"""
+        return json.loads(zlib.decompress(self.payload))
+    
+    @property
+    def json_bytes(self):
+        """Get the results as UTF-8 JSON without re-serializing"""
+        return zlib.decompress(self.payload)
+    
+    @staticmethod
+    def capture(competition):
+        """Create the snapshot for a completed competition (or return the existing one)"""
+        if competition.results_snapshot:
+            return competition.results_snapshot
+        
+        from app.competitions.results import build_results
+        raw = json.dumps(build_results(competition), separators=(',', ':')).encode('utf-8')
+        snapshot = CompetitionResultSnapshot(
+            competition_id=competition.id,
+            payload=zlib.compress(raw, 9),
+            etag=hashlib.sha256(raw).hexdigest()
+        )
+        db.session.add(snapshot)
+        return snapshot
+
+# League Models
+
+class LeagueResult(db.Model):
+    """A member's final result in one completed competition, feeding the season rollups"""
+    id = db.Column(db.Integer, primary_key=True)
+    competition_id = db.Column(db.Integer, db.ForeignKey('competition.id'), nullable=False, index=True)
+    member_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    season = db.Column(db.Integer, nullable=False)  # Year the season starts in
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    x_count = db.Column(db.Integer, nullable=False, default=0)
+    arrows_shot = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    competition = db.relationship('Competition', backref=db.backref('league_results', cascade='all, delete-orphan'))
+    member = db.relationship('User', backref=db.backref('league_results', cascade='all, delete-orphan'))
+    
+    # One result per member per competition; personal bests are read by member and season
+    __table_args__ = (
+        db.UniqueConstraint('competition_id', 'member_id', name='unique_league_result'),
+        db.Index('ix_league_result_member_season', 'member_id', 'season', 'total_score'),
+    )
+    
+    def __repr__(self):
+        return f'<LeagueResult member {self.member_id} in competition {self.competition_id}: {self.total_score}>'
+
+class SeasonRollup(db.Model):
+    """Running per-member, per-season totals so league tables never touch raw arrows"""
+    id = db.Column(db.Integer, primary_key=True)
+    member_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    season = db.Column(db.Integer, nullable=False)
+    competitions_shot = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)  # Sum over all competitions shot
+    best_score = db.Column(db.Integer, nullable=False, default=0)
+    x_count = db.Column(db.Integer, nullable=False, default=0)
+    arrows_shot = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    member = db.relationship('User', backref=db.backref('season_rollups', cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        db.UniqueConstraint('member_id', 'season', name='unique_member_season'),
+        db.Index('ix_season_rollup_best', 'season', 'best_score'),
+    )
+    
+    def __repr__(self):
+        return f'<SeasonRollup member {self.member_id} season {self.season}>'
+    
+    @property
+    def average_score(self):
+        """Average competition score this season"""
+        if not self.competitions_shot:
+            return 0
+        return self.total_score / self.competitions_shot
+    
+    @property
+    def average_per_arrow(self):
+        """Average points per arrow, comparable across round formats"""
+        if not self.arrows_shot:
+            return 0
+        return self.total_score / self.arrows_shot
+
+class ClubRecord(db.Model):
+    """Best final score for a round format (rounds x arrows x target size) and group"""
+    id = db.Column(db.Integer, primary_key=True)
+    number_of_rounds = db.Column(db.Integer, nullable=False)
+    arrows_per_round = db.Column(db.Integer, nullable=False)
+    target_size_cm = db.Column(db.Integer, nullable=False)
+    group_name = db.Column(db.String(100), nullable=False)
+    member_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    competition_id = db.Column(db.Integer, db.ForeignKey('competition.id'), nullable=False, index=True)
+    score = db.Column(db.Integer, nullable=False)
+    x_count = db.Column(db.Integer, nullable=False, default=0)
+    set_on = db.Column(db.Date, nullable=False)  # Date of the competition the record was shot at
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    member = db.relationship('User', backref=db.backref('club_records', cascade='all, delete-orphan'))
+    competition = db.relationship('Competition', backref=db.backref('club_records', cascade='all, delete-orphan'))
+
+    # One record per format and group; the unique index makes lookups a point read
+    __table_args__ = (
+        db.UniqueConstraint('number_of_rounds', 'arrows_per_round', 'target_size_cm', 'group_name',
+                            name='unique_club_record'),
+    )
+
+    def __repr__(self):
+        return f'<ClubRecord {self.format_label} {self.group_name}: {self.score}>'
+
+    @property
+    def format_label(self):
+        """Human readable round format, e.g. '6 x 6 arrows @ 122cm'"""
+        return f'{self.number_of_rounds} x {self.arrows_per_round} arrows @ {self.target_size_cm}cm'
+
+    @classmethod
+    def lookup(cls, number_of_rounds, arrows_per_round, target_size_cm, group_name):
+        """Get the current record for a format and group, if any"""
+        return cls.query.filter_by(
+            number_of_rounds=number_of_rounds,
+            arrows_per_round=arrows_per_round,
+            target_size_cm=target_size_cm,
+            group_name=group_name
+        ).first()
+
+    def is_beaten_by(self, score, x_count):
+        """Check if a result beats this record (higher score, then more X's)"""
+        return (score, x_count) > (self.score, self.x_count)
+
+class RevokedToken(db.Model):
+    """An API token revoked before its expiry, identified by its JWT id"""
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'))
+    expires_at = db.Column(db.DateTime, nullable=False)  # Can be pruned after the token would have expired
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
+
+class ChangeCounter(db.Model):
+    """Per-table write counter, bumped on every flush that touches a tracked table.
+    
+    Shared by all workers through the database, so cheap version-based ETags
+    can tell whether anything changed without running the real queries.
+    """
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Tables whose changes are visible through versioned API responses, cached template
+    # fragments or cached principals (app/principal.py)
+    TRACKED_TABLES = frozenset({
+        'user', 'shooting_event', 'event_attendance', 'beginners_student',
+        'competition', 'competition_group', 'competition_team', 'competition_registration',
+        'member_charge', 'inventory_item', 'inventory_category', 'club_settings', 'revoked_token'
+    })
+    
+    def __repr__(self):
+        return f'<ChangeCounter {self.table_name}: {self.version}>'
+    
+    @classmethod
+    def bump(cls, session, table_names):
+        """Increment the version of each tracked table in ``table_names``.
+        
+        Upserts on SQLite and PostgreSQL, so two sessions writing a table for
+        the first time can't both insert its row.
+        """
+        dialect_name = session.get_bind(mapper=cls.__mapper__).dialect.name
+        insert = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}.get(dialect_name)
+        for table_name in sorted(set(table_names) & cls.TRACKED_TABLES):
+            if insert is not None:
+                session.execute(insert(cls).values(table_name=table_name, version=1).on_conflict_do_update(
+                    index_elements=[cls.table_name], set_={'version': cls.version + 1}
+                ))
+                continue
+            result = session.execute(
+                db.update(cls).where(cls.table_name == table_name).values(
+                    version=cls.version + 1
+                ).execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                session.execute(db.insert(cls).values(table_name=table_name, version=1))
+    
+    @classmethod
+    def versions(cls, *table_names):
+        """Get the current version of each table in a single query (0 if never changed)"""
+        rows = dict(db.session.execute(
+            db.select(cls.table_name, cls.version).where(cls.table_name.in_(table_names))
+        ).all())
+        return tuple(rows.get(name, 0) for name in table_names)
+
 class ClubSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     club_name = db.Column(db.String(200), nullable=False, default='Nockpoint Archery Club')
@@ -465,9 +999,132 @@ class BeginnersStudent(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     notes = db.Column(db.Text)  # Additional notes about the student
+    # Equipment lent for the course, picked by the matcher (see app/events/equipment.py)
+    bow_id = db.Column(db.Integer, db.ForeignKey('inventory_item.id', ondelete='SET NULL'), index=True)
+    arrows_id = db.Column(db.Integer, db.ForeignKey('inventory_item.id', ondelete='SET NULL'), index=True)
     
     # Relationship to event
     event = db.relationship('ShootingEvent', backref='beginners_students')
+    bow = db.relationship('InventoryItem', foreign_keys=[bow_id])
+    arrows = db.relationship('InventoryItem', foreign_keys=[arrows_id])
     
     def __repr__(self):
         return f'<BeginnersStudent {self.name} (Age: {self.age})>'
+
+
+class Job(db.Model):
+    """A queued unit of background work, run by ``flask run-jobs`` workers (see app/jobs/runner.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)  # Registered task name, e.g. 'competition.complete'
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments for the task
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)  # Percent done
+    message = db.Column(db.String(255))  # Latest progress or outcome, shown to the admin
+    result = db.Column(db.Text)  # JSON returned by the task
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Delays retries
+    worker = db.Column(db.String(100))  # Worker that claimed the job
+    heartbeat_at = db.Column(db.DateTime)  # Last sign of life from that worker
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    creator = db.relationship('User')
+
+    __table_args__ = (db.Index('ix_job_status_run_after', 'status', 'run_after'),)
+
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+    @property
+    def args(self):
+        return json.loads(self.payload or '{}')
+
+    @property
+    def result_data(self):
+        return json.loads(self.result) if self.result else None
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def to_dict(self):
+        """Status for polling clients"""
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result': self.result_data,
+            'error': self.error if self.status == 'failed' else None,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+@event.listens_for(db.session, 'after_flush')
+def bump_competition_results_version(session, flush_context):
+    """Bump Competition.results_version whenever scores or registrations change.
+    
+    Anything cached per competition (e.g. statistics) is keyed by this version,
+    so it goes stale exactly when the underlying results do.
+    """
+    competition_ids = set()
+    registration_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, CompetitionRegistration):
+            competition_ids.add(obj.competition_id)
+        elif isinstance(obj, (ArrowScore, EndScore)):
+            registration_ids.add(obj.registration_id)
+    
+    if registration_ids:
+        competition_ids.update(
+            row[0] for row in session.execute(
+                db.select(CompetitionRegistration.competition_id).where(
+                    CompetitionRegistration.id.in_(registration_ids)
+                ).distinct()
+            )
+        )
+    
+    competition_ids.discard(None)
+    if competition_ids:
+        session.execute(
+            db.update(Competition).where(Competition.id.in_(competition_ids)).values(
+                results_version=Competition.results_version + 1
+            ).execution_options(synchronize_session=False)
+        )
+
+
+def bulk_deleted_table(orm_execute_state):
+    """Name of the table an ORM bulk DELETE is about to empty rows from, or None for other statements.
+    
+    Bulk DELETEs (see app/deletion.py) bypass the flush listeners, so caches
+    that track written tables also listen to ``do_orm_execute`` with this.
+    """
+    if not orm_execute_state.is_delete or orm_execute_state.bind_mapper is None:
+        return None
+    return orm_execute_state.bind_mapper.local_table.name
+
+
+@event.listens_for(db.session, 'after_flush')
+def bump_change_counters(session, flush_context):
+    """Bump the ChangeCounter of every tracked table written in this flush"""
+    ChangeCounter.bump(session, {
+        obj.__table__.name
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+    })
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def bump_change_counters_for_bulk_delete(orm_execute_state):
+    """Bump the ChangeCounter of a tracked table emptied by a bulk DELETE"""
+    table_name = bulk_deleted_table(orm_execute_state)
+    if table_name:
+        ChangeCounter.bump(orm_execute_state.session, {table_name})
@@ -0,0 +1,156 @@
+"""Cached request principals.
+
+Authenticating a request only needs a handful of user columns, so they are kept
+in a bounded, expiring in-process cache keyed by user id. A cache hit resolves
+the current user without touching the database; anything beyond the cached
+columns is loaded from the ``User`` row on first use.
+
+Each entry remembers the ``ChangeCounter`` version of the user table it was
+loaded at. The counters are shared by all workers through the database, so one
+primary key read per request tells every worker that a member was edited,
+deactivated or deleted, and the entry is reloaded. API tokens are also checked
+against the user's ``token_version`` and a revocation list, reloaded whenever
+the revoked_token counter moves.
+"""
+import threading
+from datetime import datetime, timezone
+from flask import g, has_request_context
+from flask_login import UserMixin
+from app import db
+from app.cache import LRUCache
+from app.models import User, RevokedToken, ChangeCounter
+
+PRINCIPAL_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'role',
+                    'membership_type', 'is_active', 'token_version', 'created_at')
+
+_principal_cache = LRUCache(maxsize=1024, ttl=60)
+
+# Revoked token ids, reloaded from the database when the revoked_token counter moves
+_revoked = {'jtis': set(), 'version': None}
+_revoked_lock = threading.Lock()
+
+
+def init_app(app):
+    """Size the caches from the app config"""
+    _principal_cache.maxsize = app.config['PRINCIPAL_CACHE_SIZE']
+    _principal_cache.ttl = app.config['PRINCIPAL_CACHE_TTL']
+    _principal_cache.clear()
+    with _revoked_lock:
+        _revoked['jtis'] = set()
+        _revoked['version'] = None
+    app.before_request(_reset_shared_versions)
+
+
+def _reset_shared_versions():
+    g.pop('_principal_versions', None)
+
+
+def _shared_versions():
+    """ChangeCounter versions of the user and revoked_token tables, read once per request"""
+    if has_request_context() and '_principal_versions' in g:
+        return g._principal_versions
+    versions = ChangeCounter.versions('user', 'revoked_token')
+    if has_request_context():
+        g._principal_versions = versions
+    return versions
+
+
+class Principal(UserMixin):
+    """Detached stand-in for a ``User`` built from cached column values.
+
+    Behaves like the user for the common attributes; any other attribute
+    (relationships, model methods) is read from the ``User`` row, which is
+    loaded lazily once per request.
+    """
+
+    def __init__(self, values):
+        self._values = values
+        self._user = None
+
+    def __getattr__(self, name):
+        values = self.__dict__.get('_values')
+        if values is None:
+            raise AttributeError(name)
+        if name in values:
+            return values[name]
+        return getattr(self.user, name)
+
+    @property
+    def user(self):
+        """The underlying ``User`` row, loaded on first use"""
+        if self._user is None:
+            self._user = db.session.get(User, self._values['id'])
+        return self._user
+
+    @property
+    def is_active(self):
+        return bool(self._values['is_active'])
+
+    def is_admin(self):
+        return self._values['role'] == 'admin'
+
+    def __repr__(self):
+        return f'<Principal {self._values["username"]}>'
+
+
+def get_principal(user_id):
+    """Resolve a user id to a Principal, or None if the user does not exist"""
+    user_version = _shared_versions()[0]
+    cached = _principal_cache.get(user_id)
+    if cached is not None and cached[0] == user_version:
+        return Principal(cached[1])
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    values = {field: getattr(user, field) for field in PRINCIPAL_FIELDS}
+    values['token_version'] = values['token_version'] or 0
+    # Keyed by the version read before loading, so a change committed in between forces a reload
+    _principal_cache.set(user_id, (user_version, values))
+    principal = Principal(values)
+    principal._user = user
+    return principal
+
+
+def _revoked_jtis():
+    version = _shared_versions()[1]
+    with _revoked_lock:
+        if _revoked['version'] == version:
+            return _revoked['jtis']
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    jtis = {row[0] for row in db.session.execute(
+        db.select(RevokedToken.jti).where(RevokedToken.expires_at > now)
+    )}
+    with _revoked_lock:
+        _revoked['jtis'] = jtis
+        _revoked['version'] = version
+    return jtis
+
+
+def is_token_revoked(jti):
+    """Check a token id against the revocation list"""
+    return bool(jti) and jti in _revoked_jtis()
+
+
+def revoke_token(payload):
+    """Revoke a single API token by the id in its decoded payload. Commits."""
+    jti = payload.get('jti')
+    if not jti:
+        return False
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    # Revocations are only needed until the token would have expired anyway
+    RevokedToken.query.filter(RevokedToken.expires_at <= now).delete()
+    if not RevokedToken.query.filter_by(jti=jti).first():
+        db.session.add(RevokedToken(
+            jti=jti,
+            user_id=payload.get('user_id'),
+            expires_at=datetime.fromtimestamp(payload['exp'], timezone.utc).replace(tzinfo=None)
+        ))
+    db.session.commit()
+
+    with _revoked_lock:
+        _revoked['jtis'].add(jti)
+    return True
+
@@ -0,0 +1,72 @@
+"""SQLite production profile.
+
+Applied to every new SQLite connection when ``SQLITE_TUNING`` is on (the
+default):
+
+- ``journal_mode=WAL`` so readers never block the writer, nor the writer readers
+- ``busy_timeout`` so a writer waits for the write lock instead of failing
+- ``synchronous=NORMAL``, which is durable with WAL except on power loss
+- a larger page cache and memory-mapped I/O
+- ``foreign_keys=ON``, which SQLite leaves off by default
+
+Writes should also be short: ``write_with_retry`` commits a unit of work right
+away and re-runs it if the write lock still can't be had.
+"""
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from app import db
+
+LOCKED_RETRIES = 3
+
+
+def init_app(app):
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite') or not app.config['SQLITE_TUNING']:
+        return
+    with app.app_context():
+        engine = db.engine
+    pragmas = sqlite_pragmas(app.config)
+
+    @event.listens_for(engine, 'connect')
+    def apply_sqlite_profile(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+def sqlite_pragmas(config):
+    """(name, value) pairs to apply on connect; journal_mode comes first as it needs no open transaction"""
+    return [
+        ('journal_mode', 'WAL'),
+        ('busy_timeout', int(config['SQLITE_BUSY_TIMEOUT_MS'])),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        # Negative cache_size is in KiB rather than pages
+        ('cache_size', -int(config['SQLITE_CACHE_SIZE_KB'])),
+        ('mmap_size', int(config['SQLITE_MMAP_SIZE'])),
+        ('foreign_keys', 'ON' if config['SQLITE_FOREIGN_KEYS'] else 'OFF'),
+    ]
+
+
+def is_locked_error(error):
+    return 'database is locked' in str(error) or 'database table is locked' in str(error)
+
+
+def write_with_retry(work, retries=LOCKED_RETRIES):
+    """Run ``work()`` and commit straight away, keeping the write transaction short.
+
+    Do all reads and validation before calling this. If the database stays
+    locked beyond the busy timeout, the session is rolled back and ``work``
+    runs again, so it must rebuild its changes from scratch. Returns what
+    ``work`` returns.
+    """
+    for attempt in range(retries + 1):
+        try:
+            result = work()
+            db.session.commit()
+            return result
+        except OperationalError as e:
+            db.session.rollback()
+            if not is_locked_error(e) or attempt == retries:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
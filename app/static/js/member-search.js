@@ -0,0 +1,130 @@
+// Typeahead member picker (see templates/members/_search.html).
+// Typing queries the members.search endpoint and lists the matches; picking one
+// fills the hidden member_id input and fires a "member-selected" event on the
+// .member-search element with the member as its detail.
+(function () {
+    const DEBOUNCE_MS = 200;
+
+    function setup(container) {
+        const input = container.querySelector('.member-search-input');
+        const hidden = container.querySelector('.member-search-value');
+        const results = container.querySelector('.member-search-results');
+        let timer = null;
+        let controller = null;
+        let members = [];
+        let active = -1;
+
+        function close() {
+            results.innerHTML = '';
+            results.classList.add('d-none');
+            members = [];
+            active = -1;
+        }
+
+        function highlight(index) {
+            const items = results.querySelectorAll('.list-group-item-action');
+            items.forEach((item, i) => item.classList.toggle('active', i === index));
+            active = index;
+        }
+
+        function choose(member) {
+            if (hidden) {
+                hidden.value = member.id;
+            }
+            input.value = member.name;
+            input.setCustomValidity('');
+            close();
+            container.dispatchEvent(new CustomEvent('member-selected', {detail: member, bubbles: true}));
+        }
+
+        function render(found) {
+            results.innerHTML = '';
+            members = found;
+            active = -1;
+            if (!found.length) {
+                const empty = document.createElement('div');
+                empty.className = 'list-group-item text-muted';
+                empty.textContent = 'No matching members';
+                results.appendChild(empty);
+            }
+            found.forEach((member, index) => {
+                const item = document.createElement('button');
+                item.type = 'button';
+                item.className = 'list-group-item list-group-item-action';
+                item.textContent = `${member.name} (${member.username})`;
+                item.addEventListener('mousedown', event => event.preventDefault());
+                item.addEventListener('click', () => choose(member));
+                item.addEventListener('mouseenter', () => highlight(index));
+                results.appendChild(item);
+            });
+            results.classList.remove('d-none');
+        }
+
+        function search(term) {
+            if (controller) {
+                controller.abort();
+            }
+            controller = new AbortController();
+            const url = new URL(container.dataset.searchUrl, window.location.origin);
+            url.searchParams.set('q', term);
+            fetch(url, {headers: {'Accept': 'application/json'}, signal: controller.signal})
+                .then(response => response.json())
+                .then(data => render(data.members))
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        close();
+                    }
+                });
+        }
+
+        input.addEventListener('input', () => {
+            if (hidden) {
+                hidden.value = '';
+            }
+            clearTimeout(timer);
+            const term = input.value.trim();
+            if (!term) {
+                close();
+                return;
+            }
+            timer = setTimeout(() => search(term), DEBOUNCE_MS);
+        });
+
+        input.addEventListener('keydown', event => {
+            if (!members.length) {
+                return;
+            }
+            if (event.key === 'ArrowDown') {
+                event.preventDefault();
+                highlight((active + 1) % members.length);
+            } else if (event.key === 'ArrowUp') {
+                event.preventDefault();
+                highlight((active - 1 + members.length) % members.length);
+            } else if (event.key === 'Enter') {
+                event.preventDefault();
+                choose(members[Math.max(active, 0)]);
+            } else if (event.key === 'Escape') {
+                close();
+            }
+        });
+
+        input.addEventListener('blur', close);
+
+        // Don't submit a form until a member has been picked from the list
+        const form = container.closest('form');
+        if (form && hidden) {
+            form.addEventListener('submit', event => {
+                if (!hidden.value) {
+                    event.preventDefault();
+                    input.setCustomValidity('Choose a member from the list');
+                    input.reportValidity();
+                }
+            });
+            input.addEventListener('input', () => input.setCustomValidity(''));
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('.member-search').forEach(setup);
+    });
+})();
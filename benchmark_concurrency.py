@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Load-test a running server with many concurrent connections.
+
+Opens CONCURRENCY client threads (300 by default), each sending requests to the
+given paths in turn until REQUESTS have been sent in total, and reports
+throughput, latency percentiles and errors. Start the server first, e.g.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python benchmark_concurrency.py --base-url http://localhost:8080 /health /api/events
+
+API paths need a token (--token, or log in with --username/--password).
+
+With --serve the script starts gunicorn.conf.py itself, with the gunicorn and
+pool settings of the current environment, on a throwaway SQLite database
+holding a fixed dataset (SEED_MEMBERS members, SEED_EVENTS events), and logs
+in as its admin. --max-errors and --max-p99-ms turn the run into a check that
+exits with status 1 when a limit is exceeded.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SEED_MEMBERS = 200
+SEED_EVENTS = 100
+SEED_PASSWORD = 'benchmark'
+
+
+def login(base_url, username, password):
+    request = urllib.request.Request(
+        f'{base_url}/api/auth/login', data=json.dumps({'username': username, 'password': password}).encode(),
+        headers={'Content-Type': 'application/json'}, method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())['token']
+
+
+def populate(database_url):
+    """Create the benchmark dataset: an admin, members and events from 50 days back to 49 ahead"""
+    from app import create_app, db
+    from app.models import User, ShootingEvent
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@example.com', first_name='Admin', last_name='User', role='admin')
+        admin.set_password(SEED_PASSWORD)
+        db.session.add(admin)
+        db.session.flush()
+        for i in range(SEED_MEMBERS):
+            member = User(username=f'member{i}', email=f'member{i}@example.com', first_name='Member',
+                          last_name=str(i))
+            member.password_hash = admin.password_hash
+            db.session.add(member)
+        for i in range(SEED_EVENTS):
+            db.session.add(ShootingEvent(name=f'Event {i}', location='Range', start_time=dtime(18),
+                                         date=date.today() + timedelta(days=i - SEED_EVENTS // 2),
+                                         max_participants=30, created_by=admin.id))
+        db.session.commit()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve(database_path):
+    """Start gunicorn on a freshly populated database; returns (process, base URL)"""
+    database_url = f'sqlite:///{database_path}'
+    populate(database_url)
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=database_url, PORT=str(port), GUNICORN_ACCESS_LOG='')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            with urllib.request.urlopen(f'{base_url}/health', timeout=1):
+                break
+        except Exception:
+            time.sleep(0.1)
+    return server, base_url
+
+
+def run(base_url, paths, concurrency, total, token=None, timeout=30):
+    headers = {'Accept-Encoding': 'gzip'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+
+    latencies, errors = [], {}
+    lock = threading.Lock()
+    counter = iter(range(total))
+    start_barrier = threading.Barrier(concurrency)
+
+    def client():
+        start_barrier.wait()
+        for n in counter:
+            url = base_url + paths[n % len(paths)]
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=timeout) as response:
+                    response.read()
+                error = None
+            except urllib.error.HTTPError as e:
+                error = f'HTTP {e.code}'
+            except Exception as e:
+                error = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                if error:
+                    errors[error] = errors.get(error, 0) + 1
+                else:
+                    latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, errors
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=['/health'])
+    parser.add_argument('--base-url', default='http://localhost:8080')
+    parser.add_argument('--concurrency', type=int, default=300)
+    parser.add_argument('--requests', type=int, default=3000)
+    parser.add_argument('--token')
+    parser.add_argument('--username')
+    parser.add_argument('--password')
+    parser.add_argument('--serve', action='store_true',
+                        help='start gunicorn on a throwaway database with the benchmark dataset')
+    parser.add_argument('--max-errors', type=int, help='fail if more requests than this fail')
+    parser.add_argument('--max-p99-ms', type=float, help='fail if the p99 latency is higher')
+    args = parser.parse_args()
+
+    server = workdir = None
+    if args.serve:
+        workdir = tempfile.mkdtemp()
+        server, args.base_url = serve(os.path.join(workdir, 'benchmark.db'))
+        args.username, args.password = 'admin', SEED_PASSWORD
+    try:
+        token = args.token
+        if not token and args.username:
+            token = login(args.base_url, args.username, args.password)
+
+        elapsed, latencies, errors = run(args.base_url, args.paths, args.concurrency, args.requests, token)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+            shutil.rmtree(workdir)
+
+    latencies.sort()
+    print(f"{args.requests} requests to {', '.join(args.paths)} with {args.concurrency} concurrent clients")
+    print(f"{len(latencies) / elapsed:10.1f} requests/s over {elapsed:.1f} s")
+    p99_ms = None
+    if latencies:
+        p99_ms = percentile(latencies, 0.99) * 1000
+        print(f"latency ms: median {statistics.median(latencies) * 1000:.1f}, "
+              f"p95 {percentile(latencies, 0.95) * 1000:.1f}, p99 {p99_ms:.1f}, "
+              f"max {latencies[-1] * 1000:.1f}")
+    print(f"errors: {sum(errors.values())}" + (f" {errors}" if errors else ''))
+
+    failures = []
+    if args.max_errors is not None and sum(errors.values()) > args.max_errors:
+        failures.append(f'more than {args.max_errors} errors')
+    if args.max_p99_ms is not None and (p99_ms is None or p99_ms > args.max_p99_ms):
+        failures.append(f'p99 above {args.max_p99_ms:g} ms')
+    if failures:
+        print('FAILED: ' + ', '.join(failures))
+        sys.exit(1)
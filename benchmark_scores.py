@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-arrow vs. compact per-end score storage.
+
+Builds the same synthetic competition (300 archers, 12 rounds of 6 arrows by
+default) in two throwaway SQLite databases, one per storage mode, and compares
+row counts, database size and the time taken to build the results page data.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app, db
+from app.models import (User, ShootingEvent, Competition, CompetitionGroup,
+                        CompetitionRegistration, ArrowScore, EndScore)
+
+ARCHERS = int(os.getenv('BENCH_ARCHERS', 300))
+ROUNDS = int(os.getenv('BENCH_ROUNDS', 12))
+ARROWS_PER_ROUND = int(os.getenv('BENCH_ARROWS_PER_ROUND', 6))
+REPEATS = 5
+
+
+def populate(storage):
+    """Create one competition with every arrow shot, stored using ``storage``"""
+    rng = random.Random(42)
+    admin = User(username='bench', email='bench@example.com', first_name='Bench',
+                 last_name='Admin', role='admin', password_hash='x')
+    db.session.add(admin)
+    db.session.flush()
+
+    event = ShootingEvent(name='Benchmark Shoot', location='Range', date=date.today(),
+                          start_time=dtime(10, 0), created_by=admin.id)
+    db.session.add(event)
+    db.session.flush()
+
+    competition = Competition(event_id=event.id, number_of_rounds=ROUNDS,
+                              arrows_per_round=ARROWS_PER_ROUND, score_storage=storage,
+                              status='in_progress', created_by=admin.id)
+    db.session.add(competition)
+    db.session.flush()
+
+    group = CompetitionGroup(competition_id=competition.id, name='Adults')
+    db.session.add(group)
+    db.session.flush()
+
+    for i in range(ARCHERS):
+        member = User(username=f'archer{i}', email=f'archer{i}@example.com', first_name='Archer',
+                      last_name=str(i), password_hash='x')
+        db.session.add(member)
+        db.session.flush()
+        registration = CompetitionRegistration(competition_id=competition.id, member_id=member.id,
+                                               group_id=group.id)
+        db.session.add(registration)
+        db.session.flush()
+        for round_number in range(1, ROUNDS + 1):
+            arrows = [(rng.randint(0, 10), rng.random() < 0.05) for _ in range(ARROWS_PER_ROUND)]
+            registration.record_round(round_number, arrows, admin.id)
+
+    db.session.commit()
+    return competition.id
+
+
+def time_results(competition_id):
+    """Best-of-N time to build what the results and scoring pages display"""
+    best = None
+    for _ in range(REPEATS):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        competition = Competition.query.get(competition_id)
+        results = competition.get_results_by_group()
+        for registrations in results.values():
+            for registration in registrations:
+                registration.get_round_scores()
+                registration.is_complete
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(storage, workdir):
+    path = os.path.join(workdir, f'{storage}.db')
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        db.create_all()
+        competition_id = populate(storage)
+        db.session.execute(db.text('VACUUM'))
+        rows = ArrowScore.query.count() if storage == 'arrow' else EndScore.query.count()
+        latency = time_results(competition_id)
+        db.session.remove()
+        db.engine.dispose()
+    return rows, os.path.getsize(path), latency
+
+
+if __name__ == '__main__':
+    print(f"Benchmark: {ARCHERS} archers x {ROUNDS} rounds x {ARROWS_PER_ROUND} arrows")
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {storage: run(storage, workdir) for storage in ('arrow', 'end')}
+
+    print(f"{'storage':<8} {'score rows':>12} {'db size (KiB)':>14} {'results (ms)':>13}")
+    for storage, (rows, size, latency) in results.items():
+        print(f"{storage:<8} {rows:>12} {size / 1024:>14.0f} {latency * 1000:>13.1f}")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark API event serialization.
+
+Serializes the same synthetic events (1,000 by default) the old way (hand-built
+dicts with per-field isoformat() through jsonify) and through the schema layer
+with the standard library and orjson encoders, and reports the time per 1,000
+events.
+"""
+
+import os
+import sys
+import time
+from datetime import date, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import jsonify
+from app import create_app
+from app.models import ShootingEvent
+from app.api.serializers import EventSchema, dumps, orjson
+
+EVENTS = int(os.getenv('BENCH_EVENTS', 1000))
+REPEATS = 20
+
+
+def make_events():
+    """Transient events; serialization never touches the database"""
+    start = date.today()
+    return [
+        ShootingEvent(id=i, name=f'Club Shoot {i}', description='Weekly club shoot', location='Range',
+                      date=start + timedelta(days=i % 365), start_time=dtime(10, 0), event_type='regular',
+                      is_free_event=bool(i % 2), max_participants=30)
+        for i in range(1, EVENTS + 1)
+    ]
+
+
+def context_for(events):
+    from datetime import datetime
+    return {
+        'now': datetime.now(),
+        'registered_counts': {event.id: event.id % 20 for event in events},
+        'beginners_counts': {},
+        'attendances': {}
+    }
+
+
+def legacy(events, context):
+    """The hand-built dicts the API produced before the schema layer"""
+    from datetime import datetime
+    data = []
+    for event in events:
+        available_spots = (event.max_participants - context['registered_counts'].get(event.id, 0)
+                           - context['beginners_counts'].get(event.id, 0))
+        data.append({
+            'id': event.id,
+            'title': event.name,
+            'description': event.description,
+            'event_date': datetime.combine(event.date, event.start_time).isoformat(),
+            'event_type': event.event_type,
+            'location': event.location,
+            'max_participants': event.max_participants,
+            'available_spots': available_spots,
+            'is_free': event.is_free_event,
+            'charge_amount': None,
+            'user_registered': False,
+            'user_attended': False,
+            'registration_open': datetime.combine(event.date, event.start_time) > datetime.now(),
+            'can_register': (
+                datetime.combine(event.date, event.start_time) > datetime.now() and
+                available_spots > 0
+            )
+        })
+    return jsonify({'events': data, 'total': len(data)}).get_data()
+
+
+def schema(events, context):
+    rows = EventSchema.many(events, context)
+    return dumps({'events': rows, 'total': len(rows)})
+
+
+def best_time(fn, *args):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+if __name__ == '__main__':
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+    print(f"Benchmark: serializing {EVENTS} events (best of {REPEATS})")
+    print(f"{'serializer':<18} {'ms / 1,000 events':>18} {'bytes':>10}")
+
+    with app.app_context():
+        events = make_events()
+        context = context_for(events)
+        cases = [('legacy jsonify', legacy)]
+        app.config['API_JSON_BACKEND'] = 'json'
+        cases.append(('schema + json', schema))
+        for name, fn in cases:
+            elapsed = best_time(fn, events, context)
+            print(f"{name:<18} {elapsed * 1000 * 1000 / EVENTS:>18.2f} {len(fn(events, context)):>10}")
+
+        if orjson is None:
+            print(f"{'schema + orjson':<18} {'(orjson not installed)':>18}")
+        else:
+            app.config['API_JSON_BACKEND'] = 'orjson'
+            elapsed = best_time(schema, events, context)
+            print(f"{'schema + orjson':<18} {elapsed * 1000 * 1000 / EVENTS:>18.2f} "
+                  f"{len(schema(events, context)):>10}")
@@ -0,0 +1,47 @@
+"""
+Gunicorn configuration, driven by environment variables.
+
+Worker modes (GUNICORN_WORKER_CLASS):
+- gthread (default): each process serves GUNICORN_THREADS requests at once, so
+  slow clients and long polls don't block a whole worker. No extra packages.
+- gevent: cooperative workers for many mostly idle connections
+  (GUNICORN_WORKER_CONNECTIONS each). Requires `pip install gevent`, plus
+  psycogreen when using PostgreSQL.
+- sync: one request per process, as before.
+
+Keep WEB_CONCURRENCY x (DB_POOL_SIZE + DB_MAX_OVERFLOW) below the database's
+connection limit. See DEPLOYMENT.md for the tested settings and the command that
+checks a configuration (benchmark_concurrency.py --serve).
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 500))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+backlog = int(os.getenv('GUNICORN_BACKLOG', 2048))
+
+# Cooperative workers must patch the standard library before the app (and its
+# database driver) is imported, so the app is only preloaded for the other modes
+preload_app = worker_class not in ('gevent', 'eventlet')
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-') or None  # Empty to disable
+
+
+def post_fork(server, worker):
+    # Make psycopg2 cooperative under gevent, when both are installed
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            return
+        patch_psycopg()
+    # Connections opened while preloading must not be shared with the forked worker
+    if preload_app:
+        from app import db
+        with server.app.wsgi().app_context():
+            db.engine.dispose(close=False)
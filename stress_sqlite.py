@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Stress-test SQLite under concurrent scoring from several gunicorn workers.
+
+Builds a competition (40 archers, 6 rounds of 6 arrows by default) in a
+throwaway SQLite file. Then starts gunicorn (4 sync workers by default) on it
+twice: once with stock SQLite settings (SQLITE_TUNING=false) and once with the
+production profile. Each archer submits every arrow through the API while
+other clients keep reading results and competition details. The script reports
+failed requests for each run.
+"""
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, time as dtime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ARCHERS = int(os.getenv('STRESS_ARCHERS', 40))
+ROUNDS = int(os.getenv('STRESS_ROUNDS', 6))
+ARROWS_PER_ROUND = int(os.getenv('STRESS_ARROWS_PER_ROUND', 6))
+READERS = int(os.getenv('STRESS_READERS', 20))
+WORKERS = int(os.getenv('STRESS_WORKERS', 4))
+
+
+def populate(database_url):
+    """Create the competition and return (competition id, one API token per archer)"""
+    from app import create_app, db
+    from app.models import User, ShootingEvent, Competition, CompetitionGroup, CompetitionRegistration
+    from app.api.utils import generate_token
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@example.com', first_name='Admin', last_name='User', role='admin')
+        admin.set_password('stress')
+        db.session.add(admin)
+        db.session.flush()
+        event = ShootingEvent(name='Stress Shoot', location='Range', date=date.today(), start_time=dtime(0, 1),
+                              created_by=admin.id)
+        db.session.add(event)
+        db.session.flush()
+        competition = Competition(event_id=event.id, number_of_rounds=ROUNDS, arrows_per_round=ARROWS_PER_ROUND,
+                                  status='in_progress', created_by=admin.id)
+        db.session.add(competition)
+        db.session.flush()
+        group = CompetitionGroup(competition_id=competition.id, name='Adults')
+        db.session.add(group)
+        db.session.flush()
+
+        members = []
+        for i in range(ARCHERS):
+            member = User(username=f'archer{i}', email=f'archer{i}@example.com', first_name='Archer', last_name=str(i))
+            member.set_password('stress')
+            db.session.add(member)
+            db.session.flush()
+            db.session.add(CompetitionRegistration(competition_id=competition.id, member_id=member.id,
+                                                   group_id=group.id))
+            members.append(member)
+        db.session.commit()
+        return competition.id, [generate_token(member) for member in members]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def request(url, token, payload=None):
+    """Send one request; returns None on success or a short error description"""
+    headers = {'Authorization': f'Bearer {token}'}
+    data = None
+    if payload is not None:
+        headers['Content-Type'] = 'application/json'
+        data = json.dumps(payload).encode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=60) as response:
+            response.read()
+        return None
+    except urllib.error.HTTPError as e:
+        return f'HTTP {e.code}'
+    except Exception as e:
+        return type(e).__name__
+
+
+def run(database_path, tuned):
+    database_url = f'sqlite:///{database_path}'
+    competition_id, tokens = populate(database_url)
+    port = free_port()
+    base = f'http://127.0.0.1:{port}/api/competitions/{competition_id}'
+    env = dict(os.environ, DATABASE_URL=database_url, SQLITE_TUNING='true' if tuned else 'false',
+               PORT=str(port), WEB_CONCURRENCY=str(WORKERS), GUNICORN_WORKER_CLASS='sync',
+               GUNICORN_ACCESS_LOG='')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            if request(f'http://127.0.0.1:{port}/health', '') is None:
+                break
+            time.sleep(0.1)
+
+        errors = {}
+        counts = {'writes': 0, 'reads': 0}
+        lock = threading.Lock()
+        writing = threading.Event()
+        writing.set()
+
+        def record(kind, error):
+            with lock:
+                counts[kind] += 1
+                if error:
+                    errors[f'{kind}: {error}'] = errors.get(f'{kind}: {error}', 0) + 1
+
+        def archer(token):
+            for round_number in range(1, ROUNDS + 1):
+                for arrow_number in range(1, ARROWS_PER_ROUND + 1):
+                    record('writes', request(f'{base}/scores', token, {
+                        'round_number': round_number, 'arrow_number': arrow_number,
+                        'score': (round_number + arrow_number) % 11, 'is_x': False
+                    }))
+
+        def reader(token):
+            paths = ['/results', '', '/statistics']
+            n = 0
+            while writing.is_set():
+                record('reads', request(base + paths[n % len(paths)], token))
+                n += 1
+
+        readers = [threading.Thread(target=reader, args=(tokens[i % len(tokens)],)) for i in range(READERS)]
+        archers = [threading.Thread(target=archer, args=(token,)) for token in tokens]
+        started = time.perf_counter()
+        for thread in readers + archers:
+            thread.start()
+        for thread in archers:
+            thread.join()
+        writing.clear()
+        for thread in readers:
+            thread.join()
+        return time.perf_counter() - started, counts, errors
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    print(f"Stress: {ARCHERS} archers x {ROUNDS * ARROWS_PER_ROUND} arrows, {READERS} readers, "
+          f"{WORKERS} gunicorn workers")
+    for tuned in (False, True):
+        workdir = tempfile.mkdtemp()
+        try:
+            elapsed, counts, errors = run(os.path.join(workdir, 'stress.db'), tuned)
+        finally:
+            shutil.rmtree(workdir)
+        label = 'production profile' if tuned else 'stock SQLite'
+        print(f"{label:<20} {counts['writes']} writes, {counts['reads']} reads in {elapsed:.1f} s, "
+              f"{sum(errors.values())} failed" + (f" {errors}" if errors else ''))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test read-replica routing, using a second local SQLite file as the replica
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from datetime import date, time, timedelta
+
+# Add the parent directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.orm import Session
+from app import create_app, db
+from app.db_routing import PRIMARY_COOKIE
+from app.models import User, ShootingEvent
+from app.api.utils import generate_token
+
+
+def make_app(workdir, with_replica=True):
+    """App on a primary and (optionally) a replica database that hold different events.
+
+    Both get the same member; the primary has the event 'Primary Event' and the
+    replica 'Replica Event', so each response shows which database it read.
+    """
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{workdir}/primary.db', 'WTF_CSRF_ENABLED': False,
+              'DATABASE_REPLICA_URLS': [f'sqlite:///{workdir}/replica.db'] if with_replica else []}
+    app = create_app(config)
+    with app.app_context():
+        engines = [db.engine] + ([db.engines['replica_0']] if with_replica else [])
+        for engine, event_name in zip(engines, ['Primary Event', 'Replica Event']):
+            db.metadata.create_all(engine)
+            with Session(engine) as session:
+                member = User(username='archer', email='archer@example.com', first_name='Test', last_name='Archer')
+                member.set_password('password123')
+                session.add(member)
+                session.flush()
+                session.add(ShootingEvent(name=event_name, location='Range', date=date.today() + timedelta(days=7),
+                                          start_time=time(10), created_by=member.id))
+                session.commit()
+        token = generate_token(User.query.filter_by(username='archer').one())
+    return app, {'Authorization': f'Bearer {token}'}
+
+
+def event_titles(client, headers):
+    response = client.get('/api/events?fields=id,title', headers=headers)
+    assert response.status_code == 200, response.data
+    return [event['title'] for event in response.get_json()['events']]
+
+
+def test_read_replica_views_read_from_the_replica():
+    """GET requests to @read_replica views query the replica"""
+    workdir = tempfile.mkdtemp()
+    try:
+        app, headers = make_app(workdir)
+        client = app.test_client()
+        assert event_titles(client, headers) == ['Replica Event']
+    finally:
+        shutil.rmtree(workdir)
+
+
+def test_reads_stick_to_the_primary_after_a_write():
+    """A write sets the db_primary cookie, which sends the client's next reads to the primary"""
+    workdir = tempfile.mkdtemp()
+    try:
+        app, headers = make_app(workdir)
+        client = app.test_client()
+        with app.app_context():
+            event_id = ShootingEvent.query.filter_by(name='Primary Event').one().id
+
+        response = client.post(f'/api/events/{event_id}/register', headers=headers)
+        assert response.status_code in (200, 201), response.data
+        assert PRIMARY_COOKIE in response.headers.get('Set-Cookie', '')
+        assert event_titles(client, headers) == ['Primary Event']
+
+        # Once the cookie has expired, reads go back to the replica
+        client.delete_cookie(PRIMARY_COOKIE)
+        assert event_titles(client, headers) == ['Replica Event']
+    finally:
+        shutil.rmtree(workdir)
+
+
+def test_without_replicas_everything_uses_the_primary():
+    """With no DATABASE_REPLICA_URLS, @read_replica views read the primary and no cookie is set"""
+    workdir = tempfile.mkdtemp()
+    try:
+        app, headers = make_app(workdir, with_replica=False)
+        client = app.test_client()
+        assert event_titles(client, headers) == ['Primary Event']
+
+        with app.app_context():
+            event_id = ShootingEvent.query.first().id
+        response = client.post(f'/api/events/{event_id}/register', headers=headers)
+        assert response.status_code in (200, 201), response.data
+        assert PRIMARY_COOKIE not in response.headers.get('Set-Cookie', '')
+        assert event_titles(client, headers) == ['Primary Event']
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    print("Testing read-replica routing...")
+    test_read_replica_views_read_from_the_replica()
+    print("✅ Replica reads")
+    test_reads_stick_to_the_primary_after_a_write()
+    print("✅ Read-after-write stickiness")
+    test_without_replicas_everything_uses_the_primary()
+    print("✅ Primary fallback")
+    print("\n🎯 Routing tests passed!")